@@ -0,0 +1,132 @@
+import asyncio
+import weakref
+from functools import wraps
+from types import SimpleNamespace
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import HttpResponseNotAllowed
+from rest_framework.exceptions import AuthenticationFailed, NotFound
+from rest_framework.request import Request
+
+from .authentication import CachedTokenAuthentication
+from .basket import basket_items, price_basket, basket_content, basket_version, remember_summary
+from .catalog import category_listing, product_queryset, product_listing, product_detail_queryset
+from .facets import product_facets
+from .pagination import ProductPagination
+from .renderers import FastJsonResponse
+from .serializers import ProductDetailSerializer
+from .throttling import ScopedSlidingWindowThrottle
+
+
+CONCURRENCY = getattr(settings, 'ASYNC_VIEW_CONCURRENCY', 20)
+QUEUE_TIMEOUT = getattr(settings, 'ASYNC_VIEW_QUEUE_TIMEOUT', 5)
+
+# один семафор на цикл событий (в каждом процессе ASGI-сервера свой цикл)
+_semaphores = weakref.WeakKeyDictionary()
+
+
+def get_semaphore() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    semaphore = _semaphores.get(loop)
+    if semaphore is None:
+        semaphore = _semaphores[loop] = asyncio.Semaphore(CONCURRENCY)
+    return semaphore
+
+
+def json_response(data, status: int = 200):
+    return FastJsonResponse(data, status=status)
+
+
+def async_get_view(view):
+    """Async view только для GET-запросов с ограничением числа одновременно обрабатываемых запросов.
+    Запросы сверх ASYNC_VIEW_CONCURRENCY ждут не дольше ASYNC_VIEW_QUEUE_TIMEOUT секунд, затем получают 503,
+    поэтому число одновременных запросов к базе из процесса ограничено"""
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method != 'GET':
+            return HttpResponseNotAllowed(['GET'])
+        semaphore = get_semaphore()
+        try:
+            await asyncio.wait_for(semaphore.acquire(), QUEUE_TIMEOUT)
+        except asyncio.TimeoutError:
+            return json_response({'Status': 'Ошибка!', 'Error': 'Сервер перегружен, повторите попытку позже'}, 503)
+        try:
+            return await view(request, *args, **kwargs)
+        finally:
+            semaphore.release()
+    return wrapper
+
+
+async def check_throttle(request: Request, scope: str):
+    """Проверка лимита запросов (как throttle_scope у синхронных view), None - лимит не превышен"""
+    throttle = ScopedSlidingWindowThrottle()
+    if await sync_to_async(throttle.allow_request)(request, SimpleNamespace(throttle_scope=scope)):
+        return None
+    response = json_response({'detail': 'Request was throttled.'}, 429)
+    response['Retry-After'] = str(int(throttle.wait()) + 1)
+    return response
+
+
+@async_get_view
+async def products(request):
+    """Async вариант ProductView (те же параметры и формат ответа)"""
+    request = Request(request, authenticators=())
+    throttled = await check_throttle(request, 'catalog')
+    if throttled is not None:
+        return throttled
+    queryset, ordering = await sync_to_async(product_queryset)(request.query_params)
+    rows, serializer_class = product_listing(queryset, ordering)
+    paginator = ProductPagination()
+    try:
+        page = await paginator.apaginate_queryset(rows, request, SimpleNamespace(keyset_ordering=ordering))
+    except NotFound as error:
+        return json_response({'detail': str(error.detail)}, 404)
+    data = {'next': paginator.get_next_link(),
+            'results': serializer_class(page, many=True, context={'request': request}).data}
+    if request.query_params.get('facets') in ('1', 'true'):
+        data['facets'] = await sync_to_async(product_facets)(queryset)
+    return json_response(data)
+
+
+@async_get_view
+async def product_detail(request, product_id):
+    """Async вариант ProductDetailView"""
+    request = Request(request, authenticators=())
+    throttled = await check_throttle(request, 'catalog')
+    if throttled is not None:
+        return throttled
+    product = await product_detail_queryset().filter(pk=product_id).afirst()
+    if product is None:
+        return json_response({'Status': 'Ошибка!', 'Error': 'Товар не найден'})
+    return json_response(ProductDetailSerializer(product).data)
+
+
+@async_get_view
+async def categories(request):
+    """Async вариант CategoryView"""
+    request = Request(request, authenticators=())
+    throttled = await check_throttle(request, 'catalog')
+    if throttled is not None:
+        return throttled
+    rows, serializer_class = category_listing()
+    return json_response(await sync_to_async(lambda: serializer_class(list(rows), many=True).data)())
+
+
+@async_get_view
+async def basket(request):
+    """Async вариант просмотра корзины (BasketView.get)"""
+    request = Request(request, authenticators=(CachedTokenAuthentication(),))
+    try:
+        user = await sync_to_async(lambda: request.user)()
+    except AuthenticationFailed as error:
+        return json_response({'detail': str(error.detail)}, 401)
+    if not user.is_authenticated:
+        return json_response({'detail': 'Authentication credentials were not provided.'}, 401)
+    throttled = await check_throttle(request, 'user')
+    if throttled is not None:
+        return throttled
+    version = await sync_to_async(basket_version)(user.id)
+    priced = price_basket([item async for item in basket_items(user.id)])
+    await sync_to_async(remember_summary)(user.id, version, priced)
+    return json_response(basket_content(priced))
@@ -0,0 +1,144 @@
+import copy
+import time
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+
+from .models import Shop, ClientContact
+from .caching import shared_cache
+
+
+TOKEN_CACHE_TTL = getattr(settings, 'AUTH_TOKEN_CACHE_TTL', 60)
+TOKEN_CACHE_LOCAL_TTL = getattr(settings, 'AUTH_TOKEN_CACHE_LOCAL_TTL', 10)
+TOKEN_CACHE_SIZE = getattr(settings, 'AUTH_TOKEN_CACHE_SIZE', 10000)
+# общий кеш используется, только если он действительно общий для процессов (redis)
+TOKEN_CACHE_SHARED = getattr(settings, 'AUTH_TOKEN_CACHE_SHARED', True) and shared_cache()
+
+
+class TokenCache:
+
+    """Кеш token -> (пользователь, id магазина, id адреса) с ограниченным размером и временем жизни записей.
+    С общим кешем Django (redis) удаление записи сразу видно всем процессам, иначе кеш хранится
+    в памяти процесса (вытесняются давно не использованные записи), и другие процессы видят выход
+    и изменения пользователя только после истечения записи (короткое время жизни)"""
+
+    def __init__(self, ttl: int, size: int, shared: bool):
+        self.ttl = ttl
+        self.size = size
+        self.shared = shared
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def cache_key(key: str) -> str:
+        return f'auth:token:{key}'
+
+    def get(self, key: str):
+        if self.shared:
+            return cache.get(self.cache_key(key))
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value):
+        if self.shared:
+            cache.set(self.cache_key(key), value, self.ttl)
+            return
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+    def delete(self, keys):
+        if self.shared:
+            cache.delete_many([self.cache_key(key) for key in keys])
+            return
+        with self.lock:
+            for key in keys:
+                self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+token_cache = TokenCache(TOKEN_CACHE_TTL if TOKEN_CACHE_SHARED else TOKEN_CACHE_LOCAL_TTL, TOKEN_CACHE_SIZE,
+                         TOKEN_CACHE_SHARED)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+
+    """Аутентификация по токену (как TokenAuthentication) с кешем token -> пользователь.
+    При промахе кеша пользователь, id его магазина и адреса выбираются одним запросом,
+    при попадании запросов к базе нет. id магазина и адреса доступны как request.user.shop_id
+    и request.user.contact_id (None, если на момент кеширования магазина или адреса не было)"""
+
+    def authenticate_credentials(self, key):
+        entry = token_cache.get(key)
+        if entry is None:
+            token = Token.objects.select_related('user').annotate(
+                shop_id=F('user__shop__id'), contact_id=F('user__clientcontact__id')).filter(key=key).first()
+            if token is None:
+                raise AuthenticationFailed('Invalid token.')
+            entry = (token.user, token.shop_id, token.contact_id)
+            token_cache.set(key, entry)
+
+        user, shop_id, contact_id = entry
+        if not user.is_active:
+            raise AuthenticationFailed('User inactive or deleted.')
+        # копия: изменения пользователя в обработчике запроса не должны попасть в кеш
+        user = copy.copy(user)
+        user.shop_id = shop_id
+        user.contact_id = contact_id
+        return user, key
+
+
+def user_token_keys(user_id: int) -> list:
+    return list(Token.objects.filter(user_id=user_id).values_list('key', flat=True))
+
+
+def invalidate_tokens(keys):
+    """Удаление токенов из кеша после фиксации транзакции"""
+    keys = list(keys)
+    if keys:
+        transaction.on_commit(lambda: token_cache.delete(keys))
+
+
+def invalidate_user_tokens(user_id: int):
+    """Удаление из кеша всех токенов пользователя (после изменения пользователя, его магазина или адреса)"""
+    invalidate_tokens(user_token_keys(user_id))
+
+
+def user_shop(user):
+    """Магазин пользователя: по id из данных аутентификации или, если его нет или магазина не было
+    на момент кеширования (или он с тех пор пересоздан), по владельцу"""
+    shop_id = getattr(user, 'shop_id', None)
+    if shop_id is not None:
+        shop = Shop.objects.filter(pk=shop_id, owner=user).first()
+        if shop is not None:
+            return shop
+    return Shop.objects.filter(owner=user).first()
+
+
+def user_contact_id(user):
+    """id адреса пользователя: из данных аутентификации или, если их нет или адреса не было
+    на момент кеширования, из базы"""
+    contact_id = getattr(user, 'contact_id', None)
+    if contact_id is not None:
+        return contact_id
+    return ClientContact.objects.filter(user=user).values_list('id', flat=True).first()
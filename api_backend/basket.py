@@ -0,0 +1,165 @@
+from django.core.cache import cache
+from django.db import connection, transaction, DataError
+from django.db.models import F, Sum, Count, Window
+
+from .models import Order, OrderItem
+from .caching import catalog_version
+from .pricing import price_items
+
+
+ADD_ITEMS_SQL = '''
+    INSERT INTO api_backend_orderitem (order_id, product_id, quantity)
+    SELECT %s, product.id, item.quantity
+    FROM (VALUES {}) AS item (product_id, quantity)
+    JOIN api_backend_product AS product ON product.id = item.product_id
+    ON CONFLICT (order_id, product_id)
+    DO UPDATE SET quantity = api_backend_orderitem.quantity + EXCLUDED.quantity
+'''
+
+# OrderItem.quantity - integer, id товара - bigint
+MAX_QUANTITY = 2 ** 31 - 1
+MAX_PRODUCT_ID = 2 ** 63 - 1
+
+
+class BasketError(Exception):
+
+    """Ошибка в списке товаров для корзины"""
+
+
+def merge_items(items) -> dict:
+    """Проверка списка товаров из запроса и сложение количества одинаковых товаров: {id товара: количество}"""
+    if not isinstance(items, list) or not items:
+        raise BasketError('Неправильно указан либо отсутствует параметр items')
+    merged = {}
+    for item in items:
+        try:
+            product_id = int(item['product'])
+            quantity = int(item['quantity'])
+        except (KeyError, TypeError, ValueError):
+            raise BasketError('Товар должен быть указан в виде {"product": id, "quantity": количество}')
+        if quantity <= 0:
+            raise BasketError('Количество товара должно быть больше нуля')
+        if not 0 < product_id <= MAX_PRODUCT_ID:
+            raise BasketError('Товар не найден')
+        merged[product_id] = merged.get(product_id, 0) + quantity
+        if merged[product_id] > MAX_QUANTITY:
+            raise BasketError(f'Количество товара должно быть не больше {MAX_QUANTITY}')
+    return merged
+
+
+def add_items(order, items: dict):
+    """Добавление товаров в корзину одним запросом.
+    Если товар уже есть в корзине, количество суммируется в базе (INSERT ... ON CONFLICT),
+    поэтому одновременные запросы не создают дубликатов и не теряют изменения.
+    Если какого-либо товара нет в базе или количество в корзине становится больше MAX_QUANTITY,
+    корзина не изменяется"""
+    values = ', '.join(['(%s::bigint, %s::integer)'] * len(items))
+    params = [order.id]
+    for product_id, quantity in sorted(items.items()):
+        params.extend((product_id, quantity))
+    try:
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(ADD_ITEMS_SQL.format(values), params)
+            if cursor.rowcount != len(items):
+                raise BasketError('Товар не найден')
+    except DataError:
+        # сумма с количеством, уже лежащим в корзине, не помещается в integer
+        raise BasketError(f'Количество товара должно быть не больше {MAX_QUANTITY}')
+    invalidate_summary(order.user_id)
+
+
+def remove_items(order, product_ids) -> int:
+    """Удаление товаров из корзины одним запросом, возвращает количество удаленных позиций"""
+    deleted, _ = OrderItem.objects.filter(order=order, product_id__in=product_ids).delete()
+    if deleted:
+        invalidate_summary(order.user_id)
+    return deleted
+
+
+def user_basket(user_id: int):
+    """Корзина пользователя (у пользователя не больше одной корзины)"""
+    return Order.objects.filter(user_id=user_id, status='basket')
+
+
+def user_orders(user_id: int):
+    """Оформленные заказы пользователя"""
+    return Order.objects.filter(user_id=user_id).exclude(status='basket')
+
+
+def basket_items(user_id: int):
+    """Позиции корзины пользователя вместе с товарами и магазинами и общая сумма корзины
+    (поле total в каждой позиции, SUM в базе) одним запросом"""
+    return OrderItem.objects.filter(order__user_id=user_id, order__status='basket') \
+        .select_related('product__shop') \
+        .annotate(total=Window(Sum(F('product__price_rcc') * F('quantity')))) \
+        .order_by('id')
+
+
+def price_basket(items) -> dict:
+    """Стоимость позиций корзины по уже загруженным товарам (без запросов к базе).
+    Общая сумма - посчитанная в базе (basket_items)"""
+    priced = price_items([(item.product_id, item.quantity) for item in items],
+                         {item.product_id: item.product for item in items})
+    priced['total'] = items[0].total if items else 0
+    return priced
+
+
+def basket_content(priced: dict) -> dict:
+    """Ответ на просмотр корзины"""
+    if not priced['lines'] and not priced['problems']:
+        return {'Status': 'OK', 'Message': 'Корзина пуста'}
+    basket = [
+        {'ID': line['product'].id, 'Товар': line['product'].name,
+         'Цена': line['price'], 'Кол-во': line['quantity']}
+        for line in priced['lines']
+    ]
+    result = {'Status': 'OK', 'Корзина': basket, 'Примерная сумма заказа': priced['total']}
+    if priced['problems']:
+        result['Недоступные товары'] = priced['problems']
+    return result
+
+
+def version_key(user_id: int) -> str:
+    return f'basket:version:{user_id}'
+
+
+def basket_version(user_id: int) -> int:
+    """Версия корзины: увеличивается после каждого изменения корзины"""
+    return cache.get(version_key(user_id), 0)
+
+
+def summary_key(user_id: int, version: int) -> str:
+    # версия каталога в ключе: после загрузки прайс-листа или изменения цены сумма пересчитывается;
+    # версия корзины: итоги, посчитанные до изменения корзины, не попадают в кеш под новым ключом
+    return f'basket:{catalog_version()}:{user_id}:{version}'
+
+
+def basket_summary(user_id: int) -> dict:
+    """Количество позиций, количество товаров и сумма корзины.
+    Хранится в кеше под текущей версией корзины"""
+    key = summary_key(user_id, basket_version(user_id))
+    summary = cache.get(key)
+    if summary is None:
+        summary = OrderItem.objects.filter(order__user_id=user_id, order__status='basket').aggregate(
+            count=Count('id'), pieces=Sum('quantity'), total=Sum(F('product__price_rcc') * F('quantity')))
+        summary = {name: value or 0 for name, value in summary.items()}
+        cache.add(key, summary)
+    return summary
+
+
+def remember_summary(user_id: int, version: int, priced: dict):
+    """Сохранение в кеше итогов корзины, посчитанных при ее полном просмотре.
+    version - версия корзины, прочитанная до загрузки позиций"""
+    cache.add(summary_key(user_id, version), {'count': len(priced['lines']),
+                                              'pieces': sum(line['quantity'] for line in priced['lines']),
+                                              'total': priced['total']})
+
+
+def invalidate_summary(user_id: int):
+    """Новая версия корзины после фиксации транзакции (итоги старой версии больше не читаются)"""
+    def bump():
+        try:
+            cache.incr(version_key(user_id))
+        except ValueError:
+            cache.set(version_key(user_id), 1, timeout=None)
+    transaction.on_commit(bump)
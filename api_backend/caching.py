@@ -0,0 +1,112 @@
+from hashlib import md5
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.redis import RedisCache
+from django.db import transaction
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+
+from .replicas import mark_catalog_changed
+
+
+CATALOG_VERSION_KEY = 'catalog:version'
+
+
+def shared_cache(alias: str = 'default') -> bool:
+    """Кеш общий для всех процессов и серверов (redis), а не отдельный в каждом процессе"""
+    return isinstance(caches[alias], RedisCache)
+
+
+def catalog_version() -> int:
+    """Текущая версия каталога. Входит в ключ кеша ответов,
+    поэтому увеличение версии делает недействительными все сохраненные ответы"""
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        cache.add(CATALOG_VERSION_KEY, 1, timeout=None)
+        version = cache.get(CATALOG_VERSION_KEY, 1)
+    return version
+
+
+def bump_catalog_version(**kwargs):
+    """Увеличение версии каталога после фиксации транзакции
+    (вызывается после загрузки товаров и изменения магазинов, категорий, параметров и товаров)"""
+    def bump():
+        mark_catalog_changed()
+        try:
+            cache.incr(CATALOG_VERSION_KEY)
+        except ValueError:
+            cache.set(CATALOG_VERSION_KEY, 1, timeout=None)
+    transaction.on_commit(bump)
+
+
+def response_cache_key(request) -> str:
+    """Ключ кеша ответа: версия каталога, адрес, формат ответа и упорядоченные параметры запроса"""
+    query = urlencode(sorted((key, sorted(values)) for key, values in request.query_params.lists()), doseq=True)
+    raw = f'{request.get_host()}|{request.path}|{request.accepted_media_type}|{query}'
+    return f'response:{catalog_version()}:{md5(raw.encode()).hexdigest()}'
+
+
+def etag_matches(request, etag: str) -> bool:
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if not if_none_match:
+        return False
+    return if_none_match.strip() == '*' or etag in [tag.strip() for tag in if_none_match.split(',')]
+
+
+class CachedResponse(Exception):
+
+    """Ответ найден в кеше: прерывает обработку запроса до вызова обработчика view"""
+
+    def __init__(self, response):
+        self.response = response
+
+
+class CachedResponseMixin:
+
+    """Кеширование ответов на GET-запросы анонимных пользователей.
+    Ответ сохраняется с ETag, повторный запрос с If-None-Match получает 304 Not Modified.
+    Аутентификация, права и throttling проверяются до обращения к кешу"""
+
+    cache_timeout = getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 300)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.response_cache_key = None
+        if request.method != 'GET' or request.user.is_authenticated:
+            return
+        self.response_cache_key = response_cache_key(request)
+        cached = cache.get(self.response_cache_key)
+        if cached is None:
+            return
+        if etag_matches(request, cached['etag']):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(cached['content'], content_type=cached['content_type'])
+        response['ETag'] = cached['etag']
+        response['X-Cache'] = 'HIT'
+        patch_vary_headers(response, ('Accept', 'Authorization'))
+        raise CachedResponse(response)
+
+    def handle_exception(self, exc):
+        if isinstance(exc, CachedResponse):
+            return exc.response
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        key = getattr(self, 'response_cache_key', None)
+        if key is None or response.status_code != 200 or response.has_header('X-Cache'):
+            return response
+        if hasattr(response, 'render'):
+            response.render()
+        etag = f'"{md5(response.content).hexdigest()}"'
+        cache.set(key, {'content': response.content, 'content_type': response['Content-Type'], 'etag': etag},
+                  self.cache_timeout)
+        if etag_matches(request, etag):
+            response = HttpResponseNotModified()
+        response['ETag'] = etag
+        response['X-Cache'] = 'MISS'
+        patch_vary_headers(response, ('Authorization',))
+        return response
@@ -0,0 +1,63 @@
+from django.db.models import Prefetch
+
+from .models import Category, Product, ProductParameter
+from .search import search_products
+from .facets import param_filters
+from .pagination import ProductPagination
+from .serializers import FAST_SERIALIZERS, CategorySerializer, CategoryValuesSerializer, \
+    ProductSerializer, ProductValuesSerializer
+
+
+def category_queryset():
+    """Категории с товарами (и магазинами товаров) для списка категорий"""
+    return Category.objects.prefetch_related(
+        Prefetch('products', queryset=Product.objects.select_related('shop')))
+
+
+def category_listing():
+    """Категории для списка и сериализатор для них: при FAST_SERIALIZERS - строки values_list
+    и CategoryValuesSerializer, иначе - модели и CategorySerializer"""
+    if FAST_SERIALIZERS:
+        return CategoryValuesSerializer.select(Category.objects.all()), CategoryValuesSerializer
+    return category_queryset(), CategorySerializer
+
+
+def product_queryset(query_params) -> tuple:
+    """Товары активных магазинов, отобранные по параметрам запроса
+    (search, name, category, price_gte, price_lte, param[Название]).
+    Возвращает queryset и ключ сортировки для постраничного вывода (None - ключ по умолчанию)"""
+    queryset = Product.objects.filter(shop__state=True).select_related('category', 'shop')
+    ordering = None
+    search = query_params.get('search')
+    if search:
+        queryset = search_products(queryset, search)
+        ordering = ('-rank', '-id')
+    name = query_params.get('name')
+    category = query_params.get('category')
+    price_gte = query_params.get('price_gte')
+    price_lte = query_params.get('price_lte')
+    if name is not None:
+        queryset = queryset.filter(name__icontains=name)
+    if category is not None:
+        queryset = queryset.filter(category=category)
+    if price_gte is not None:
+        queryset = queryset.filter(price_rcc__gte=price_gte)
+    if price_lte is not None:
+        queryset = queryset.filter(price_rcc__lte=price_lte)
+    return queryset.filter(param_filters(query_params)), ordering
+
+
+def product_listing(queryset, ordering=None):
+    """Товары для постраничного списка и сериализатор для них (как category_listing).
+    В строки values_list добавляются поля ключа сортировки: по ним строится курсор следующей страницы"""
+    if FAST_SERIALIZERS:
+        ordering = ordering or ProductPagination.ordering
+        return ProductValuesSerializer.select(queryset, *(field.lstrip('-') for field in ordering)), \
+            ProductValuesSerializer
+    return queryset, ProductSerializer
+
+
+def product_detail_queryset():
+    """Товар с категорией, магазином и параметрами"""
+    return Product.objects.select_related('category', 'shop').prefetch_related(
+        Prefetch('product_parameters', queryset=ProductParameter.objects.select_related('parameter')))
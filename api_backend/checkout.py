@@ -0,0 +1,96 @@
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import ClientContact, Order, Product
+from .pricing import price_items
+from .basket import user_basket, invalidate_summary
+
+
+RESERVE_SQL = '''
+    UPDATE api_backend_product AS product
+    SET quantity = product.quantity - item.quantity
+    FROM (VALUES {}) AS item (product_id, quantity)
+    WHERE product.id = item.product_id AND product.quantity >= item.quantity
+'''
+
+
+# рекомендательные блокировки (ключ - id магазина): загрузка прайс-листа берет исключительную блокировку
+# своего магазина, оформление заказа - разделяемые блокировки магазинов заказа (заказы друг друга не ждут)
+LOCK_SHOPS_SQL = '''
+    SELECT pg_advisory_xact_lock_shared(shop_id)
+    FROM (SELECT DISTINCT shop_id FROM api_backend_product WHERE id = ANY(%s) ORDER BY shop_id) AS shop
+'''
+
+LOCK_SHOP_SQL = 'SELECT pg_advisory_xact_lock(%s)'
+
+
+class CheckoutError(Exception):
+
+    """Заказ не может быть оформлен. problems - список недоступных товаров с причинами"""
+
+    def __init__(self, message, problems=None):
+        super().__init__(message)
+        self.problems = problems or []
+
+
+def lock_shop_feed(shop_id: int):
+    """Исключительная блокировка магазина на время загрузки прайс-листа (до конца транзакции).
+    Загрузка блокирует строки товаров пакетами в порядке файла, поэтому заказы с товарами магазина
+    ждут ее окончания, а не блокируют товары вперемешку с ней"""
+    with connection.cursor() as cursor:
+        cursor.execute(LOCK_SHOP_SQL, [shop_id])
+
+
+def lock_products(product_ids) -> dict:
+    """Блокировка строк товаров (SELECT ... FOR UPDATE) в порядке возрастания id.
+    Одинаковый порядок блокировок во всех транзакциях исключает взаимные блокировки.
+    Перед этим берутся разделяемые блокировки магазинов товаров (загрузка прайс-листа не идет)"""
+    product_ids = sorted(set(product_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(LOCK_SHOPS_SQL, [product_ids])
+    products = Product.objects.select_for_update(of=('self',)).select_related('shop') \
+        .filter(pk__in=product_ids).order_by('pk')
+    return {product.pk: product for product in products}
+
+
+def lock_contact(user, contact_id: int) -> int:
+    """Блокировка адреса заказа (адрес не удаляется до фиксации заказа).
+    contact_id может быть устаревшим (кеш аутентификации) - тогда используется текущий адрес пользователя"""
+    contacts = ClientContact.objects.select_for_update().filter(user=user).values_list('id', flat=True)
+    locked = contacts.filter(pk=contact_id).first()
+    if locked is None:
+        locked = contacts.first()
+    if locked is None:
+        raise CheckoutError('Для оформления заказа необходимо заполнить адрес')
+    return locked
+
+
+def reserve_stock(items: dict):
+    """Списание остатков товаров одним запросом: {id товара: количество}"""
+    values = ', '.join(['(%s::bigint, %s::integer)'] * len(items))
+    params = []
+    for product_id, quantity in sorted(items.items()):
+        params.extend((product_id, quantity))
+    with connection.cursor() as cursor:
+        cursor.execute(RESERVE_SQL.format(values), params)
+        if cursor.rowcount != len(items):
+            raise CheckoutError('Недостаточно товара')
+
+
+def checkout(user, contact_id: int) -> dict:
+    """Оформление заказа из корзины пользователя в одной транзакции:
+    блокировка корзины и товаров, проверка наличия, списание остатков и смена статуса заказа.
+    При недоступности хотя бы одного товара ничего не изменяется и выбрасывается CheckoutError"""
+    with transaction.atomic():
+        basket = user_basket(user.id).select_for_update().first()
+        items = list(basket.ordered_items.values_list('product_id', 'quantity')) if basket is not None else []
+        if not items:
+            raise CheckoutError('Прежде чем подтвердить заказ, добавьте товары в корзину')
+        contact_id = lock_contact(user, contact_id)
+        priced = price_items(items, lock_products(product_id for product_id, _ in items))
+        if priced['problems']:
+            raise CheckoutError('Некоторые товары недоступны для заказа', priced['problems'])
+        reserve_stock({line['product'].pk: line['quantity'] for line in priced['lines']})
+        Order.objects.filter(pk=basket.pk).update(status='new', date=timezone.now(), contact_id=contact_id)
+        invalidate_summary(user.id)
+    return priced
@@ -0,0 +1,18 @@
+from django.conf import settings
+from django.core.checks import Error, Warning, Tags, register
+
+from .caching import shared_cache
+from .throttling import THROTTLE_CACHE
+
+
+@register(Tags.caches)
+def throttle_cache_check(app_configs, **kwargs):
+    """Счетчики ограничения частоты запросов должны храниться в общем кеше (redis): с отдельным кешем
+    в каждом процессе N процессов пропускают в N раз больше запросов. При DEBUG - только предупреждение"""
+    if shared_cache(THROTTLE_CACHE):
+        return []
+    message = f'Кеш ограничения частоты запросов ({THROTTLE_CACHE}) не общий для процессов'
+    hint = 'Укажите CACHE_BACKEND=redis и CACHE_LOCATION=redis://...'
+    if settings.DEBUG:
+        return [Warning(message, hint=hint, id='api_backend.W001')]
+    return [Error(message, hint=hint, id='api_backend.E001')]
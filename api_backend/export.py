@@ -0,0 +1,76 @@
+import csv
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import OrderItem
+
+
+EXPORT_FORMATS = ('csv', 'jsonl')
+CHUNK_SIZE = 2000
+# заказы моложе EXPORT_DELAY секунд не выгружаются: дата заказа ставится до фиксации транзакции,
+# и заказ, транзакция которого еще не зафиксирована, не должен оказаться раньше курсора выгрузки
+EXPORT_DELAY = getattr(settings, 'EXPORT_DELAY', 60)
+
+EXPORT_FIELDS = {
+    'order': 'order_id',
+    'date': 'order__date',
+    'status': 'order__status',
+    'user': 'order__user__email',
+    'city': 'order__contact__city',
+    'street': 'order__contact__street',
+    'house': 'order__contact__house',
+    'phone': 'order__contact__phone',
+    'external_id': 'product__external_id',
+    'name': 'product__name',
+    'quantity': 'quantity',
+    'price': 'product__price_rcc',
+}
+
+
+class Echo:
+
+    """Псевдо-файл для csv.writer: возвращает записанную строку вместо накопления в памяти"""
+
+    def write(self, value):
+        return value
+
+
+def export_until():
+    """Верхняя граница выгрузки (она же курсор следующей выгрузки)"""
+    return timezone.now() - timedelta(seconds=EXPORT_DELAY)
+
+
+def export_rows(owner, since=None, until=None):
+    """Позиции заказов магазина (кроме корзин) по возрастанию даты заказа.
+    Строки читаются курсором на стороне сервера частями по CHUNK_SIZE, поэтому
+    расход памяти не зависит от размера выгрузки"""
+    items = OrderItem.objects.filter(product__shop__owner=owner).exclude(order__status='basket')
+    if since is not None:
+        items = items.filter(order__date__gt=since)
+    if until is not None:
+        items = items.filter(order__date__lte=until)
+    items = items.order_by('order__date', 'order_id', 'id').values_list(*EXPORT_FIELDS.values())
+    for values in items.iterator(chunk_size=CHUNK_SIZE):
+        row = dict(zip(EXPORT_FIELDS, values))
+        row['total'] = row['price'] * row['quantity']
+        yield row
+
+
+def csv_lines(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow([*EXPORT_FIELDS, 'total'])
+    for row in rows:
+        yield writer.writerow(row.values())
+
+
+def jsonl_lines(rows):
+    for row in rows:
+        yield json.dumps(row, ensure_ascii=False, default=str) + '\n'
+
+
+def export_lines(rows, export_format: str):
+    """Строки файла выгрузки в формате csv или jsonl"""
+    return csv_lines(rows) if export_format == 'csv' else jsonl_lines(rows)
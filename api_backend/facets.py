@@ -0,0 +1,59 @@
+from django.db import connection
+from django.db.models import Q
+
+
+PARAM_PREFIX = 'param['
+
+REFRESH_PARAMS_SQL = '''
+    UPDATE api_backend_product AS p
+    SET params = COALESCE((
+        SELECT jsonb_object_agg(pa.name, pp.value)
+        FROM api_backend_productparameter AS pp
+        JOIN api_backend_parameter AS pa ON pa.id = pp.parameter_id
+        WHERE pp.product_id = p.id
+    ), '{}'::jsonb)
+    WHERE p.id = ANY(%s)
+'''
+
+FACETS_SQL = '''
+    SELECT kv.key, kv.value, count(*)
+    FROM ({}) AS products, jsonb_each_text(products.params) AS kv
+    GROUP BY kv.key, kv.value
+    ORDER BY kv.key, count(*) DESC, kv.value
+'''
+
+
+def refresh_params(product_ids):
+    """Пересчет денормализованных параметров товаров (Product.params) из ProductParameter одним запросом"""
+    product_ids = list(product_ids)
+    if not product_ids:
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(REFRESH_PARAMS_SQL, [product_ids])
+
+
+def param_filters(query_params) -> Q:
+    """Условие отбора товаров по параметрам вида ?param[Название]=значение.
+    Несколько значений одного параметра объединяются через ИЛИ, разные параметры - через И"""
+    condition = Q()
+    for key in query_params:
+        if not (key.startswith(PARAM_PREFIX) and key.endswith(']')):
+            continue
+        name = key[len(PARAM_PREFIX):-1]
+        values = Q()
+        for value in query_params.getlist(key):
+            values |= Q(params__contains={name: value})
+        condition &= values
+    return condition
+
+
+def product_facets(queryset) -> dict:
+    """Количество товаров по каждому значению каждого параметра для текущей выборки.
+    Считается по денормализованному полю Product.params, без соединения с ProductParameter"""
+    sql, params = queryset.order_by().values('params').query.sql_with_params()
+    facets = {}
+    with connection.cursor() as cursor:
+        cursor.execute(FACETS_SQL.format(sql), params)
+        for name, value, count in cursor.fetchall():
+            facets.setdefault(name, {})[value] = count
+    return facets
@@ -0,0 +1,155 @@
+import json
+import hashlib
+import tempfile
+from contextlib import closing
+
+import requests
+from yaml import ScalarNode, AliasEvent, ScalarEvent, SequenceStartEvent, SequenceEndEvent, \
+    MappingStartEvent, MappingEndEvent, StreamStartEvent, DocumentStartEvent, YAMLError
+
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
+
+CHUNK_SIZE = 64 * 1024
+
+SPOOL_SIZE = 4 * 1024 * 1024
+
+# ожидание подключения и очередной порции данных от сервера магазина, секунды
+TIMEOUT = (10, 60)
+
+FEED_FORMATS = ('yaml', 'jsonl')
+
+
+class PriceListError(Exception):
+
+    """Ошибка в содержимом прайс-листа"""
+
+
+def download_feed(url: str, headers: dict = None):
+    """Загрузка файла по url блоками по CHUNK_SIZE байт во временный файл с подсчетом sha256.
+    Файл хранится в памяти до SPOOL_SIZE байт, дальше - на диске.
+    Файл загружается целиком до разбора (а не разбирается по мере загрузки), потому что хеш содержимого
+    известен только в конце: если файл не изменился, он не разбирается и база не изменяется вовсе,
+    а обрыв соединения не прерывает загрузку товаров на середине. Цена - место на диске под файл
+    и задержка перед разбором; память по-прежнему ограничена SPOOL_SIZE.
+    Возвращает ответ requests, файл и хеш содержимого
+    (файл и хеш - None, если сервер ответил 304 Not Modified).
+    Ошибки соединения, таймауты (TIMEOUT) и ответы с кодом ошибки - PriceListError"""
+    file = None
+    try:
+        response = requests.get(url, headers=headers or {}, stream=True, timeout=TIMEOUT)
+        with closing(response):
+            if response.status_code == 304:
+                return response, None, None
+            response.raise_for_status()
+            digest = hashlib.sha256()
+            file = tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE)
+            for chunk in response.iter_content(CHUNK_SIZE):
+                digest.update(chunk)
+                file.write(chunk)
+    except requests.RequestException as e:
+        if file is not None:
+            file.close()
+        raise PriceListError(f'Ошибка загрузки файла: {e}')
+    file.seek(0)
+    return response, file, digest.hexdigest()
+
+
+def detect_format(url: str, feed_format: str = None) -> str:
+    """Определение формата прайс-листа: явно указанный или по расширению файла"""
+    if feed_format:
+        if feed_format not in FEED_FORMATS:
+            raise PriceListError(f'Неизвестный формат файла: {feed_format}')
+        return feed_format
+    if url.split('?')[0].lower().endswith(('.jsonl', '.ndjson')):
+        return 'jsonl'
+    return 'yaml'
+
+
+def build_object(loader, event, anchors: dict):
+    """Сборка python-объекта из событий парсера yaml"""
+    if isinstance(event, AliasEvent):
+        if event.anchor not in anchors:
+            raise PriceListError(f'Неизвестная ссылка: {event.anchor}')
+        return anchors[event.anchor]
+    if isinstance(event, ScalarEvent):
+        tag = event.tag
+        if tag is None or tag == '!':
+            tag = loader.resolve(ScalarNode, event.value, event.implicit)
+        value = loader.construct_object(ScalarNode(tag, event.value, style=event.style))
+    elif isinstance(event, SequenceStartEvent):
+        value = []
+        while not loader.check_event(SequenceEndEvent):
+            value.append(build_object(loader, loader.get_event(), anchors))
+        loader.get_event()
+    elif isinstance(event, MappingStartEvent):
+        value = {}
+        while not loader.check_event(MappingEndEvent):
+            key = build_object(loader, loader.get_event(), anchors)
+            value[key] = build_object(loader, loader.get_event(), anchors)
+        loader.get_event()
+    else:
+        raise PriceListError(f'Неожиданный элемент в файле: {event}')
+    if event.anchor is not None:
+        anchors[event.anchor] = value
+    return value
+
+
+def iter_yaml_feed(stream):
+    """Потоковый разбор yaml-файла прайс-листа.
+    Файл разбирается по событиям парсера, товары из списка goods
+    возвращаются по одному: ('shop', название) и ('good', товар)"""
+    loader = SafeLoader(stream)
+    anchors = {}
+    try:
+        for event_class in (StreamStartEvent, DocumentStartEvent, MappingStartEvent):
+            if not loader.check_event(event_class):
+                raise PriceListError('Файл должен содержать словарь с ключами shop и goods')
+            loader.get_event()
+        while not loader.check_event(MappingEndEvent):
+            key = build_object(loader, loader.get_event(), anchors)
+            if key == 'goods' and loader.check_event(SequenceStartEvent):
+                loader.get_event()
+                while not loader.check_event(SequenceEndEvent):
+                    yield 'good', build_object(loader, loader.get_event(), anchors)
+                    loader.constructed_objects.clear()
+                loader.get_event()
+                yield 'goods_end', None
+            else:
+                yield key, build_object(loader, loader.get_event(), anchors)
+    except YAMLError as e:
+        raise PriceListError(f'Ошибка разбора файла: {e}')
+    finally:
+        loader.dispose()
+
+
+def iter_jsonl_feed(stream):
+    """Потоковый разбор прайс-листа в формате JSON Lines.
+    Первая непустая строка - {"shop": название}, каждая следующая строка - один товар"""
+    first = True
+    for number, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            raise PriceListError(f'Ошибка разбора строки {number}: {e}')
+        if not isinstance(record, dict):
+            raise PriceListError(f'Ошибка разбора строки {number}: ожидается объект')
+        if first and set(record) == {'shop'}:
+            yield 'shop', record['shop']
+        else:
+            yield 'good', record
+        first = False
+    yield 'goods_end', None
+
+
+def iter_feed(stream, feed_format: str):
+    """Потоковый разбор прайс-листа в указанном формате"""
+    if feed_format == 'jsonl':
+        return iter_jsonl_feed(stream)
+    return iter_yaml_feed(stream)
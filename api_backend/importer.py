@@ -0,0 +1,250 @@
+import json
+import hashlib
+
+from django.db import transaction
+
+from .validation import check_shop
+from .feeds import PriceListError, download_feed, detect_format, iter_feed
+from .interning import category_names, parameter_names, preload_names
+from .search import update_search_vectors
+from .facets import refresh_params
+from .caching import bump_catalog_version
+from .checkout import lock_shop_feed
+from .authentication import user_shop
+from .models import Shop, Product, ProductParameter
+
+
+PRODUCT_FIELDS = ('name', 'brand', 'model', 'category_id', 'quantity', 'price', 'price_rcc', 'content_hash')
+
+# остаток в отпечаток не входит: он меняется заказами, а из прайс-листа записывается всегда
+HASHED_FIELDS = ('name', 'brand', 'model', 'category', 'price', 'price_rcc')
+
+BATCH_SIZE = 1000
+
+
+def new_counters() -> dict:
+    """Счетчики результата загрузки товаров"""
+    return {
+        'products': {'inserted': 0, 'updated': 0, 'unchanged': 0},
+        'parameters': {'inserted': 0, 'updated': 0, 'unchanged': 0},
+    }
+
+
+def product_values(product: dict, categories: dict) -> dict:
+    """Значения полей товара из записи прайс-листа"""
+    return {
+        'name': product.get('name'),
+        'brand': product.get('brand'),
+        'model': product.get('model'),
+        'category_id': categories.get(product.get('category')),
+        'quantity': product.get('quantity'),
+        'price': product.get('price'),
+        'price_rcc': product.get('price_rcc'),
+    }
+
+
+def content_hash(product: dict) -> str:
+    """Отпечаток содержимого товара из прайс-листа (поля и параметры)"""
+    data = [product.get(field) for field in HASHED_FIELDS]
+    data.append(sorted((str(name), str(value)) for name, value in (product.get('parameters') or {}).items()))
+    return hashlib.sha1(json.dumps(data, ensure_ascii=False, default=str).encode()).hexdigest()
+
+
+def shop_products(shop, external_ids):
+    """Товары магазина по внешним id"""
+    return Product.objects.filter(shop=shop, external_id__in=external_ids)
+
+
+def import_products(shop, products: list) -> dict:
+    """Загрузка товаров магазина из прайс-листа.
+    Прайс-лист сравнивается с уже существующими записями, изменения применяются
+    пакетно (bulk_create/bulk_update) в одной транзакции, поэтому количество
+    запросов к базе не зависит от количества товаров.
+    Товары, отпечаток содержимого которых (content_hash) не изменился, не перезаписываются,
+    у них обновляется только остаток (quantity), если он отличается от прайс-листа"""
+    counters = new_counters()
+
+    goods = {}
+    for product in products:
+        goods[product['external_id']] = product
+    if not goods:
+        return counters
+
+    with transaction.atomic():
+        # строки пакета блокируются сразу и в порядке id, как при оформлении заказа
+        existing = {p.external_id: p for p in shop_products(shop, goods.keys()).select_for_update().order_by('pk')}
+
+        hashes = {external_id: content_hash(product) for external_id, product in goods.items()}
+        changed = {}
+        restocked = []
+        for external_id, product in sorted(goods.items()):
+            current = existing.get(external_id)
+            if current is not None and current.content_hash == hashes[external_id]:
+                counters['parameters']['unchanged'] += len(product.get('parameters') or {})
+                if current.quantity == product.get('quantity'):
+                    counters['products']['unchanged'] += 1
+                    continue
+                current.quantity = product.get('quantity')
+                restocked.append(current)
+            else:
+                changed[external_id] = product
+        if restocked:
+            Product.objects.bulk_update(restocked, ('quantity',))
+            counters['products']['updated'] += len(restocked)
+        if not changed:
+            if restocked:
+                bump_catalog_version()
+            return counters
+
+        categories = category_names.resolve({p.get('category') for p in changed.values()})
+        parameters = parameter_names.resolve({str(name) for p in changed.values()
+                                              for name in (p.get('parameters') or {})})
+
+        to_create = []
+        to_update = []
+        for external_id, product in changed.items():
+            values = product_values(product, categories)
+            values['content_hash'] = hashes[external_id]
+            current = existing.get(external_id)
+            if current is None:
+                to_create.append(Product(shop=shop, external_id=external_id, **values))
+                continue
+            for field, value in values.items():
+                setattr(current, field, value)
+            to_update.append(current)
+
+        if to_create:
+            for obj in Product.objects.bulk_create(to_create):
+                existing[obj.external_id] = obj
+        if to_update:
+            Product.objects.bulk_update(to_update, PRODUCT_FIELDS)
+        update_search_vectors([existing[external_id].id for external_id in changed])
+        counters['products']['inserted'] = len(to_create)
+        counters['products']['updated'] += len(to_update)
+
+        current_params = {
+            (pp.product_id, pp.parameter_id): pp
+            for pp in ProductParameter.objects.filter(product_id__in=[p.id for p in to_update])
+        }
+        params_to_create = []
+        params_to_update = []
+        for external_id, product in changed.items():
+            product_id = existing[external_id].id
+            for pname, pvalue in (product.get('parameters') or {}).items():
+                parameter_id = parameters[str(pname)]
+                value = str(pvalue)
+                current = current_params.get((product_id, parameter_id))
+                if current is None:
+                    params_to_create.append(ProductParameter(product_id=product_id,
+                                                             parameter_id=parameter_id, value=value))
+                elif current.value != value:
+                    current.value = value
+                    params_to_update.append(current)
+                else:
+                    counters['parameters']['unchanged'] += 1
+
+        if params_to_create:
+            ProductParameter.objects.bulk_create(params_to_create)
+        if params_to_update:
+            ProductParameter.objects.bulk_update(params_to_update, ('value',))
+        refresh_params(existing[external_id].id for external_id in changed)
+        bump_catalog_version()
+        counters['parameters']['inserted'] = len(params_to_create)
+        counters['parameters']['updated'] = len(params_to_update)
+
+    return counters
+
+
+def get_shop(user, shop_name):
+    """Получение магазина пользователя по названию из прайс-листа"""
+    if shop_name is None:
+        raise PriceListError('Отсутствует название магазина')
+    if check_shop(user, shop_name) is False:
+        raise PriceListError('Неправильное название магазина')
+    shop, _ = Shop.objects.get_or_create(name=shop_name, owner=user)
+    return shop
+
+
+def merge_counters(total: dict, counters: dict):
+    """Суммирование счетчиков результата загрузки"""
+    for table, values in counters.items():
+        for key, value in values.items():
+            total[table][key] += value
+
+
+def feed_headers(shop, url: str) -> dict:
+    """Заголовки условного запроса (ETag/Last-Modified) для повторной загрузки того же файла"""
+    headers = {}
+    if shop is None or shop.feed_url != url:
+        return headers
+    if shop.feed_etag:
+        headers['If-None-Match'] = shop.feed_etag
+    if shop.feed_last_modified:
+        headers['If-Modified-Since'] = shop.feed_last_modified
+    return headers
+
+
+def load_price_list(user, url: str, progress=None, feed_format: str = None) -> dict:
+    """Загрузка прайс-листа магазина по url.
+    Файл не загружается повторно, если сервер ответил 304 Not Modified на условный запрос
+    или хеш содержимого совпадает с хешем последнего загруженного файла магазина.
+    Файл разбирается потоково, товары записываются в базу пакетами по BATCH_SIZE,
+    поэтому расход памяти не зависит от размера файла. Все пакеты записываются в одной транзакции:
+    при ошибке в середине файла прайс-лист не применяется частично.
+    Название магазина (shop) должно находиться в файле перед списком товаров (goods).
+    progress - необязательная функция progress(phase, processed) для отслеживания хода загрузки"""
+    feed_format = detect_format(url, feed_format)
+    if progress is not None:
+        progress('downloading', 0)
+
+    counters = new_counters()
+    shop = user_shop(user)
+    response, file, digest = download_feed(url, feed_headers(shop, url))
+    if file is None or (shop is not None and shop.feed_hash == digest):
+        counters['feed'] = 'unchanged'
+        return counters
+
+    preload_names()
+    shop = None
+    goods_found = False
+    processed = 0
+    batch = []
+
+    def flush():
+        nonlocal processed
+        merge_counters(counters, import_products(shop, batch))
+        processed += len(batch)
+        batch.clear()
+        if progress is not None:
+            progress('importing', processed)
+
+    with file, transaction.atomic():
+        if progress is not None:
+            progress('parsing', 0)
+        for key, value in iter_feed(file, feed_format):
+            if key == 'shop':
+                shop = get_shop(user, value)
+                lock_shop_feed(shop.pk)
+            elif key == 'good':
+                if shop is None:
+                    raise PriceListError('Отсутствует название магазина')
+                batch.append(value)
+                if len(batch) >= BATCH_SIZE:
+                    flush()
+            elif key == 'goods_end':
+                goods_found = True
+        if shop is None:
+            raise PriceListError('Отсутствует название магазина')
+        if not goods_found:
+            raise PriceListError('Отсутствует список товаров')
+        if batch:
+            flush()
+
+        Shop.objects.filter(pk=shop.pk).update(
+            feed_url=url,
+            feed_etag=response.headers.get('ETag', ''),
+            feed_last_modified=response.headers.get('Last-Modified', ''),
+            feed_hash=digest
+        )
+    counters['feed'] = 'updated'
+    return counters
@@ -0,0 +1,72 @@
+import threading
+
+from django.db import transaction
+
+from .models import Category, Parameter
+
+
+class NameCache:
+
+    """Кеш соответствия название -> id для справочных таблиц (Category, Parameter).
+    Один экземпляр на процесс, общий для всех потоков. Новые записи попадают в кеш
+    только после фиксации транзакции, уникальность названий обеспечивается ограничением в базе"""
+
+    def __init__(self, model):
+        self.model = model
+        self.ids = {}
+        self.lock = threading.Lock()
+
+    def preload(self):
+        """Загрузка всех записей таблицы одним запросом"""
+        ids = dict(self.model.objects.values_list('name', 'id'))
+        with self.lock:
+            self.ids = ids
+
+    def invalidate(self):
+        """Очистка кеша (после изменения записей вне загрузки товаров)"""
+        with self.lock:
+            self.ids = {}
+
+    def remember(self, ids: dict):
+        with self.lock:
+            self.ids.update(ids)
+
+    def resolve(self, names: set) -> dict:
+        """Получение id записей по названиям.
+        Отсутствующие в кеше названия выбираются из базы, отсутствующие в базе - создаются"""
+        result = {}
+        missing = []
+        with self.lock:
+            for name in names:
+                obj_id = self.ids.get(name)
+                if obj_id is None:
+                    missing.append(name)
+                else:
+                    result[name] = obj_id
+        if not missing:
+            return result
+
+        found = dict(self.model.objects.filter(name__in=missing).values_list('name', 'id'))
+        to_create = [name for name in missing if name not in found]
+        if to_create:
+            self.model.objects.bulk_create([self.model(name=name) for name in to_create], ignore_conflicts=True)
+            found.update(self.model.objects.filter(name__in=to_create).values_list('name', 'id'))
+        transaction.on_commit(lambda: self.remember(found))
+        result.update(found)
+        return result
+
+
+category_names = NameCache(Category)
+parameter_names = NameCache(Parameter)
+
+
+def preload_names():
+    """Загрузка кешей справочников перед загрузкой прайс-листа"""
+    category_names.preload()
+    parameter_names.preload()
+
+
+def invalidate_names(**kwargs):
+    """Очистка кешей справочников (обработчик сигналов post_save/post_delete)"""
+    category_names.invalidate()
+    parameter_names.invalidate()
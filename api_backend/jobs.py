@@ -0,0 +1,97 @@
+import time
+import logging
+import multiprocessing
+
+from django.db import transaction, connections
+from django.utils import timezone
+
+from .models import ImportJob
+from .importer import load_price_list, PriceListError
+
+
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL = 1.0
+
+
+def claim_job():
+    """Получение следующей задачи из очереди.
+    Строка блокируется через SELECT ... FOR UPDATE SKIP LOCKED, поэтому несколько
+    процессов не получат одну и ту же задачу"""
+    with transaction.atomic():
+        job = ImportJob.objects.select_for_update(skip_locked=True, of=('self',)).filter(
+            phase='queued').select_related('user').order_by('id').first()
+        if job is None:
+            return None
+        job.phase = 'downloading'
+        job.started_at = timezone.now()
+        job.save(update_fields=('phase', 'started_at'))
+    return job
+
+
+PROGRESS_SQL = 'UPDATE api_backend_importjob SET phase = %s, processed = %s WHERE id = %s'
+
+
+def run_job(job: ImportJob) -> ImportJob:
+    """Выполнение задачи загрузки товаров.
+    Загрузка выполняется в одной транзакции, поэтому ход загрузки записывается через отдельное
+    соединение с базой: иначе он стал бы виден только после окончания загрузки"""
+    progress_connection = connections.create_connection('default')
+
+    def progress(phase, processed):
+        job.processed = processed
+        with progress_connection.cursor() as cursor:
+            cursor.execute(PROGRESS_SQL, [phase, processed, job.pk])
+
+    try:
+        job.result = load_price_list(job.user, job.url, progress=progress,
+                                     feed_format=job.feed_format or None)
+        job.phase = 'done'
+    except PriceListError as e:
+        job.phase = 'failed'
+        job.error = str(e)
+    except Exception as e:
+        logger.exception('Import job %s failed', job.pk)
+        job.phase = 'failed'
+        job.error = repr(e)
+    finally:
+        progress_connection.close()
+    job.finished_at = timezone.now()
+    job.save(update_fields=('phase', 'result', 'error', 'processed', 'finished_at'))
+    return job
+
+
+def run_pending_jobs() -> int:
+    """Выполнение всех задач, находящихся в очереди. Возвращает количество выполненных задач"""
+    count = 0
+    job = claim_job()
+    while job is not None:
+        run_job(job)
+        count += 1
+        job = claim_job()
+    return count
+
+
+def worker_loop(poll_interval: float = POLL_INTERVAL, once: bool = False):
+    """Основной цикл процесса-обработчика задач"""
+    while True:
+        count = run_pending_jobs()
+        if once:
+            return
+        if count == 0:
+            time.sleep(poll_interval)
+
+
+def start_workers(processes: int, poll_interval: float = POLL_INTERVAL, once: bool = False):
+    """Запуск пула процессов-обработчиков задач загрузки"""
+    connections.close_all()
+    workers = [multiprocessing.Process(target=worker_loop, args=(poll_interval, once), daemon=True)
+               for _ in range(processes)]
+    for worker in workers:
+        worker.start()
+    try:
+        for worker in workers:
+            worker.join()
+    except KeyboardInterrupt:
+        for worker in workers:
+            worker.terminate()
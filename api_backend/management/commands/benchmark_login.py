@@ -0,0 +1,52 @@
+import time
+import uuid
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from rest_framework.test import APIRequestFactory
+
+from api_backend.models import UserModel
+from api_backend.views import AccountLogin
+
+
+class Command(BaseCommand):
+
+    help = 'Замер количества входов (user/login/) в секунду в одном процессе'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Количество запросов')
+        parser.add_argument('--threads', type=int, default=4, help='Количество одновременных запросов')
+        parser.add_argument('--wrong-password', action='store_true',
+                            help='Входить с неправильным паролем (перебор паролей)')
+
+    def handle(self, *args, **options):
+        email = f'benchmark-{uuid.uuid4().hex}@example.com'
+        password = uuid.uuid4().hex
+        user = UserModel.objects.create_user(email=email, password=password)
+        data = {'email': email, 'password': 'wrong' if options['wrong_password'] else password}
+        # throttling отключен: замеряется стоимость самого входа
+        view = AccountLogin.as_view(throttle_classes=())
+        factory = APIRequestFactory()
+
+        def login(_):
+            started = time.perf_counter()
+            try:
+                view(factory.post('/api/v1/user/login/', data, format='json'))
+            finally:
+                connection.close()
+            return time.perf_counter() - started
+
+        try:
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=options['threads']) as pool:
+                timings = sorted(pool.map(login, range(options['requests'])))
+            elapsed = time.perf_counter() - started
+        finally:
+            user.delete()
+
+        self.stdout.write(f'Запросов: {len(timings)}, потоков: {options["threads"]}, время: {elapsed:.2f} с')
+        self.stdout.write(f'Входов в секунду: {len(timings) / elapsed:.1f}')
+        self.stdout.write(f'Время ответа: медиана {statistics.median(timings) * 1000:.1f} мс, '
+                          f'95% {timings[int(len(timings) * 0.95) - 1] * 1000:.1f} мс')
@@ -0,0 +1,82 @@
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from api_backend.models import UserModel, Shop, Category, Product
+from api_backend.renderers import FastJSONRenderer, orjson
+from api_backend.serializers import ProductSerializer, ProductValuesSerializer
+
+
+class Rollback(Exception):
+
+    """Отмена транзакции с тестовым каталогом"""
+
+
+class Command(BaseCommand):
+
+    help = 'Сравнение скорости сериализации (ModelSerializer и values_list) и кодирования JSON (json и orjson)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=10000, help='Количество товаров в тестовом каталоге')
+        parser.add_argument('--repeat', type=int, default=5, help='Количество повторов каждого замера')
+
+    def measure(self, name: str, func, rows: int, repeat: int):
+        best = min(self.timed(func) for _ in range(repeat))
+        self.stdout.write(f'{name:<45} {best * 1000:8.1f} мс  {rows / best:10.0f} товаров/с')
+        return best
+
+    @staticmethod
+    def timed(func) -> float:
+        started = time.perf_counter()
+        func()
+        return time.perf_counter() - started
+
+    def handle(self, *args, **options):
+        count, repeat = options['products'], options['repeat']
+        try:
+            # тестовый каталог создается в транзакции и удаляется откатом
+            with transaction.atomic():
+                shop = self.create_catalog(count)
+                self.run(shop, count, repeat)
+                raise Rollback
+        except Rollback:
+            pass
+
+    @staticmethod
+    def create_catalog(count: int):
+        suffix = uuid.uuid4().hex[:8]
+        owner = UserModel.objects.create_user(email=f'benchmark-{suffix}@example.com', type='shop')
+        shop = Shop.objects.create(name=f'Benchmark {suffix}', owner=owner)
+        categories = Category.objects.bulk_create(Category(name=f'benchmark-{suffix}-{n}') for n in range(20))
+        Product.objects.bulk_create(
+            (Product(name=f'Товар {n}', brand='Бренд', model=f'M{n}', shop=shop, category=categories[n % 20],
+                     external_id=n, quantity=n % 50, price=1000 + n, price_rcc=1500 + n) for n in range(count)),
+            batch_size=2000)
+        return shop
+
+    def run(self, shop, count: int, repeat: int):
+        products = Product.objects.filter(shop=shop).select_related('category', 'shop')
+        instances = list(products)
+        rows = list(ProductValuesSerializer.select(products))
+        model_data = ProductSerializer(instances, many=True).data
+        values_data = ProductValuesSerializer(rows, many=True).data
+
+        self.stdout.write(f'Товаров: {count}, orjson: {"да" if orjson is not None else "нет (стандартный json)"}')
+        self.stdout.write('Выборка и сериализация:')
+        model = self.measure('  ModelSerializer (select_related)',
+                             lambda: ProductSerializer(list(products), many=True).data, count, repeat)
+        values = self.measure('  ProductValuesSerializer (values_list)',
+                              lambda: ProductValuesSerializer(list(ProductValuesSerializer.select(products)),
+                                                              many=True).data, count, repeat)
+        self.stdout.write('Только сериализация (строки уже выбраны):')
+        self.measure('  ModelSerializer', lambda: ProductSerializer(instances, many=True).data, count, repeat)
+        self.measure('  ProductValuesSerializer', lambda: ProductValuesSerializer(rows, many=True).data,
+                     count, repeat)
+        self.stdout.write('Кодирование JSON:')
+        json_time = self.measure('  JSONRenderer (json)', lambda: JSONRenderer().render(model_data), count, repeat)
+        fast_time = self.measure('  FastJSONRenderer', lambda: FastJSONRenderer().render(values_data), count, repeat)
+        self.stdout.write(f'Ускорение: сериализация x{model / values:.1f}, кодирование x{json_time / fast_time:.1f}, '
+                          f'всего x{(model + json_time) / (values + fast_time):.1f}')
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from api_backend.jobs import start_workers, POLL_INTERVAL
+
+
+class Command(BaseCommand):
+
+    help = 'Запуск процессов-обработчиков фоновых загрузок товаров'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=2, help='Количество процессов')
+        parser.add_argument('--poll-interval', type=float, default=POLL_INTERVAL,
+                            help='Интервал опроса очереди (сек)')
+        parser.add_argument('--once', action='store_true',
+                            help='Выполнить задачи из очереди и завершить работу')
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'Запуск обработчиков загрузок: {options["processes"]}')
+        start_workers(options['processes'], options['poll_interval'], options['once'])
@@ -0,0 +1,78 @@
+import time
+import asyncio
+import statistics
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+async def fetch(host: str, port: int, target: str, connections: dict) -> int:
+    """GET-запрос по HTTP/1.1 с keep-alive, возвращает код ответа"""
+    reader, writer = connections.get('stream') or await asyncio.open_connection(host, port)
+    connections['stream'] = (reader, writer)
+    writer.write(f'GET {target} HTTP/1.1\r\nHost: {host}:{port}\r\nConnection: keep-alive\r\n\r\n'.encode())
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length, chunked = 0, False
+    while (line := await reader.readline()) not in (b'\r\n', b''):
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.lower() == 'content-length':
+            length = int(value)
+        elif name.lower() == 'transfer-encoding' and 'chunked' in value.lower():
+            chunked = True
+    if chunked:
+        while size := int((await reader.readline()).split(b';')[0], 16):
+            await reader.readexactly(size + 2)
+        await reader.readline()
+    else:
+        await reader.readexactly(length)
+    return status
+
+
+class Command(BaseCommand):
+
+    help = 'Нагрузочный тест GET-запросами: запросов в секунду и время ответа (медиана, 99%)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('url', nargs='+', help='Адреса, например http://127.0.0.1:8000/api/v1/products/')
+        parser.add_argument('--requests', type=int, default=2000, help='Количество запросов на каждый адрес')
+        parser.add_argument('--concurrency', type=int, default=100, help='Количество одновременных соединений')
+
+    async def run(self, url: str, requests: int, concurrency: int):
+        parts = urlsplit(url)
+        target = parts.path + (f'?{parts.query}' if parts.query else '')
+        timings, statuses = [], {}
+        queue = iter(range(requests))
+
+        async def worker():
+            connections = {}
+            for _ in queue:
+                started = time.perf_counter()
+                try:
+                    status = await fetch(parts.hostname, parts.port or 80, target, connections)
+                except (OSError, ValueError, IndexError, asyncio.IncompleteReadError):
+                    status = 'error'
+                    # после ошибки соединение открывается заново
+                    stream = connections.pop('stream', None)
+                    if stream is not None:
+                        stream[1].close()
+                timings.append(time.perf_counter() - started)
+                statuses[status] = statuses.get(status, 0) + 1
+            if 'stream' in connections:
+                connections['stream'][1].close()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return time.perf_counter() - started, sorted(timings), statuses
+
+    def handle(self, *args, **options):
+        for url in options['url']:
+            if urlsplit(url).scheme != 'http':
+                raise CommandError(f'Поддерживаются только адреса http://: {url}')
+            elapsed, timings, statuses = asyncio.run(self.run(url, options['requests'], options['concurrency']))
+            self.stdout.write(url)
+            self.stdout.write(f'  Запросов: {len(timings)}, соединений: {options["concurrency"]}, '
+                              f'время: {elapsed:.2f} с, ответы: {statuses}')
+            self.stdout.write(f'  Запросов в секунду: {len(timings) / elapsed:.1f}')
+            self.stdout.write(f'  Время ответа: медиана {statistics.median(timings) * 1000:.1f} мс, '
+                              f'99% {timings[max(int(len(timings) * 0.99) - 1, 0)] * 1000:.1f} мс')
@@ -0,0 +1,252 @@
+import time
+import logging
+import threading
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from .postgresql_pool.base import pool_stats
+
+
+logger = logging.getLogger(__name__)
+
+METRICS_ENABLED = getattr(settings, 'METRICS_ENABLED', True)
+# столько повторов одного запроса за обработку одного HTTP-запроса записывается в лог как вероятный N+1
+DUPLICATE_QUERIES_WARNING = getattr(settings, 'METRICS_DUPLICATE_QUERIES_WARNING', 10)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+# метрики запроса, который обрабатывается в текущем контексте
+current_metrics = ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+
+    """Метрики обработки одного запроса: SQL-запросы (количество, время, повторы) и время сериализации"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.serialization_time = 0.0
+        self.statements = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        # обертка выполнения запроса (connection.execute_wrapper)
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.queries += 1
+            self.statements[sql] = self.statements.get(sql, 0) + 1
+
+    @property
+    def duplicates(self) -> int:
+        """Сколько запросов повторяют уже выполненный запрос с тем же текстом (отличаются только параметры)"""
+        return self.queries - len(self.statements)
+
+    def most_repeated(self) -> tuple:
+        return max(self.statements.items(), key=lambda item: item[1], default=('', 0))
+
+
+def record_query(execute, sql, params, many, context):
+    """Обертка выполнения запросов в каждом соединении (connection.execute_wrappers): запрос
+    учитывается в метриках текущего HTTP-запроса. Метрики берутся из ContextVar, поэтому учитываются
+    и запросы, выполненные в других потоках (sync_to_async под ASGI)"""
+    metrics = current_metrics.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    return metrics(execute, sql, params, many, context)
+
+
+def install_query_metrics(sender, connection, **kwargs):
+    """Обработчик connection_created: обертка record_query в начало списка (внешняя),
+    чтобы не мешать временным оберткам connection.execute_wrapper()"""
+    if METRICS_ENABLED and record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, record_query)
+
+
+def record_serialization(started: float):
+    """Добавление времени сериализации (с момента started) к метрикам текущего запроса"""
+    metrics = current_metrics.get()
+    if metrics is not None:
+        metrics.serialization_time += time.perf_counter() - started
+
+
+def format_labels(labels: tuple, names: tuple) -> str:
+    return ','.join('{}="{}"'.format(name, str(value).replace('\\', '\\\\').replace('"', '\\"'))
+                    for name, value in zip(names, labels))
+
+
+class Histogram:
+
+    """Гистограмма в памяти процесса с выводом в текстовом формате Prometheus"""
+
+    def __init__(self, name: str, description: str, buckets: tuple, labels=('endpoint', 'method')):
+        self.name = name
+        self.description = description
+        self.buckets = buckets
+        self.labels = labels
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def observe(self, labels: tuple, value: float):
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.series.get(labels)
+            if series is None:
+                series = self.series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def export(self) -> list:
+        lines = [f'# HELP {self.name} {self.description}', f'# TYPE {self.name} histogram']
+        with self.lock:
+            series = [(labels, list(counts), total) for labels, (counts, total) in sorted(self.series.items())]
+        for labels, counts, total in series:
+            label_text = format_labels(labels, self.labels)
+            cumulative = 0
+            for bound, count in zip((*self.buckets, '+Inf'), counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{label_text},le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{label_text}}} {total}')
+            lines.append(f'{self.name}_count{{{label_text}}} {cumulative}')
+        return lines
+
+
+class Counter:
+
+    def __init__(self, name: str, description: str, labels=('endpoint', 'method', 'status')):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, labels: tuple, value: int = 1):
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + value
+
+    def export(self) -> list:
+        lines = [f'# HELP {self.name} {self.description}', f'# TYPE {self.name} counter']
+        with self.lock:
+            values = sorted(self.values.items())
+        lines.extend(f'{self.name}{{{format_labels(labels, self.labels)}}} {value}' for labels, value in values)
+        return lines
+
+
+REQUESTS = Counter('http_requests_total', 'Количество запросов')
+LATENCY = Histogram('http_request_duration_seconds', 'Время обработки запроса', LATENCY_BUCKETS)
+DB_TIME = Histogram('http_request_db_seconds', 'Время SQL-запросов за обработку запроса', LATENCY_BUCKETS)
+SERIALIZATION_TIME = Histogram('http_request_serialization_seconds', 'Время сериализации ответа в JSON',
+                               LATENCY_BUCKETS)
+QUERIES = Histogram('http_request_db_queries', 'Количество SQL-запросов за обработку запроса', QUERY_BUCKETS)
+DUPLICATES = Counter('http_request_duplicate_queries_total', 'Повторы SQL-запросов с тем же текстом (N+1)',
+                     labels=('endpoint', 'method'))
+
+METRICS = (REQUESTS, LATENCY, DB_TIME, SERIALIZATION_TIME, QUERIES, DUPLICATES)
+
+POOL_GAUGES = (
+    ('db_pool_connections', 'size', 'Открытые соединения пула'),
+    ('db_pool_connections_in_use', 'in_use', 'Занятые соединения пула'),
+    ('db_pool_max_connections', 'max_size', 'Максимальный размер пула'),
+    ('db_pool_waiting', 'waiting', 'Запросы, ожидающие соединение'),
+    ('db_pool_timeouts_total', 'timeouts', 'Запросы, не дождавшиеся соединения'),
+)
+
+
+def endpoint_label(request) -> str:
+    """Шаблон адреса (api/v1/products/<int:product_id>), а не сам адрес: число серий метрик ограничено"""
+    match = getattr(request, 'resolver_match', None)
+    return match.route if match is not None else 'unmatched'
+
+
+HTTP_METHODS = frozenset(('GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS', 'TRACE', 'CONNECT'))
+
+
+def method_label(request) -> str:
+    """Метод запроса, нестандартные методы - other: клиент не должен создавать новые серии метрик"""
+    return request.method if request.method in HTTP_METHODS else 'other'
+
+
+def export_metrics() -> str:
+    """Метрики процесса в текстовом формате Prometheus"""
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.export())
+    pools = pool_stats()
+    for name, key, description in POOL_GAUGES if pools else ():
+        lines.extend((f'# HELP {name} {description}', f'# TYPE {name} gauge'))
+        lines.extend(f'{name}{{database="{alias}"}} {stats[key]}' for alias, stats in pools.items())
+    return '\n'.join(lines) + '\n'
+
+
+def server_timing(metrics: RequestMetrics, total: float) -> str:
+    return (f'db;dur={metrics.db_time * 1000:.2f};desc="{metrics.queries} queries, '
+            f'{metrics.duplicates} duplicates", serialize;dur={metrics.serialization_time * 1000:.2f}, '
+            f'total;dur={total * 1000:.2f}')
+
+
+class RequestMetricsMiddleware:
+
+    """Измерение обработки каждого запроса: количество и время SQL-запросов, повторы запросов (N+1),
+    время сериализации и общее время. Результат - заголовок Server-Timing и гистограммы
+    по шаблону адреса (metrics/). SQL-запросы считаются оберткой record_query в каждом соединении.
+    Работает и под WSGI, и под ASGI"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not METRICS_ENABLED:
+            return self.get_response(request)
+        metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        return self.finish(request, response, metrics)
+
+    async def __acall__(self, request):
+        if not METRICS_ENABLED:
+            return await self.get_response(request)
+        metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        return self.finish(request, response, metrics)
+
+    def finish(self, request, response, metrics: RequestMetrics):
+        total = time.perf_counter() - metrics.started
+        response['Server-Timing'] = server_timing(metrics, total)
+        self.observe(request, response, metrics, total)
+        return response
+
+    @staticmethod
+    def observe(request, response, metrics: RequestMetrics, total: float):
+        labels = (endpoint_label(request), method_label(request))
+        REQUESTS.inc((*labels, response.status_code))
+        LATENCY.observe(labels, total)
+        DB_TIME.observe(labels, metrics.db_time)
+        SERIALIZATION_TIME.observe(labels, metrics.serialization_time)
+        QUERIES.observe(labels, metrics.queries)
+        if metrics.duplicates:
+            DUPLICATES.inc(labels, metrics.duplicates)
+            sql, repeats = metrics.most_repeated()
+            if repeats >= DUPLICATE_QUERIES_WARNING:
+                logger.warning('%s %s: запрос выполнен %s раз (вероятно, N+1): %s',
+                               request.method, labels[0], repeats, sql)
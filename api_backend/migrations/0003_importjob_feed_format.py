@@ -0,0 +1,18 @@
+# Generated by Django 4.1.4 on 2026-10-18 17:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_backend', '0002_importjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importjob',
+            name='feed_format',
+            field=models.CharField(blank=True, max_length=5, verbose_name='Формат файла'),
+        ),
+    ]
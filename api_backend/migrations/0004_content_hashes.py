@@ -0,0 +1,38 @@
+# Generated by Django 4.1.4 on 2026-10-18 17:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_backend', '0003_importjob_feed_format'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='content_hash',
+            field=models.CharField(blank=True, max_length=40, verbose_name='Отпечаток содержимого'),
+        ),
+        migrations.AddField(
+            model_name='shop',
+            name='feed_etag',
+            field=models.CharField(blank=True, max_length=256, verbose_name='ETag прайс-листа'),
+        ),
+        migrations.AddField(
+            model_name='shop',
+            name='feed_hash',
+            field=models.CharField(blank=True, max_length=64, verbose_name='Хеш прайс-листа'),
+        ),
+        migrations.AddField(
+            model_name='shop',
+            name='feed_last_modified',
+            field=models.CharField(blank=True, max_length=64, verbose_name='Last-Modified прайс-листа'),
+        ),
+        migrations.AddField(
+            model_name='shop',
+            name='feed_url',
+            field=models.URLField(blank=True, max_length=512, verbose_name='Ссылка на последний прайс-лист'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.1.4 on 2026-10-18 17:39
+
+from django.db import migrations
+from django.db.models import Min, Count
+
+
+def merge_duplicates(apps, schema_editor):
+    """Объединение записей Category и Parameter с одинаковыми названиями перед добавлением ограничения"""
+    relations = (
+        ('Category', 'Product', 'category'),
+        ('Parameter', 'ProductParameter', 'parameter'),
+    )
+    for model_name, related_name, field in relations:
+        model = apps.get_model('api_backend', model_name)
+        related = apps.get_model('api_backend', related_name)
+        duplicates = model.objects.values('name').annotate(first_id=Min('id'), count=Count('id')).filter(count__gt=1)
+        for duplicate in duplicates:
+            others = model.objects.filter(name=duplicate['name']).exclude(id=duplicate['first_id'])
+            related.objects.filter(**{f'{field}__in': others}).update(**{f'{field}_id': duplicate['first_id']})
+            others.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_backend', '0004_content_hashes'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 4.1.4 on 2026-10-18 17:41
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+
+
+def fill_search_vectors(apps, schema_editor):
+    """Заполнение поискового вектора для уже загруженных товаров"""
+    Product = apps.get_model('api_backend', 'Product')
+    Category = apps.get_model('api_backend', 'Category')
+    config = getattr(settings, 'SEARCH_CONFIG', 'russian')
+    category = Category.objects.filter(pk=OuterRef('category_id')).values('name')[:1]
+    Product.objects.update(search_vector=(
+        SearchVector('name', weight='A', config=config)
+        + SearchVector('brand', 'model', weight='B', config=config)
+        + SearchVector(Subquery(category), weight='C', config=config)
+    ))
+
+
+def create_trigram_index(apps, schema_editor):
+    """Расширение pg_trgm и триграммный индекс по названию товара (если расширение доступно)"""
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+        if cursor.fetchone() is None:
+            return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute('CREATE INDEX IF NOT EXISTS product_name_trgm_idx '
+                          'ON api_backend_product USING gin (name gin_trgm_ops)')
+
+
+def drop_trigram_index(apps, schema_editor):
+    schema_editor.execute('DROP INDEX IF EXISTS product_name_trgm_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_backend', '0007_product_name_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='Поисковый вектор'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='product_search_vector_idx'),
+        ),
+        migrations.RunPython(fill_search_vectors, migrations.RunPython.noop),
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.1.4 on 2026-10-18 17:43
+
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_backend', '0008_product_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='params',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='Параметры (для фильтров)'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['params'], name='product_params_idx', opclasses=('jsonb_path_ops',)),
+        ),
+        migrations.RunSQL(
+            '''
+            UPDATE api_backend_product AS p
+            SET params = COALESCE((
+                SELECT jsonb_object_agg(pa.name, pp.value)
+                FROM api_backend_productparameter AS pp
+                JOIN api_backend_parameter AS pa ON pa.id = pp.parameter_id
+                WHERE pp.product_id = p.id
+            ), '{}'::jsonb)
+            ''',
+            migrations.RunSQL.noop,
+        ),
+    ]
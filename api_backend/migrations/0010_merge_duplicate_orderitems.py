@@ -0,0 +1,26 @@
+# Generated by Django 4.1.4 on 2026-10-18 17:47
+
+from django.db import migrations
+from django.db.models import Min, Count, Sum
+
+
+def merge_duplicates(apps, schema_editor):
+    """Объединение позиций заказа с одинаковым товаром (количество суммируется) перед добавлением ограничения"""
+    OrderItem = apps.get_model('api_backend', 'OrderItem')
+    duplicates = OrderItem.objects.values('order_id', 'product_id').annotate(
+        first_id=Min('id'), count=Count('id'), total=Sum('quantity')).filter(count__gt=1)
+    for duplicate in duplicates:
+        OrderItem.objects.filter(pk=duplicate['first_id']).update(quantity=duplicate['total'])
+        OrderItem.objects.filter(order_id=duplicate['order_id'], product_id=duplicate['product_id']) \
+            .exclude(pk=duplicate['first_id']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_backend', '0009_product_params'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicates, migrations.RunPython.noop),
+    ]
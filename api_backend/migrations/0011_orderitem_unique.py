@@ -0,0 +1,17 @@
+# Generated by Django 4.1.4 on 2026-10-18 17:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_backend', '0010_merge_duplicate_orderitems'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='orderitem',
+            constraint=models.UniqueConstraint(fields=('order', 'product'), name='orderitem_order_product_unique'),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 4.1.4 on 2026-10-18 17:52
+
+from django.db import migrations
+from django.db.models import Min, Count
+
+
+def move_items(OrderItem, items, order_id=None, product_id=None):
+    """Перенос позиций в другой заказ или на другой товар с суммированием количества совпадающих позиций"""
+    for item in items:
+        target = {'order_id': order_id or item.order_id, 'product_id': product_id or item.product_id}
+        existing = OrderItem.objects.filter(**target).exclude(pk=item.pk).first()
+        if existing is None:
+            OrderItem.objects.filter(pk=item.pk).update(**target)
+        else:
+            OrderItem.objects.filter(pk=existing.pk).update(quantity=existing.quantity + item.quantity)
+            OrderItem.objects.filter(pk=item.pk).delete()
+
+
+def merge_duplicates(apps, schema_editor):
+    """Объединение нескольких корзин одного пользователя и товаров магазина с одинаковым external_id
+    перед добавлением ограничений уникальности"""
+    Order = apps.get_model('api_backend', 'Order')
+    OrderItem = apps.get_model('api_backend', 'OrderItem')
+    Product = apps.get_model('api_backend', 'Product')
+
+    baskets = Order.objects.filter(status='basket').values('user_id') \
+        .annotate(first_id=Min('id'), count=Count('id')).filter(count__gt=1)
+    for basket in baskets:
+        others = Order.objects.filter(user_id=basket['user_id'], status='basket').exclude(id=basket['first_id'])
+        move_items(OrderItem, OrderItem.objects.filter(order__in=others), order_id=basket['first_id'])
+        others.delete()
+
+    products = Product.objects.values('shop_id', 'external_id') \
+        .annotate(first_id=Min('id'), count=Count('id')).filter(count__gt=1)
+    for product in products:
+        others = Product.objects.filter(shop_id=product['shop_id'], external_id=product['external_id']) \
+            .exclude(id=product['first_id'])
+        move_items(OrderItem, OrderItem.objects.filter(product__in=others), product_id=product['first_id'])
+        others.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_backend', '0011_orderitem_unique'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicates, migrations.RunPython.noop),
+    ]
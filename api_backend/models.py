@@ -1,4 +1,6 @@
 from django.db import models
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.contrib.auth.models import AbstractUser
 from django.contrib.auth.base_user import BaseUserManager
 
@@ -18,6 +20,15 @@ ORDER_STATUS = (
     ('canceled', 'Отменен')
 )
 
+IMPORT_PHASES = (
+    ('queued', 'В очереди'),
+    ('downloading', 'Загрузка файла'),
+    ('parsing', 'Разбор файла'),
+    ('importing', 'Запись товаров'),
+    ('done', 'Завершено'),
+    ('failed', 'Ошибка')
+)
+
 
 class UserManager(BaseUserManager):
 
@@ -80,6 +91,10 @@ class Shop(models.Model):
     url = models.URLField(null=True, blank=True, verbose_name='Ссылка')
     owner = models.OneToOneField(UserModel, verbose_name='Владелец магазина', on_delete=models.CASCADE)
     state = models.BooleanField(default=True, verbose_name='Статус получения заказов')
+    feed_url = models.URLField(max_length=512, blank=True, verbose_name='Ссылка на последний прайс-лист')
+    feed_etag = models.CharField(max_length=256, blank=True, verbose_name='ETag прайс-листа')
+    feed_last_modified = models.CharField(max_length=64, blank=True, verbose_name='Last-Modified прайс-листа')
+    feed_hash = models.CharField(max_length=64, blank=True, verbose_name='Хеш прайс-листа')
 
     class Meta:
         verbose_name = 'Магазин'
@@ -91,7 +106,7 @@ class Shop(models.Model):
 
 class Category(models.Model):
 
-    name = models.CharField(max_length=48, verbose_name='Название')
+    name = models.CharField(max_length=48, unique=True, verbose_name='Название')
 
     class Meta:
         verbose_name = 'Категория'
@@ -106,18 +121,32 @@ class Product(models.Model):
     name = models.CharField(max_length=96, verbose_name='Название')
     brand = models.CharField(max_length=24, blank=True, verbose_name='Бренд')
     model = models.CharField(max_length=24, blank=True, verbose_name='Модель')
-    category = models.ForeignKey(Category, related_name='products', blank=True,
+    # отдельные индексы по category и shop не нужны: эти поля - первые в составных индексах ниже
+    category = models.ForeignKey(Category, related_name='products', blank=True, db_index=False,
                                  on_delete=models.CASCADE, verbose_name='Категория')
-    shop = models.ForeignKey(Shop, related_name='products', on_delete=models.CASCADE, verbose_name='Магазин')
+    shop = models.ForeignKey(Shop, related_name='products', db_index=False,
+                             on_delete=models.CASCADE, verbose_name='Магазин')
     external_id = models.PositiveIntegerField(verbose_name='Внешний ID')
     quantity = models.PositiveIntegerField(verbose_name='Количество')
     price = models.PositiveIntegerField(verbose_name='Цена')
     price_rcc = models.PositiveIntegerField(verbose_name='Розничная цена')
+    content_hash = models.CharField(max_length=40, blank=True, verbose_name='Отпечаток содержимого')
+    search_vector = SearchVectorField(null=True, editable=False, verbose_name='Поисковый вектор')
+    params = models.JSONField(default=dict, blank=True, editable=False, verbose_name='Параметры (для фильтров)')
 
     class Meta:
         verbose_name = 'Товар'
         verbose_name_plural = 'Товары'
         ordering = ('-name',)
+        indexes = [
+            models.Index(fields=('name', 'id'), name='product_name_id_idx'),
+            GinIndex(fields=('search_vector',), name='product_search_vector_idx'),
+            GinIndex(fields=('params',), name='product_params_idx', opclasses=('jsonb_path_ops',)),
+            models.Index(fields=('category', 'price_rcc'), name='product_category_price_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=('shop', 'external_id'), name='product_shop_external_id_unique'),
+        ]
 
     def __str__(self):
         return self.name
@@ -125,7 +154,7 @@ class Product(models.Model):
 
 class Parameter(models.Model):
 
-    name = models.CharField(max_length=48, verbose_name='Название')
+    name = models.CharField(max_length=48, unique=True, verbose_name='Название')
 
     class Meta:
         verbose_name = 'Параметр'
@@ -168,18 +197,57 @@ class ClientContact(models.Model):
 
 class Order(models.Model):
 
-    user = models.ForeignKey(UserModel, related_name='orders',
+    user = models.ForeignKey(UserModel, related_name='orders', db_index=False,
                              on_delete=models.CASCADE, verbose_name='Пользователь')
     date = models.DateTimeField(auto_now=True)
     status = models.CharField(choices=ORDER_STATUS, max_length=9, verbose_name='Статус заказа')
     contact = models.ForeignKey(ClientContact, on_delete=models.CASCADE,
                                 blank=True, null=True, verbose_name='Контакт')
 
+    class Meta:
+        indexes = [
+            models.Index(fields=('user', 'status'), name='order_user_status_idx'),
+            models.Index(fields=('date', 'id'), name='order_date_id_idx'),
+        ]
+        constraints = [
+            # у пользователя не может быть больше одной корзины
+            models.UniqueConstraint(fields=('user',), condition=models.Q(status='basket'),
+                                    name='order_single_basket'),
+        ]
+
 
 class OrderItem(models.Model):
 
-    order = models.ForeignKey(Order, related_name='ordered_items',
+    order = models.ForeignKey(Order, related_name='ordered_items', db_index=False,
                               on_delete=models.CASCADE, verbose_name='Номер заказа')
     product = models.ForeignKey(Product, related_name='ordered_items',
                                 on_delete=models.CASCADE, verbose_name='Товар')
     quantity = models.PositiveIntegerField(verbose_name='Количество')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=('order', 'product'), name='orderitem_order_product_unique'),
+        ]
+
+
+class ImportJob(models.Model):
+
+    user = models.ForeignKey(UserModel, related_name='import_jobs',
+                             on_delete=models.CASCADE, verbose_name='Пользователь')
+    url = models.URLField(max_length=512, verbose_name='Ссылка на файл')
+    feed_format = models.CharField(max_length=5, blank=True, verbose_name='Формат файла')
+    phase = models.CharField(choices=IMPORT_PHASES, max_length=11, default='queued', verbose_name='Этап')
+    processed = models.PositiveIntegerField(default=0, verbose_name='Обработано товаров')
+    result = models.JSONField(null=True, blank=True, verbose_name='Результат')
+    error = models.TextField(blank=True, verbose_name='Ошибка')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Создано')
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name='Начало')
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name='Окончание')
+
+    class Meta:
+        verbose_name = 'Загрузка товаров'
+        verbose_name_plural = 'Загрузки товаров'
+        indexes = [models.Index(fields=('phase', 'id'))]
+
+    def __str__(self):
+        return f'{self.url} ({self.phase})'
@@ -0,0 +1,160 @@
+import json
+from base64 import urlsafe_b64encode, urlsafe_b64decode
+
+from django.db.models import Q, F, Value, Expression, BooleanField
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class RowComparison(Expression):
+
+    """Сравнение строк значений: (a, b) < (x, y). Для составного ключа с одинаковым направлением сортировки
+    Postgres выполняет такое условие одним диапазонным просмотром индекса по (a, b)"""
+
+    conditional = True
+    output_field = BooleanField()
+
+    def __init__(self, fields, values, operator: str):
+        super().__init__()
+        self.lhs = [F(field) for field in fields]
+        self.values = list(values)
+        self.rhs = [Value(value) for value in self.values]
+        self.operator = operator
+
+    def get_source_expressions(self):
+        return [*self.lhs, *self.rhs]
+
+    def set_source_expressions(self, expressions):
+        self.lhs, self.rhs = expressions[:len(self.lhs)], expressions[len(self.lhs):]
+
+    def resolve_expression(self, query=None, allow_joins=True, reuse=None, summarize=False, for_save=False):
+        expression = self.copy()
+        expression.is_summary = summarize
+        expression.lhs = [field.resolve_expression(query, allow_joins, reuse, summarize, for_save)
+                          for field in self.lhs]
+        # значения из курсора (строки для дат) приводятся к типам полей
+        expression.rhs = [Value(value, output_field=field.output_field)
+                          for field, value in zip(expression.lhs, self.values)]
+        return expression
+
+    def as_sql(self, compiler, connection):
+        compiled = [compiler.compile(expression) for expression in self.get_source_expressions()]
+        columns = ', '.join(sql for sql, _ in compiled[:len(self.lhs)])
+        values = ', '.join(sql for sql, _ in compiled[len(self.lhs):])
+        params = [param for _, expression_params in compiled for param in expression_params]
+        return f'({columns}) {self.operator} ({values})', params
+
+
+class KeysetPagination(BasePagination):
+
+    """Постраничный вывод по ключу (keyset pagination).
+    Следующая страница выбирается условием по составному ключу сортировки (ordering)
+    от последней записи предыдущей страницы, а не через OFFSET, поэтому стоимость
+    запроса не зависит от номера страницы. Последнее поле ключа должно быть уникальным.
+    View может задать свой ключ сортировки атрибутом keyset_ordering"""
+
+    ordering = ('-name', '-id')
+    page_size = api_settings.PAGE_SIZE or 50
+    max_page_size = 200
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+
+    def get_page_size(self, request) -> int:
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def decode_cursor(self, request):
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor is None:
+            return None
+        try:
+            position = json.loads(urlsafe_b64decode(cursor.encode()))
+        except (ValueError, TypeError):
+            raise NotFound('Неверный курсор')
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound('Неверный курсор')
+        return position
+
+    def encode_cursor(self, position: list) -> str:
+        return urlsafe_b64encode(json.dumps(position, ensure_ascii=False, default=str).encode()).decode()
+
+    def keyset_filter(self, position: list):
+        """Условие "после позиции" для составного ключа: (a, b) > (x, y), если все поля сортируются
+        в одном направлении, иначе (a > x) OR (a = x AND b > y) OR ... с учетом направления каждого поля"""
+        descending = {field.startswith('-') for field in self.ordering}
+        if len(descending) == 1:
+            fields = [field.lstrip('-') for field in self.ordering]
+            return RowComparison(fields, position, '<' if descending.pop() else '>')
+        condition = Q()
+        for n, field in enumerate(self.ordering):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            equal = {f.lstrip('-'): value for f, value in zip(self.ordering[:n], position[:n])}
+            condition |= Q(**equal, **{f'{name}__{lookup}': position[n]})
+        return condition
+
+    def page_queryset(self, queryset, request, view=None):
+        """Запрос одной страницы: сортировка, условие по курсору и на одну запись больше размера страницы"""
+        self.request = request
+        self.ordering = getattr(view, 'keyset_ordering', None) or self.ordering
+        self.current_page_size = self.get_page_size(request)
+        queryset = queryset.order_by(*self.ordering)
+        position = self.decode_cursor(request)
+        if position is not None:
+            queryset = queryset.filter(self.keyset_filter(position))
+        return queryset[:self.current_page_size + 1]
+
+    def finish_page(self, page: list) -> list:
+        self.has_next = len(page) > self.current_page_size
+        page = page[:self.current_page_size]
+        if self.has_next:
+            last = page[-1]
+            self.next_position = [getattr(last, field.lstrip('-')) for field in self.ordering]
+        return page
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.finish_page(list(self.page_queryset(queryset, request, view)))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """Асинхронный вариант paginate_queryset (для async view)"""
+        return self.finish_page([obj async for obj in self.page_queryset(queryset, request, view)])
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.next_position))
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.get_next_link(), 'results': data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True},
+                'results': schema,
+            },
+        }
+
+
+class ProductPagination(KeysetPagination):
+
+    """Постраничный вывод товаров, сортировка по названию (как Product.Meta.ordering)"""
+
+    ordering = ('-name', '-id')
+
+
+class ShopOrderPagination(KeysetPagination):
+
+    """Постраничный вывод заказов магазина, сначала новые"""
+
+    ordering = ('-date', '-id')
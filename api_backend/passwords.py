@@ -0,0 +1,51 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+
+
+HASH_WORKERS = getattr(settings, 'PASSWORD_HASH_WORKERS', None) or os.cpu_count() or 2
+HASH_QUEUE = getattr(settings, 'PASSWORD_HASH_QUEUE', 4 * HASH_WORKERS)
+HASH_TIMEOUT = getattr(settings, 'PASSWORD_HASH_TIMEOUT', 5)
+
+executor = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix='password-hash')
+slots = threading.BoundedSemaphore(HASH_WORKERS + HASH_QUEUE)
+
+
+class PasswordHashBusy(Exception):
+
+    """Очередь хеширования паролей заполнена"""
+
+
+def run_hasher(func, *args):
+    """Выполнение хеширования в общем пуле потоков. Одновременно хешируется не больше HASH_WORKERS
+    паролей, еще HASH_QUEUE ждут в очереди. Если место в очереди не освободилось за HASH_TIMEOUT секунд,
+    выбрасывается PasswordHashBusy, чтобы поток обработки запросов не простаивал неограниченно"""
+    if not slots.acquire(timeout=HASH_TIMEOUT):
+        raise PasswordHashBusy('Сервер перегружен, повторите попытку позже')
+    try:
+        return executor.submit(func, *args).result()
+    finally:
+        slots.release()
+
+
+def hash_password(raw_password: str) -> str:
+    return run_hasher(make_password, raw_password)
+
+
+def verify_password(user, raw_password: str) -> bool:
+    """Проверка пароля пользователя (user=None - пользователь не найден).
+    Если пользователь не найден, пароль все равно хешируется: время ответа не должно
+    показывать, зарегистрирован ли email. Хеш, созданный устаревшим алгоритмом, обновляется"""
+    if user is None:
+        hash_password(raw_password)
+        return False
+    outdated = []
+    if not run_hasher(check_password, raw_password, user.password, outdated.append):
+        return False
+    if outdated:
+        user.password = hash_password(raw_password)
+        user.save(update_fields=('password',))
+    return True
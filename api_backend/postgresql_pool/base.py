@@ -0,0 +1,246 @@
+import os
+import time
+import threading
+from collections import deque
+
+from django.db.backends.postgresql.base import DatabaseWrapper as PostgresDatabaseWrapper, Database
+from django.db.backends.postgresql.creation import DatabaseCreation as PostgresDatabaseCreation
+from psycopg2 import extensions, extras
+
+
+# соединение, простоявшее в пуле дольше, проверяется запросом перед выдачей (при CONN_HEALTH_CHECKS)
+CHECK_IDLE_AFTER = 10
+
+
+class PoolTimeout(Database.OperationalError):
+
+    """Свободное соединение не появилось за время ожидания"""
+
+
+class ConnectionPool:
+
+    """Пул соединений с базой в памяти процесса (общий для всех потоков).
+    Открыто не меньше min_size и не больше max_size соединений; если все заняты, поток ждет
+    освобождения не дольше timeout секунд, затем получает PoolTimeout. Соединения сверх min_size,
+    простоявшие без дела дольше max_idle секунд, закрываются"""
+
+    def __init__(self, connect, min_size=2, max_size=10, timeout=5, max_idle=300, health_checks=False):
+        self.connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.health_checks = health_checks
+        self.idle = deque()
+        self.size = 0
+        self.condition = threading.Condition()
+        # счетчики для метрик
+        self.waiting = 0
+        self.max_in_use = 0
+        self.requests = 0
+        self.waits = 0
+        self.timeouts = 0
+        self.wait_time = 0.0
+
+    @property
+    def in_use(self) -> int:
+        return self.size - len(self.idle)
+
+    def get(self):
+        with self.condition:
+            self.requests += 1
+            started = time.monotonic()
+            waited = False
+            while not self.idle and self.size >= self.max_size:
+                remaining = self.timeout - (time.monotonic() - started)
+                if remaining <= 0:
+                    self.timeouts += 1
+                    raise PoolTimeout(f'Нет свободных соединений с базой (занято {self.max_size})')
+                waited = True
+                self.waiting += 1
+                try:
+                    self.condition.wait(remaining)
+                finally:
+                    self.waiting -= 1
+            if waited:
+                self.waits += 1
+                self.wait_time += time.monotonic() - started
+            if self.idle:
+                connection, idle_since = self.idle.pop()
+            else:
+                connection, idle_since = None, None
+                self.size += 1
+            self.max_in_use = max(self.max_in_use, self.in_use)
+
+        if connection is not None:
+            if self.usable(connection, idle_since):
+                return connection
+            # вместо сломанного соединения открывается новое, место в пуле остается занятым
+            self.close_quietly(connection)
+        try:
+            return self.connect()
+        except BaseException:
+            with self.condition:
+                self.size -= 1
+                self.condition.notify()
+            raise
+
+    def usable(self, connection, idle_since: float) -> bool:
+        if connection.closed:
+            return False
+        if not self.health_checks or time.monotonic() - idle_since < CHECK_IDLE_AFTER:
+            return True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            return True
+        except Database.Error:
+            return False
+
+    def put(self, connection):
+        """Возврат соединения в пул. Незавершенная транзакция откатывается, сломанное соединение закрывается"""
+        try:
+            if not connection.closed and \
+                    connection.info.transaction_status != extensions.TRANSACTION_STATUS_IDLE:
+                connection.rollback()
+        except Database.Error:
+            pass
+        if connection.closed or connection.info.transaction_status != extensions.TRANSACTION_STATUS_IDLE:
+            self.discard(connection)
+            return
+        now = time.monotonic()
+        expired = []
+        with self.condition:
+            self.idle.append((connection, now))
+            # давно не используемые соединения лежат в начале очереди
+            while self.size > self.min_size and self.idle and now - self.idle[0][1] > self.max_idle:
+                expired.append(self.idle.popleft()[0])
+                self.size -= 1
+            self.condition.notify()
+        for connection in expired:
+            connection.close()
+
+    @staticmethod
+    def close_quietly(connection):
+        try:
+            connection.close()
+        except Database.Error:
+            pass
+
+    def discard(self, connection):
+        self.close_quietly(connection)
+        with self.condition:
+            self.size -= 1
+            self.condition.notify()
+
+    def fill(self):
+        """Открытие min_size соединений заранее"""
+        connections = [self.get() for _ in range(max(self.min_size - self.size, 0))]
+        for connection in connections:
+            self.put(connection)
+
+    def close(self):
+        with self.condition:
+            connections = [connection for connection, _ in self.idle]
+            self.size -= len(connections)
+            self.idle.clear()
+        for connection in connections:
+            connection.close()
+
+    def stats(self) -> dict:
+        with self.condition:
+            return {
+                'size': self.size,
+                'idle': len(self.idle),
+                'in_use': self.in_use,
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                'saturation': round(self.in_use / self.max_size, 3),
+                'waiting': self.waiting,
+                'max_in_use': self.max_in_use,
+                'requests': self.requests,
+                'waits': self.waits,
+                'timeouts': self.timeouts,
+                'wait_time': round(self.wait_time, 3),
+            }
+
+
+pools = {}
+pools_lock = threading.Lock()
+
+
+def pool_stats() -> dict:
+    """Состояние пулов соединений текущего процесса: {alias: stats}"""
+    with pools_lock:
+        items = [(key, pool) for key, pool in pools.items() if key[0] == os.getpid()]
+    stats = {}
+    for (_, alias, database, _), pool in items:
+        stats[alias if alias not in stats else f'{alias}:{database}'] = pool.stats()
+    return stats
+
+
+def close_pools(database: str = None):
+    """Закрытие свободных соединений пулов (всех или только подключенных к базе database)"""
+    with pools_lock:
+        items = [pool for key, pool in pools.items() if database is None or key[2] == database]
+    for pool in items:
+        pool.close()
+
+
+def connect(conn_params: dict, options: dict):
+    """Новое соединение, настроенное как в PostgresDatabaseWrapper.get_new_connection"""
+    connection = Database.connect(**conn_params)
+    isolation_level = options.get('isolation_level')
+    if isolation_level is not None and isolation_level != connection.isolation_level:
+        connection.set_session(isolation_level=isolation_level)
+    extras.register_default_jsonb(conn_or_curs=connection, loads=lambda x: x)
+    return connection
+
+
+class DatabaseCreation(PostgresDatabaseCreation):
+
+    def _destroy_test_db(self, test_database_name, verbosity):
+        # тестовую базу нельзя удалить, пока к ней открыты соединения пула
+        close_pools(test_database_name)
+        super()._destroy_test_db(test_database_name, verbosity)
+
+
+class DatabaseWrapper(PostgresDatabaseWrapper):
+
+    """Бэкенд PostgreSQL с пулом соединений (настройки пула - в DATABASES[alias]['POOL']:
+    MIN_SIZE, MAX_SIZE, TIMEOUT, MAX_IDLE). close() возвращает соединение в пул вместо закрытия,
+    поэтому с CONN_MAX_AGE=0 соединение занято только на время обработки запроса"""
+
+    creation_class = DatabaseCreation
+
+    def get_pool(self, conn_params: dict) -> ConnectionPool:
+        # отдельный пул на каждую базу (тесты подключаются к служебной базе postgres)
+        # и на каждый процесс (пул, созданный до fork, в дочерних процессах не используется)
+        key = (os.getpid(), self.alias, conn_params.get('database'),
+               tuple(sorted((name, str(value)) for name, value in conn_params.items())))
+        created = False
+        with pools_lock:
+            pool = pools.get(key)
+            if pool is None:
+                options = self.settings_dict.get('POOL', {})
+                pool = pools[key] = ConnectionPool(
+                    lambda: connect(conn_params, self.settings_dict['OPTIONS']),
+                    min_size=options.get('MIN_SIZE', 2), max_size=options.get('MAX_SIZE', 10),
+                    timeout=options.get('TIMEOUT', 5), max_idle=options.get('MAX_IDLE', 300),
+                    health_checks=self.settings_dict.get('CONN_HEALTH_CHECKS', False))
+                created = True
+        if created:
+            # MIN_SIZE соединений открываются сразу (вне pools_lock: создание других пулов не ждет)
+            pool.fill()
+        return pool
+
+    def get_new_connection(self, conn_params):
+        self.pool = self.get_pool(conn_params)
+        connection = self.pool.get()
+        self.isolation_level = self.settings_dict['OPTIONS'].get('isolation_level', connection.isolation_level)
+        return connection
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                self.pool.put(self.connection)
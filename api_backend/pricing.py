@@ -0,0 +1,35 @@
+from .models import Product
+
+
+def load_products(product_ids) -> dict:
+    """Товары с магазинами по списку id одним запросом: {id товара: товар}"""
+    return Product.objects.select_related('shop').in_bulk(list(product_ids))
+
+
+def price_items(items, products=None) -> dict:
+    """Расчет стоимости списка товаров [(id товара, количество), ...] за один проход.
+    products - уже загруженные товары {id: товар}, если не переданы - загружаются одним запросом.
+    Результат: позиции с ценой и суммой, общая сумма и список проблем
+    (товар не найден, магазин не принимает заказы, недостаточно товара)"""
+    quantities = {}
+    for product_id, quantity in items:
+        quantities[product_id] = quantities.get(product_id, 0) + quantity
+    if products is None:
+        products = load_products(quantities)
+
+    lines = []
+    problems = []
+    total = 0
+    for product_id, quantity in quantities.items():
+        product = products.get(product_id)
+        if product is None:
+            problems.append({'product': product_id, 'error': 'Товар не найден'})
+            continue
+        line_total = product.price_rcc * quantity
+        total += line_total
+        lines.append({'product': product, 'price': product.price_rcc, 'quantity': quantity, 'total': line_total})
+        if not product.shop.state:
+            problems.append({'product': product_id, 'error': 'Магазин не принимает заказы'})
+        elif product.quantity < quantity:
+            problems.append({'product': product_id, 'error': 'Недостаточно товара', 'available': product.quantity})
+    return {'lines': lines, 'total': total, 'problems': problems}
@@ -0,0 +1,70 @@
+import time
+
+from django.http import HttpResponse
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework.renderers import JSONRenderer
+
+from .metrics import record_serialization
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+ORJSON_OPTIONS = (orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME) if orjson is not None else 0
+
+# типы, которые orjson не сериализует сам (Decimal, даты, ленивые строки), преобразуются как в DRF
+encoder = JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+
+
+def json_dumps(data) -> bytes:
+    """Кодирование в компактный JSON через orjson (если установлен) или стандартный json"""
+    started = time.perf_counter()
+    try:
+        return encode(data)
+    finally:
+        record_serialization(started)
+
+
+def encode(data) -> bytes:
+    if orjson is not None:
+        try:
+            return orjson.dumps(data, default=encoder.default, option=ORJSON_OPTIONS)
+        except orjson.JSONEncodeError:
+            # например, целые числа больше 64 бит - их кодирует стандартный json
+            pass
+    return encoder.encode(data).encode()
+
+
+class FastJSONRenderer(JSONRenderer):
+
+    """JSONRenderer с кодированием через orjson. Ответы с отступами (Accept: application/json; indent=4)
+    и настройки, которые orjson не поддерживает (UNICODE_JSON=False), кодируются стандартным JSONRenderer"""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        started = time.perf_counter()
+        try:
+            return self.encode(data, accepted_media_type, renderer_context)
+        finally:
+            record_serialization(started)
+
+    def encode(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if orjson is None or self.ensure_ascii or indent is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            return orjson.dumps(data, default=encoder.default, option=ORJSON_OPTIONS)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+
+
+class FastJsonResponse(HttpResponse):
+
+    """Замена JsonResponse с кодированием через json_dumps"""
+
+    def __init__(self, data, **kwargs):
+        kwargs.setdefault('content_type', 'application/json')
+        super().__init__(content=json_dumps(data), **kwargs)
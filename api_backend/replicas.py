@@ -0,0 +1,191 @@
+import time
+import random
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import sync_to_async, iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, DatabaseError
+
+
+REPLICA_MAX_LAG = getattr(settings, 'REPLICA_MAX_LAG', 5)
+REPLICA_LAG_CHECK_INTERVAL = getattr(settings, 'REPLICA_LAG_CHECK_INTERVAL', 5)
+REPLICA_STICKY_SECONDS = getattr(settings, 'REPLICA_STICKY_SECONDS', 10)
+
+LAG_SQL = '''
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END
+'''
+
+# включается на время обработки запросов, которые можно выполнять на реплике
+replica_reads = ContextVar('replica_reads', default=False)
+
+lag_checks = {}
+lag_lock = threading.Lock()
+
+
+def replica_aliases() -> list:
+    return list(getattr(settings, 'DATABASE_REPLICAS', []))
+
+
+@contextmanager
+def use_replica():
+    """Чтение из реплик внутри блока with"""
+    token = replica_reads.set(True)
+    try:
+        yield
+    finally:
+        replica_reads.reset(token)
+
+
+def replica_lag(alias: str) -> float:
+    """Отставание реплики в секундах (0 - реплика догнала основную базу, inf - реплика недоступна)"""
+    try:
+        with connections[alias].cursor() as cursor:
+            cursor.execute(LAG_SQL)
+            lag = cursor.fetchone()[0]
+    except DatabaseError:
+        return float('inf')
+    return float(lag or 0)
+
+
+def replica_available(alias: str) -> bool:
+    """Отставание реплики не больше REPLICA_MAX_LAG. Проверяется не чаще раза в REPLICA_LAG_CHECK_INTERVAL секунд"""
+    now = time.monotonic()
+    with lag_lock:
+        checked = lag_checks.get(alias)
+    if checked is None or now - checked[0] >= REPLICA_LAG_CHECK_INTERVAL:
+        checked = (now, replica_lag(alias))
+        with lag_lock:
+            lag_checks[alias] = checked
+    return checked[1] <= REPLICA_MAX_LAG
+
+
+def sticky_key(user_id: int) -> str:
+    return f'replica:sticky:{user_id}'
+
+
+def mark_sticky(user_id: int):
+    """После изменения данных пользователь REPLICA_STICKY_SECONDS секунд читает из основной базы,
+    чтобы видеть свои изменения, даже если реплика еще не догнала основную базу"""
+    cache.set(sticky_key(user_id), 1, REPLICA_STICKY_SECONDS)
+
+
+def is_sticky(user) -> bool:
+    return user.is_authenticated and cache.get(sticky_key(user.id)) is not None
+
+
+CATALOG_CHANGED_KEY = 'replica:catalog_changed'
+
+
+def mark_catalog_changed():
+    """После изменения каталога ответы, которые сохраняются в кеш ответов, читаются из основной базы,
+    пока реплики могут не содержать изменений (отставание до REPLICA_MAX_LAG плюс интервал его проверки).
+    Иначе старые данные из реплики попали бы в кеш под новой версией каталога"""
+    if replica_aliases():
+        cache.set(CATALOG_CHANGED_KEY, 1, REPLICA_MAX_LAG + REPLICA_LAG_CHECK_INTERVAL)
+
+
+def catalog_recently_changed() -> bool:
+    return cache.get(CATALOG_CHANGED_KEY) is not None
+
+
+class ReplicaRouter:
+
+    """Чтение из реплик (DATABASE_REPLICAS) для запросов, выполняемых внутри use_replica(),
+    все остальные запросы и все изменения - в основной базе (default).
+    Реплика с отставанием больше REPLICA_MAX_LAG не используется. Внутри транзакции
+    основной базы чтение тоже идет из основной базы"""
+
+    def db_for_read(self, model, **hints):
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            return instance._state.db
+        if not replica_reads.get() or connections['default'].in_atomic_block:
+            return 'default'
+        replicas = [alias for alias in replica_aliases() if replica_available(alias)]
+        return random.choice(replicas) if replicas else 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # все базы содержат одни и те же данные (None - объект еще не сохранен)
+        databases = {None, 'default', *replica_aliases()}
+        return obj1._state.db in databases and obj2._state.db in databases
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # реплики - копии основной базы, миграции применяются только к ней
+        return db not in replica_aliases()
+
+
+class ReplicaReadMixin:
+
+    """Обработка запросов с методами replica_methods с чтением из реплик.
+    Аутентификация выполняется в основной базе (токен, созданный при входе, может еще не попасть в реплику),
+    пользователь, недавно изменявший данные, читает из основной базы.
+    Ответ, который сохраняется в кеш (CachedResponseMixin), сразу после изменения каталога
+    читается из основной базы"""
+
+    replica_methods = ('GET',)
+
+    def read_from_replica(self, request) -> bool:
+        if request.method not in self.replica_methods or not replica_aliases() or is_sticky(request.user):
+            return False
+        return getattr(self, 'response_cache_key', None) is None or not catalog_recently_changed()
+
+    def initial(self, request, *args, **kwargs):
+        self.replica_token = None
+        super().initial(request, *args, **kwargs)
+        if self.read_from_replica(request):
+            self.replica_token = replica_reads.set(True)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        if getattr(self, 'replica_token', None) is not None:
+            replica_reads.reset(self.replica_token)
+            self.replica_token = None
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+class ReplicaStickinessMiddleware:
+
+    """После успешного запроса на изменение данных (POST, PUT, PATCH, DELETE)
+    пользователь на время читает из основной базы (mark_sticky). Работает и под WSGI, и под ASGI"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    @staticmethod
+    def changes_data(request, response) -> bool:
+        return request.method not in ('GET', 'HEAD', 'OPTIONS') and response.status_code < 400 \
+            and bool(replica_aliases())
+
+    @staticmethod
+    def process_response(request):
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            mark_sticky(user.id)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        response = self.get_response(request)
+        if self.changes_data(request, response):
+            self.process_response(request)
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        if self.changes_data(request, response):
+            # request.user может быть ленивым объектом, который обращается к базе
+            await sync_to_async(self.process_response)(request)
+        return response
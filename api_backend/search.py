@@ -0,0 +1,50 @@
+from django.conf import settings
+from django.db import connection
+from django.db.models import F, OuterRef, Subquery, Q, FloatField, Value
+from django.db.models.functions import Greatest, Cast
+from django.contrib.postgres.search import SearchVector, SearchQuery, SearchRank, TrigramWordSimilarity
+
+from .models import Category, Product
+
+
+SEARCH_CONFIG = getattr(settings, 'SEARCH_CONFIG', 'russian')
+
+_trigram_available = None
+
+
+def search_vector():
+    """Выражение для поискового вектора товара: название (A), бренд и модель (B), категория (C)"""
+    category = Category.objects.filter(pk=OuterRef('category_id')).values('name')[:1]
+    return (SearchVector('name', weight='A', config=SEARCH_CONFIG)
+            + SearchVector('brand', 'model', weight='B', config=SEARCH_CONFIG)
+            + SearchVector(Subquery(category), weight='C', config=SEARCH_CONFIG))
+
+
+def update_search_vectors(product_ids):
+    """Пересчет поискового вектора для указанных товаров одним запросом"""
+    Product.objects.filter(pk__in=product_ids).update(search_vector=search_vector())
+
+
+def trigram_available() -> bool:
+    """Проверка наличия расширения pg_trgm (поиск с учетом опечаток)"""
+    global _trigram_available
+    if _trigram_available is None:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+            _trigram_available = cursor.fetchone() is not None
+    return _trigram_available and getattr(settings, 'SEARCH_TRIGRAM', True)
+
+
+def search_products(queryset, text: str):
+    """Полнотекстовый поиск товаров с ранжированием результатов (поле rank).
+    При наличии pg_trgm также находятся товары с опечатками в названии"""
+    query = SearchQuery(text, config=SEARCH_CONFIG, search_type='websearch')
+    rank = SearchRank(F('search_vector'), query)
+    condition = Q(search_vector=query)
+    if trigram_available():
+        similarity = TrigramWordSimilarity(Value(text), 'name')
+        rank = Greatest(rank, similarity)
+        condition |= Q(name__trigram_word_similar=text)
+    # ts_rank возвращает real; приведение к double precision нужно, чтобы значение ранга
+    # в курсоре постраничного вывода без потерь совпадало со значением в базе
+    return queryset.filter(condition).annotate(rank=Cast(rank, FloatField()))
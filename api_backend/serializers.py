@@ -1,6 +1,70 @@
+from operator import attrgetter
+
 from rest_framework import serializers
+from django.conf import settings
+from django.utils import timezone
 from api_backend.models import UserModel, ClientContact, Shop, Category, \
-    Product, ProductParameter
+    Product, ProductParameter, ImportJob
+
+
+FAST_SERIALIZERS = getattr(settings, 'FAST_SERIALIZERS', True)
+
+
+class SparseFieldsMixin:
+
+    """Вывод только полей, перечисленных в параметре запроса fields (например, ?fields=id,name)"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is None:
+            return
+        fields = request.query_params.get('fields')
+        if not fields:
+            return
+        allowed = {field.strip() for field in fields.split(',')}
+        for field in set(self.fields) - allowed:
+            self.fields.pop(field)
+
+
+class ValuesSerializer:
+
+    """Быстрый сериализатор только для чтения: строки выбираются из базы через values_list(named=True)
+    (select), поля ответа берутся из строки по таблице fields {поле ответа: поле запроса} без полей DRF.
+    Используется как сериализатор DRF: Serializer(rows, many=True, context=...).data"""
+
+    fields = {}
+
+    def __init__(self, instance=None, many=False, context=None):
+        self.instance = instance
+        self.many = many
+        self.context = context or {}
+        # копия: SparseFieldsMixin удаляет поля у экземпляра
+        self.fields = dict(self.fields)
+        super().__init__()
+
+    @classmethod
+    def select(cls, queryset, *extra):
+        """Строки для сериализатора. extra - дополнительные поля строки (например, ключ сортировки)"""
+        lookups = list(cls.fields.values())
+        return queryset.values_list(*lookups, *[name for name in extra if name not in lookups], named=True)
+
+    def serialize(self, rows) -> list:
+        names = tuple(self.fields)
+        if not names:
+            # ни одно из запрошенных полей (?fields=...) не существует
+            return [{} for _ in rows]
+        if len(names) == 1:
+            lookup = self.fields[names[0]]
+            return [{names[0]: getattr(row, lookup)} for row in rows]
+        getter = attrgetter(*self.fields.values())
+        return [dict(zip(names, getter(row))) for row in rows]
+
+    @property
+    def data(self):
+        if self.many:
+            return self.serialize(self.instance)
+        return self.serialize([self.instance])[0]
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -61,7 +125,7 @@ class CategorySerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'products',)
 
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(SparseFieldsMixin, serializers.ModelSerializer):
 
     category = serializers.StringRelatedField()
     shop = serializers.StringRelatedField()
@@ -71,6 +135,34 @@ class ProductSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'category', 'shop', 'external_id', 'quantity', 'price', 'price_rcc',)
 
 
+class CategoryValuesSerializer(ValuesSerializer):
+
+    """Быстрый вариант CategorySerializer: товары всех категорий выбираются одним запросом"""
+
+    fields = {'id': 'id', 'name': 'name'}
+    product_fields = {'id': 'id', 'name': 'name', 'shop': 'shop__name', 'price_rcc': 'price_rcc'}
+
+    def serialize(self, rows) -> list:
+        categories = super().serialize(rows)
+        products = {category['id']: [] for category in categories}
+        names = tuple(self.product_fields)
+        queryset = Product.objects.filter(category_id__in=list(products)).values_list(
+            'category_id', *self.product_fields.values())
+        for category_id, *values in queryset:
+            products[category_id].append(dict(zip(names, values)))
+        for category in categories:
+            category['products'] = products[category['id']]
+        return categories
+
+
+class ProductValuesSerializer(SparseFieldsMixin, ValuesSerializer):
+
+    """Быстрый вариант ProductSerializer (поддерживает параметр fields)"""
+
+    fields = {'id': 'id', 'name': 'name', 'category': 'category__name', 'shop': 'shop__name',
+              'external_id': 'external_id', 'quantity': 'quantity', 'price': 'price', 'price_rcc': 'price_rcc'}
+
+
 class ProductParameterSerializer(serializers.ModelSerializer):
 
     parameter = serializers.StringRelatedField()
@@ -90,3 +182,22 @@ class ProductDetailSerializer(serializers.ModelSerializer):
         model = Product
         fields = ('id', 'name', 'category', 'product_parameters',
                   'shop', 'external_id', 'quantity', 'price', 'price_rcc',)
+
+
+class ImportJobSerializer(serializers.ModelSerializer):
+
+    throughput = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ImportJob
+        fields = ('id', 'url', 'feed_format', 'phase', 'processed', 'throughput', 'result', 'error',
+                  'created_at', 'started_at', 'finished_at',)
+
+    def get_throughput(self, obj):
+        """Скорость обработки (товаров в секунду)"""
+        if obj.started_at is None:
+            return None
+        elapsed = ((obj.finished_at or timezone.now()) - obj.started_at).total_seconds()
+        if elapsed <= 0:
+            return None
+        return round(obj.processed / elapsed, 2)
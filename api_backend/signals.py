@@ -0,0 +1,109 @@
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_save, post_delete
+
+from rest_framework.authtoken.models import Token
+
+from .models import UserModel, Shop, ClientContact, Category, Parameter, Product, ProductParameter, Order, OrderItem
+from .interning import invalidate_names
+from .search import update_search_vectors
+from .facets import refresh_params
+from .caching import bump_catalog_version
+from .basket import invalidate_summary
+from .authentication import invalidate_tokens, invalidate_user_tokens
+from .metrics import install_query_metrics
+
+
+for model in (Category, Parameter):
+    post_save.connect(invalidate_names, sender=model, dispatch_uid=f'invalidate_names_save_{model.__name__}')
+    post_delete.connect(invalidate_names, sender=model, dispatch_uid=f'invalidate_names_delete_{model.__name__}')
+
+
+def update_product_search_vector(sender, instance, **kwargs):
+    """Пересчет поискового вектора товара, сохраненного не через загрузку прайс-листа"""
+    update_search_vectors([instance.pk])
+
+
+post_save.connect(update_product_search_vector, sender=Product, dispatch_uid='update_product_search_vector')
+
+
+def update_category_search_vectors(sender, instance, created, **kwargs):
+    """Пересчет поисковых векторов товаров после переименования категории"""
+    if not created:
+        update_search_vectors(Product.objects.filter(category=instance).values('pk'))
+
+
+post_save.connect(update_category_search_vectors, sender=Category, dispatch_uid='update_category_search_vectors')
+
+
+def update_product_params(sender, instance, **kwargs):
+    """Пересчет денормализованных параметров товара после изменения ProductParameter"""
+    refresh_params([instance.product_id])
+
+
+post_save.connect(update_product_params, sender=ProductParameter, dispatch_uid='update_product_params_save')
+post_delete.connect(update_product_params, sender=ProductParameter, dispatch_uid='update_product_params_delete')
+
+
+def update_parameter_products(sender, instance, created, **kwargs):
+    """Пересчет денормализованных параметров товаров после переименования параметра"""
+    if not created:
+        refresh_params(ProductParameter.objects.filter(parameter=instance).values_list('product_id', flat=True))
+
+
+post_save.connect(update_parameter_products, sender=Parameter, dispatch_uid='update_parameter_products')
+
+
+for model in (Shop, Category, Parameter, Product, ProductParameter):
+    post_save.connect(bump_catalog_version, sender=model, dispatch_uid=f'bump_catalog_version_save_{model.__name__}')
+    post_delete.connect(bump_catalog_version, sender=model, dispatch_uid=f'bump_catalog_version_delete_{model.__name__}')
+
+
+def invalidate_order_summary(sender, instance, **kwargs):
+    """Удаление итогов корзины из кеша после изменения заказа или его позиций не через API корзины"""
+    if isinstance(instance, OrderItem):
+        user_id = Order.objects.filter(pk=instance.order_id).values_list('user_id', flat=True).first()
+    else:
+        user_id = instance.user_id
+    if user_id is not None:
+        invalidate_summary(user_id)
+
+
+for model in (Order, OrderItem):
+    post_save.connect(invalidate_order_summary, sender=model,
+                      dispatch_uid=f'invalidate_order_summary_save_{model.__name__}')
+    post_delete.connect(invalidate_order_summary, sender=model,
+                        dispatch_uid=f'invalidate_order_summary_delete_{model.__name__}')
+
+
+def invalidate_token(sender, instance, **kwargs):
+    """Удаление токена из кеша аутентификации (выход, замена токена)"""
+    invalidate_tokens([instance.key])
+
+
+post_save.connect(invalidate_token, sender=Token, dispatch_uid='invalidate_token_save')
+post_delete.connect(invalidate_token, sender=Token, dispatch_uid='invalidate_token_delete')
+
+
+def invalidate_owner_tokens(sender, instance, **kwargs):
+    """Удаление токенов пользователя из кеша аутентификации после изменения пользователя,
+    создания или удаления его магазина или адреса"""
+    if sender is UserModel:
+        if kwargs.get('created'):
+            return
+        user_id = instance.pk
+    elif sender is Shop:
+        user_id = instance.owner_id
+    else:
+        user_id = instance.user_id
+    invalidate_user_tokens(user_id)
+
+
+post_save.connect(invalidate_owner_tokens, sender=UserModel, dispatch_uid='invalidate_owner_tokens_user')
+for model in (Shop, ClientContact):
+    post_save.connect(invalidate_owner_tokens, sender=model,
+                      dispatch_uid=f'invalidate_owner_tokens_save_{model.__name__}')
+    post_delete.connect(invalidate_owner_tokens, sender=model,
+                        dispatch_uid=f'invalidate_owner_tokens_delete_{model.__name__}')
+
+
+connection_created.connect(install_query_metrics, dispatch_uid='install_query_metrics')
@@ -0,0 +1,81 @@
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.throttling import UserRateThrottle, AnonRateThrottle, ScopedRateThrottle
+
+
+THROTTLE_CACHE = getattr(settings, 'THROTTLE_CACHE', 'default')
+
+
+class SlidingWindowMixin:
+
+    """Ограничение частоты запросов скользящим окном со счетчиками (sliding window counter).
+    Для каждого клиента хранятся два числа - количество запросов в текущем и предыдущем интервале,
+    оценка числа запросов за последний интервал: предыдущий * (доля его, попадающая в окно) + текущий.
+    Счетчики увеличиваются атомарно (cache.incr) в общем кеше THROTTLE_CACHE (redis), поэтому ограничение
+    действует на все процессы вместе, а не на каждый процесс отдельно (проверяется в checks.py)"""
+
+    @property
+    def store(self):
+        return caches[THROTTLE_CACHE]
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        now = self.timer()
+        window = int(now // self.duration)
+        self.elapsed = now - window * self.duration
+        current_key = f'{self.key}:{window}'
+        self.previous = self.store.get(f'{self.key}:{window - 1}', 0)
+        self.current = self.increment(current_key)
+        estimate = self.previous * (1 - self.elapsed / self.duration) + self.current
+        if estimate <= self.num_requests:
+            return True
+        # отклоненный запрос не расходует лимит
+        self.store.decr(current_key)
+        self.current -= 1
+        return False
+
+    def increment(self, key: str) -> int:
+        # счетчик хранится два интервала: в следующем интервале он нужен как предыдущий
+        self.store.add(key, 0, timeout=2 * self.duration)
+        try:
+            return self.store.incr(key)
+        except ValueError:
+            self.store.set(key, 1, timeout=2 * self.duration)
+            return 1
+
+    def wait(self):
+        """Через сколько секунд оценка опустится ниже лимита"""
+        remaining = self.duration - self.elapsed
+        if self.previous and self.current < self.num_requests:
+            wait = self.duration * (1 - (self.num_requests - self.current) / self.previous) - self.elapsed
+            if 0 < wait <= remaining:
+                return wait
+        return remaining
+
+
+class UserSlidingWindowThrottle(SlidingWindowMixin, UserRateThrottle):
+
+    """Лимит для аутентифицированных пользователей (scope user)"""
+
+
+class AnonSlidingWindowThrottle(SlidingWindowMixin, AnonRateThrottle):
+
+    """Лимит для анонимных пользователей по IP-адресу (scope anon)"""
+
+
+class ScopedSlidingWindowThrottle(SlidingWindowMixin, ScopedRateThrottle):
+
+    """Отдельный лимит для view с атрибутом throttle_scope (например, shop_update, catalog)"""
+
+    def allow_request(self, request, view):
+        self.scope = getattr(view, self.scope_attr, None)
+        if not self.scope:
+            return True
+        self.rate = self.get_rate()
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+        return super().allow_request(request, view)
@@ -1,17 +1,30 @@
 from django.urls import path
 from api_backend import views as v
+from api_backend import async_views
 
 
 urlpatterns = [
     path('user/register/', v.AccountRegister.as_view()),
     path('user/login/', v.AccountLogin.as_view()),
+    path('user/logout/', v.AccountLogout.as_view()),
     path('user/contact/', v.ContactView.as_view()),
     path('shop/', v.ShopView.as_view()),
     path('shop/update/', v.ShopUpdate.as_view()),
+    path('shop/import/', v.ImportJobView.as_view()),
+    path('shop/import/<int:job_id>', v.ImportJobDetailView.as_view()),
     path('shop/orders/', v.ShopOrders.as_view()),
+    path('shop/orders/export/', v.ShopOrdersExport.as_view()),
     path('categories/', v.CategoryView.as_view()),
     path('products/', v.ProductView.as_view()),
     path('products/<int:product_id>', v.ProductDetailView.as_view()),
     path('basket/', v.BasketView.as_view()),
+    path('basket/summary/', v.BasketSummaryView.as_view()),
     path('order/', v.OrderView.as_view()),
+    path('status/db-pool/', v.DatabasePoolStatus.as_view()),
+    path('metrics/', v.MetricsView.as_view()),
+    # async варианты view для чтения каталога и корзины (для запуска под ASGI)
+    path('async/categories/', async_views.categories),
+    path('async/products/', async_views.products),
+    path('async/products/<int:product_id>', async_views.product_detail),
+    path('async/basket/', async_views.basket),
 ]
@@ -1,7 +1,10 @@
+from datetime import datetime, time, timedelta
+
 from rest_framework.exceptions import APIException
 from django.db.models import ObjectDoesNotExist
+from django.utils import timezone
 
-from .models import UserModel, Shop
+from .models import Shop
 
 
 class APIError(APIException):
@@ -10,34 +13,15 @@ class APIError(APIException):
 
 
 def get_object(model, object_id):
-    """Проверка наличия объекта в базе"""
+    """Проверка наличия объекта в базе (model - модель или queryset)"""
+    queryset = model.objects.all() if isinstance(model, type) else model
     try:
-        obj = model.objects.get(pk=object_id)
+        obj = queryset.get(pk=object_id)
         return obj
     except ObjectDoesNotExist:
         return None
 
 
-def check_login(email: str, password: str) -> bool:
-    """Проверка соответствия email и password"""
-    try:
-        user = UserModel.objects.get(email=email)
-    except ObjectDoesNotExist:
-        return False
-    if user.check_password(password):
-        return True
-    return False
-
-
-def check_email(email: str) -> bool:
-    """Проверка наличия email в базе"""
-    try:
-        UserModel.objects.get(email=email)
-        return False
-    except ObjectDoesNotExist:
-        return True
-
-
 def check_shop(user: object, shop_name: str) -> bool:
     """Проверка соответствия пользователя (менеджера магазина) и магазина"""
     try:
@@ -47,3 +31,17 @@ def check_shop(user: object, shop_name: str) -> bool:
         return False
     except ObjectDoesNotExist:
         return True
+
+
+def parse_date_range(query_params) -> tuple:
+    """Границы периода из параметров date_from и date_to (ГГГГ-ММ-ДД, обе даты включительно):
+    начало первого дня и начало дня, следующего за последним. ValueError при неверном формате"""
+    bounds = []
+    for param, shift in (('date_from', 0), ('date_to', 1)):
+        value = query_params.get(param)
+        if not value:
+            bounds.append(None)
+            continue
+        day = datetime.strptime(value, '%Y-%m-%d').date() + timedelta(days=shift)
+        bounds.append(timezone.make_aware(datetime.combine(day, time.min)))
+    return tuple(bounds)
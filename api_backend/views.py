@@ -2,41 +2,38 @@ from rest_framework.views import APIView
 from rest_framework.generics import ListAPIView
 from rest_framework.authtoken.models import Token
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
-from django.http import JsonResponse
-from django.db.models import ObjectDoesNotExist
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.db import IntegrityError
+from django.db.models import ObjectDoesNotExist, Prefetch, prefetch_related_objects
 from django.core.validators import URLValidator
 from django.core.exceptions import ValidationError
+from django.conf import settings
 from django.utils import timezone
-
-import requests
-from yaml import load as load_yaml, Loader
-
-from .validation import get_object, check_shop, check_login, check_email
-from .models import UserModel, Shop, ClientContact, Category, Product, \
-    Parameter, ProductParameter, Order, OrderItem
+from django.utils.crypto import constant_time_compare
+from django.utils.dateparse import parse_datetime
+
+from .authentication import user_shop, user_contact_id
+from .validation import get_object, parse_date_range
+from .passwords import hash_password, verify_password, PasswordHashBusy
+from .importer import load_price_list, PriceListError
+from .feeds import FEED_FORMATS
+from .pagination import ProductPagination, ShopOrderPagination
+from .catalog import category_listing, product_queryset, product_listing, product_detail_queryset
+from .facets import product_facets
+from .caching import CachedResponseMixin
+from .replicas import ReplicaReadMixin
+from .throttling import ScopedSlidingWindowThrottle
+from .pricing import price_items
+from .checkout import checkout, CheckoutError
+from .export import EXPORT_FORMATS, export_until, export_rows, export_lines
+from .basket import BasketError, merge_items, add_items, remove_items, user_basket, user_orders, basket_items, \
+    price_basket, basket_content, basket_version, basket_summary, remember_summary
+from .postgresql_pool.base import pool_stats
+from .metrics import export_metrics
+from .models import UserModel, Shop, ClientContact, Product, Order, OrderItem, ImportJob
 from .serializers import UserSerializer, ContactSerializer, ShopSerializer, ShopDetailSerializer, \
-    CategorySerializer, ProductSerializer, ProductDetailSerializer
-
-
-# Вспомогательные функции
-
-def order_price(product_list: list) -> int:
-    """Подсчет общей суммы заказа"""
-    price = 0
-    for n in product_list:
-        product = Product.objects.get(pk=n)
-        price += product.price_rcc
-    return price
-
-
-def upd_quantity(order_id: int, product_id: int, quantity: int) -> int:
-    """Сложение количества одинаковых товаров при повторном POST запросе в BasketView"""
-    item = OrderItem.objects.filter(order_id=order_id, product_id=product_id)
-    if len(item) == 0:
-        return quantity
-    quantity = item[0].quantity + quantity
-    return quantity
+    CategorySerializer, ProductSerializer, ProductDetailSerializer, ImportJobSerializer
 
 
 # Views
@@ -48,16 +45,19 @@ class AccountRegister(APIView):
     def post(self, request, *args, **kwargs):
         register_keys = {'email', 'password'}
         if register_keys.issubset(request.data):
-            if check_email(request.data['email']):
-                user_serializer = UserSerializer(data=request.data)
-                if user_serializer.is_valid():
-                    new_user = user_serializer.save()
-                    new_user.set_password(request.data['password'])
-                    new_user.save()
-                    return JsonResponse({'Status': 'OK', 'Message': 'Регистрация прошла успешно'})
-                else:
-                    return JsonResponse({'Status': 'Ошибка!', 'Error': user_serializer.errors})
-            return JsonResponse({'Status': 'Ошибка!', 'Error': 'Пользователь с таким email уже существует'})
+            user_serializer = UserSerializer(data=request.data)
+            if user_serializer.is_valid():
+                try:
+                    password = hash_password(request.data['password'])
+                    user_serializer.save(password=password)
+                except PasswordHashBusy as error:
+                    return JsonResponse({'Status': 'Ошибка!', 'Error': str(error)}, status=503)
+                except IntegrityError:
+                    return JsonResponse({'Status': 'Ошибка!', 'Error': 'Пользователь с таким email уже существует'})
+                return JsonResponse({'Status': 'OK', 'Message': 'Регистрация прошла успешно'})
+            if any(error.code == 'unique' for error in user_serializer.errors.get('email', [])):
+                return JsonResponse({'Status': 'Ошибка!', 'Error': 'Пользователь с таким email уже существует'})
+            return JsonResponse({'Status': 'Ошибка!', 'Error': user_serializer.errors})
         return JsonResponse({'Status': 'Ошибка!', 'Error': 'Не указаны необходимые аргументы для регистрации'})
 
 
@@ -68,15 +68,34 @@ class AccountLogin(APIView):
     def post(self, request, *args, **kwargs):
         register_keys = {'email', 'password'}
         if register_keys.issubset(request.data):
-            if check_login(request.data['email'], request.data['password']):
-                user = UserModel.objects.get(email=request.data['email'])
-                token = Token.objects.get_or_create(user=user)
-                return JsonResponse({'Status': 'OK', 'Token': str(token[0])})
+            # пользователь и его токен выбираются одним запросом
+            user = UserModel.objects.select_related('auth_token').filter(email=request.data['email']).first()
+            try:
+                valid = verify_password(user, request.data['password'])
+            except PasswordHashBusy as error:
+                return JsonResponse({'Status': 'Ошибка!', 'Error': str(error)}, status=503)
+            if valid and user.is_active:
+                try:
+                    token = user.auth_token
+                except ObjectDoesNotExist:
+                    token, _ = Token.objects.get_or_create(user=user)
+                return JsonResponse({'Status': 'OK', 'Token': str(token)})
             else:
                 return JsonResponse({'Status': 'Ошибка!', 'Error': 'Неправильный email или пароль'})
         return JsonResponse({'Status': 'Ошибка!', 'Error': 'Необходим email и пароль'})
 
 
+class AccountLogout(APIView):
+
+    """View для выхода: токен пользователя удаляется"""
+
+    permission_classes = (IsAuthenticated,)
+
+    def post(self, request, *args, **kwargs):
+        Token.objects.filter(user=request.user).delete()
+        return JsonResponse({'Status': 'OK', 'Message': 'Выход выполнен'})
+
+
 class ContactView(APIView):
 
     """View для работы с адресом доставки пользователя"""
@@ -91,7 +110,7 @@ class ContactView(APIView):
             return None
 
     def get(self, request, *args, **kwargs):
-        contact = self.get_contact(request.user.id)
+        contact = self.get_contact(request.user)
         if contact is None:
             return JsonResponse({'Status': ' Ошибка!', 'Error': 'Адрес отсутствует'})
         serializer = ContactSerializer(contact)
@@ -110,7 +129,7 @@ class ContactView(APIView):
         return JsonResponse({'Status': 'Ошибка!', 'Error': 'Указаны не все параметры'})
 
     def patch(self, request, *args, **kwargs):
-        contact = self.get_contact(request.user.id)
+        contact = self.get_contact(request.user)
         if contact is None:
             return JsonResponse({'Status': ' Ошибка!', 'Error': 'Адрес отсутствует'})
         serializer = ContactSerializer(contact, data=request.data, partial=True)
@@ -128,15 +147,12 @@ class ShopView(APIView):
     permission_classes = (IsAuthenticated,)
 
     def get_shop(self, owner):
-        try:
-            shop = Shop.objects.get(owner=owner)
-            return shop
-        except ObjectDoesNotExist:
-            return None
+        return user_shop(owner)
 
     def get(self, request, *args, **kwargs):
         shop = self.get_shop(request.user)
         if shop is not None:
+            prefetch_related_objects([shop], Prefetch('products', queryset=Product.objects.select_related('category')))
             shop_serializer = ShopDetailSerializer(shop)
             return Response(shop_serializer.data)
         else:
@@ -179,43 +195,54 @@ class ShopView(APIView):
         return JsonResponse({'Status': 'Успешно', 'Message': 'Магазин удален'})
 
 
-class CategoryView(ListAPIView):
+class CategoryView(ReplicaReadMixin, CachedResponseMixin, ListAPIView):
 
     """View для просмотра категорий и товаров в каждой категории"""
 
-    queryset = Category.objects.all()
+    throttle_classes = (ScopedSlidingWindowThrottle,)
+    throttle_scope = 'catalog'
     serializer_class = CategorySerializer
 
+    def get_queryset(self):
+        queryset, self.serializer_class = category_listing()
+        return queryset
+
 
-class ProductView(ListAPIView):
+class ProductView(ReplicaReadMixin, CachedResponseMixin, ListAPIView):
 
-    """View для поиска товаров по названию, категории и стоимости"""
+    """View для поиска товаров по названию, категории и стоимости.
+    Параметр search - полнотекстовый поиск с ранжированием результатов.
+    Параметры param[Название]=значение - отбор по параметрам товара,
+    facets=true - количество товаров по значениям параметров для текущей выборки.
+    Вывод постраничный (cursor, page_size), набор полей задается параметром fields"""
 
+    throttle_classes = (ScopedSlidingWindowThrottle,)
+    throttle_scope = 'catalog'
     serializer_class = ProductSerializer
+    pagination_class = ProductPagination
+    keyset_ordering = None
 
     def get_queryset(self):
-        queryset = Product.objects.filter(shop__state=True)
-        name = self.request.query_params.get('name')
-        category = self.request.query_params.get('category')
-        price_gte = self.request.query_params.get('price_gte')
-        price_lte = self.request.query_params.get('price_lte')
-        if name is not None:
-            queryset = queryset.filter(name__icontains=name)
-        if category is not None:
-            queryset = queryset.filter(category=category)
-        if price_gte is not None:
-            queryset = queryset.filter(price_rcc__gte=price_gte)
-        if price_lte is not None:
-            queryset = queryset.filter(price_rcc__lte=price_lte)
+        self.products, self.keyset_ordering = product_queryset(self.request.query_params)
+        queryset, self.serializer_class = product_listing(self.products, self.keyset_ordering)
         return queryset
 
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        if request.query_params.get('facets') in ('1', 'true'):
+            response.data['facets'] = product_facets(self.products)
+        return response
+
 
-class ProductDetailView(APIView):
+class ProductDetailView(ReplicaReadMixin, CachedResponseMixin, APIView):
 
     """View для полной информации о конкретном товаре"""
 
+    throttle_classes = (ScopedSlidingWindowThrottle,)
+    throttle_scope = 'catalog'
+
     def get(self, request, product_id, *args, **kwargs):
-        product = get_object(Product, product_id)
+        product = get_object(product_detail_queryset(), product_id)
         if product is not None:
             product_serializer = ProductDetailSerializer(product)
             return Response(product_serializer.data)
@@ -225,9 +252,11 @@ class ProductDetailView(APIView):
 
 class ShopUpdate(APIView):
 
-    """View для добавления товаров в магазин по url из yaml-файла"""
+    """View для добавления товаров в магазин по url из yaml-файла (или файла JSON Lines)"""
 
     permission_classes = (IsAuthenticated,)
+    throttle_classes = (ScopedSlidingWindowThrottle,)
+    throttle_scope = 'shop_update'
 
     def post(self, request, *args, **kwargs):
         if request.user.type != 'shop':
@@ -240,82 +269,99 @@ class ShopUpdate(APIView):
                 validate_url(url)
             except ValidationError:
                 return JsonResponse({'Status': 'Ошибка!', 'Error': 'Неверно указан URL'})
-            file = requests.get(url).content
-            data = load_yaml(file, Loader=Loader)
-
-            shop_name = data.get('shop')
-            if shop_name is None:
-                return JsonResponse({'Status': 'Ошибка!', 'Error': 'Отсутствует название магазина'})
-            if check_shop(request.user, shop_name) is False:
-                return JsonResponse({'Status': 'Ошибка!', 'Error': 'Неправильное название магазина'})
-            shop, _ = Shop.objects.get_or_create(name=shop_name, owner=request.user)
-
-            products = data.get('goods')
-            if products is None:
-                return JsonResponse({'Status': 'Ошибка!', 'Error': 'Отсутствует список товаров'})
-            for product in products:
-                category, _ = Category.objects.get_or_create(name=product.get('category'))
-                new_product, _ = Product.objects.update_or_create(
-                    shop=shop, external_id=product['external_id'],
-                    defaults={
-                        'name': product.get('name'),
-                        'brand': product.get('brand'),
-                        'model': product.get('model'),
-                        'category': category,
-                        'quantity': product.get('quantity'),
-                        'price': product.get('price'),
-                        'price_rcc': product.get('price_rcc')
-                    }
-                )
+            try:
+                result = load_price_list(request.user, url, feed_format=request.data.get('format'))
+            except PriceListError as e:
+                return JsonResponse({'Status': 'Ошибка!', 'Error': str(e)})
 
-                params = product.get('parameters')
-                if params is not None:
-                    for pname, pvalue in params.items():
-                        param, _ = Parameter.objects.get_or_create(name=pname)
+            return JsonResponse({'Status': 'OK', 'Message': 'Товары успешно добавлены!', 'Result': result})
+        return JsonResponse({'Status': 'Ошибка!', 'Error': 'Не указан URL'})
+
+
+class ImportJobView(APIView):
+
+    """View для фоновой загрузки товаров в магазин по url из yaml-файла.
+    Задача ставится в очередь и выполняется обработчиком (manage.py import_worker)"""
+
+    permission_classes = (IsAuthenticated,)
 
-                        ProductParameter.objects.update_or_create(product=new_product, parameter=param,
-                                                                  defaults={'value': pvalue})
+    def get(self, request, *args, **kwargs):
+        jobs = ImportJob.objects.filter(user=request.user).order_by('-id')[:20]
+        return Response(ImportJobSerializer(jobs, many=True).data)
+
+    def post(self, request, *args, **kwargs):
+        if request.user.type != 'shop':
+            return JsonResponse({'Status': 'Ошибка!', 'Error': 'У вас нет прав на данное действие'})
 
-            return JsonResponse({'Status': 'OK', 'Message': 'Товары успешно добавлены!'})
+        url = request.data.get('url')
+        if url:
+            validate_url = URLValidator()
+            try:
+                validate_url(url)
+            except ValidationError:
+                return JsonResponse({'Status': 'Ошибка!', 'Error': 'Неверно указан URL'})
+            feed_format = request.data.get('format', '')
+            if feed_format and feed_format not in FEED_FORMATS:
+                return JsonResponse({'Status': 'Ошибка!', 'Error': f'Неизвестный формат файла: {feed_format}'})
+            job = ImportJob.objects.create(user=request.user, url=url, feed_format=feed_format)
+            return JsonResponse({'Status': 'OK', 'Message': 'Загрузка товаров поставлена в очередь', 'Job': job.id})
         return JsonResponse({'Status': 'Ошибка!', 'Error': 'Не указан URL'})
 
 
-class ShopOrders(APIView):
+class ImportJobDetailView(APIView):
+
+    """View для просмотра состояния фоновой загрузки товаров"""
+
+    permission_classes = (IsAuthenticated,)
+
+    def get(self, request, job_id, *args, **kwargs):
+        try:
+            job = ImportJob.objects.get(pk=job_id, user=request.user)
+        except ObjectDoesNotExist:
+            return JsonResponse({'Status': 'Ошибка!', 'Error': 'Загрузка не найдена'})
+        return Response(ImportJobSerializer(job).data)
+
+
+class ShopOrders(ReplicaReadMixin, APIView):
 
     """View для просмотра всех заказов текущего магазина"""
 
     permission_classes = (IsAuthenticated,)
+    pagination_class = ShopOrderPagination
 
     def get(self, request, *args, **kwargs):
         if request.user.type != 'shop':
             return JsonResponse({'Status': 'Ошибка!', 'Error': 'У вас нет прав на данное действие'})
+        try:
+            date_from, date_to = parse_date_range(request.query_params)
+        except ValueError:
+            return JsonResponse({'Status': 'Ошибка!', 'Error': 'Дата должна быть указана в формате ГГГГ-ММ-ДД'})
+        shop_items = OrderItem.objects.filter(product__shop__owner=request.user).select_related('product__shop') \
+            .order_by('id')
+        orders = Order.objects.filter(ordered_items__product__shop__owner=request.user).exclude(
+            status='basket').select_related('user', 'contact').prefetch_related(
+            Prefetch('ordered_items', queryset=shop_items, to_attr='shop_items')).distinct()
         status = request.query_params.get('status')
         if status is not None:
-            orders = Order.objects.filter(
-                ordered_items__product__shop__owner=request.user, status=status).exclude(
-                status='basket').select_related('user')
-        else:
-            orders = Order.objects.filter(
-                ordered_items__product__shop__owner=request.user).exclude(
-                status='basket').select_related('user')
-
-        order_list = []
-        order_ids = []
-        for order in orders:
-            if order.id not in order_ids:
-                order_ids.append(order.id)
-                order_list.append(order)
+            orders = orders.filter(status=status)
+        if date_from is not None:
+            orders = orders.filter(date__gte=date_from)
+        if date_to is not None:
+            orders = orders.filter(date__lt=date_to)
 
+        paginator = self.pagination_class()
         result = []
-        for order in order_list:
-            products = order.ordered_items.filter(product__shop__owner=request.user)
+        for order in paginator.paginate_queryset(orders, request, view=self):
+            priced = price_items([(item.product_id, item.quantity) for item in order.shop_items],
+                                 {item.product_id: item.product for item in order.shop_items})
             product_list = []
-            for product in products:
-
+            for line in priced['lines']:
                 product_list.append(
-                    {'external_id': product.product.external_id,
-                     'name': product.product.name,
-                     'quantity': product.quantity}
+                    {'external_id': line['product'].external_id,
+                     'name': line['product'].name,
+                     'quantity': line['quantity'],
+                     'price': line['price'],
+                     'total': line['total']}
                 )
 
             result.append(
@@ -326,13 +372,49 @@ class ShopOrders(APIView):
                      'street': order.contact.street,
                      'house': order.contact.house,
                      'phone': order.contact.phone
-                 },
+                 } if order.contact is not None else None,
                  'date': str(order.date),
                  'status': order.status,
-                 'product': product_list}
+                 'product': product_list,
+                 'total': priced['total']}
             )
 
-        return JsonResponse({'Заказы': result})
+        return JsonResponse({'Заказы': result, 'next': paginator.get_next_link()})
+
+
+class ShopOrdersExport(APIView):
+
+    """View для потоковой выгрузки позиций заказов магазина в csv или jsonl"""
+
+    permission_classes = (IsAuthenticated,)
+
+    def get(self, request, *args, **kwargs):
+        if request.user.type != 'shop':
+            return JsonResponse({'Status': 'Ошибка!', 'Error': 'У вас нет прав на данное действие'})
+        export_format = request.query_params.get('output', 'csv')
+        if export_format not in EXPORT_FORMATS:
+            return JsonResponse({'Status': 'Ошибка!',
+                                 'Error': f'Формат выгрузки должен быть одним из: {", ".join(EXPORT_FORMATS)}'})
+        since = request.query_params.get('since')
+        if since is not None:
+            try:
+                since = parse_datetime(since)
+            except ValueError:
+                since = None
+            if since is None:
+                return JsonResponse({'Status': 'Ошибка!', 'Error': 'Неверный курсор выгрузки'})
+            if timezone.is_naive(since):
+                since = timezone.make_aware(since, timezone.utc)
+        # верхняя граница фиксируется до начала выгрузки и передается клиенту в заголовке:
+        # следующая выгрузка с since=<X-Export-Cursor> продолжится с этого места
+        until = export_until()
+        rows = export_rows(request.user, since, until)
+        content_type = 'text/csv' if export_format == 'csv' else 'application/jsonl'
+        response = StreamingHttpResponse(export_lines(rows, export_format),
+                                         content_type=f'{content_type}; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="orders.{export_format}"'
+        response['X-Export-Cursor'] = until.strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+        return response
 
 
 class BasketView(APIView):
@@ -343,66 +425,64 @@ class BasketView(APIView):
 
     def get_basket(self, user):
         try:
-            basket = Order.objects.get(user=user, status='basket')
+            basket = user_basket(user.id).get()
             return basket
         except ObjectDoesNotExist:
             return None
 
     def get(self, request, *args, **kwargs):
-        basket = self.get_basket(request.user)
-        if basket is None:
-            return JsonResponse({'Status': 'OK', 'Message': 'Корзина пуста'})
-        items = OrderItem.objects.filter(order=basket.id)
-        if len(items) == 0:
-            return JsonResponse({'Status': 'OK', 'Message': 'Корзина пуста'})
-        basket_items = []
-        total_price = 0
-        for item in items:
-            total_price += item.product.price_rcc * item.quantity
-            basket_items.append(
-                {'ID': item.product.id, 'Товар': item.product.name,
-                 'Цена': item.product.price_rcc, 'Кол-во': item.quantity}
-            )
-        return JsonResponse({'Status': 'OK', 'Корзина': basket_items, 'Примерная сумма заказа': total_price})
+        version = basket_version(request.user.id)
+        priced = price_basket(basket_items(request.user.id))
+        remember_summary(request.user.id, version, priced)
+        return JsonResponse(basket_content(priced))
 
     def post(self, request, *args, **kwargs):
-        items = request.data.get('items')
-        if items is None:
-            return JsonResponse({'Status': 'Ошибка!', 'Error': 'Неправильно указан либо отсутствует параметр items'})
+        try:
+            items = merge_items(request.data.get('items'))
+        except BasketError as error:
+            return JsonResponse({'Status': 'Ошибка!', 'Error': str(error)})
         order, _ = Order.objects.get_or_create(user=request.user, status='basket')
-        for item in items:
-            OrderItem.objects.update_or_create(order=order,
-                                               product_id=item['product'],
-                                               defaults={'quantity': upd_quantity(
-                                                   order.id,
-                                                   item['product'],
-                                                   item['quantity'])})
+        try:
+            add_items(order, items)
+        except BasketError as error:
+            return JsonResponse({'Status': 'Ошибка!', 'Error': str(error)})
         return JsonResponse({'Status': 'OK',
                              'Message': 'Товары добавлены в корзину'})
 
     def delete(self, request, *args, **kwargs):
         basket = self.get_basket(request.user)
         if basket is not None:
-            delete_products = request.data.get('products').split(',')
-            delete_products = [int(i) for i in delete_products]
-            order_products = OrderItem.objects.filter(order=basket)
-            if len(order_products) == 0:
+            try:
+                delete_products = [int(i) for i in str(request.data.get('products')).split(',')]
+            except ValueError:
+                return JsonResponse({'Status': 'Ошибка!',
+                                     'Error': 'Неправильно указан либо отсутствует параметр products'})
+            if remove_items(basket, delete_products) == 0 and not basket.ordered_items.exists():
                 return JsonResponse({'Status': 'OK', 'Message': 'Корзина пуста'})
-            for order_product in order_products:
-                if order_product.product.id in delete_products:
-                    order_product.delete()
             return JsonResponse({'Status': 'OK', 'Message': 'Товары удалены'})
         return JsonResponse({'Status': 'OK', 'Message': 'Корзина пуста'})
 
 
-class OrderView(APIView):
+class BasketSummaryView(APIView):
+
+    """View для итогов корзины (количество товаров и сумма) без списка товаров"""
+
+    permission_classes = (IsAuthenticated,)
+
+    def get(self, request, *args, **kwargs):
+        summary = basket_summary(request.user.id)
+        return JsonResponse({'Status': 'OK', 'Позиций': summary['count'], 'Кол-во': summary['pieces'],
+                             'Примерная сумма заказа': summary['total']})
+
+
+class OrderView(ReplicaReadMixin, APIView):
 
     """View для оформления заказа"""
 
     permission_classes = (IsAuthenticated,)
 
     def get(self, request, *args, **kwargs):
-        orders = Order.objects.filter(user=request.user).exclude(status='basket')
+        orders = user_orders(request.user.id)
         if len(orders) == 0:
             return JsonResponse({'Status': 'Успешно', 'Заказы': 'У вас еще нет заказов'})
         order_list = []
@@ -413,13 +493,50 @@ class OrderView(APIView):
         return JsonResponse({'Status': 'Успешно', 'Заказы': order_list})
 
     def post(self, request, *args, **kwargs):
-        order = Order.objects.filter(user=request.user, status='basket')
-        if len(order) == 0:
-            return JsonResponse({'Status': 'Ошибка!',
-                                 'Error': 'Прежде чем подтвердить заказ, добавьте товары в корзину'})
-        try:
-            contact = ClientContact.objects.get(user=request.user)
-        except ObjectDoesNotExist:
+        contact_id = user_contact_id(request.user)
+        if contact_id is None:
             return JsonResponse({'Status': 'Ошибка!', 'Error': 'Для оформления заказа необходимо заполнить адрес'})
-        order.update(status='new', date=timezone.now(), contact=contact)
-        return JsonResponse({'Status': 'Успешно', 'Message': 'Заказ оформлен'})
+        try:
+            priced = checkout(request.user, contact_id)
+        except CheckoutError as error:
+            result = {'Status': 'Ошибка!', 'Error': str(error)}
+            if error.problems:
+                result['Товары'] = error.problems
+            return JsonResponse(result)
+        return JsonResponse({'Status': 'Успешно', 'Message': 'Заказ оформлен', 'Сумма заказа': priced['total']})
+
+
+class DatabasePoolStatus(APIView):
+
+    """View для администратора: состояние пулов соединений с базой в процессе, обработавшем запрос"""
+
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request, *args, **kwargs):
+        return JsonResponse({'Status': 'Успешно', 'Пулы': pool_stats()})
+
+
+class MetricsView(APIView):
+
+    """View для Prometheus: гистограммы времени обработки, SQL-запросов и сериализации по адресам,
+    состояние пулов соединений (метрики процесса, обработавшего запрос).
+    Если задан METRICS_TOKEN, нужен заголовок Authorization: Bearer <METRICS_TOKEN>,
+    иначе метрики доступны только администратору"""
+
+    throttle_classes = ()
+
+    def get_authenticators(self):
+        if getattr(settings, 'METRICS_TOKEN', ''):
+            return []
+        return super().get_authenticators()
+
+    def get_permissions(self):
+        if getattr(settings, 'METRICS_TOKEN', ''):
+            return []
+        return [IsAdminUser()]
+
+    def get(self, request, *args, **kwargs):
+        token = getattr(settings, 'METRICS_TOKEN', '')
+        if token and not constant_time_compare(request.META.get('HTTP_AUTHORIZATION', ''), f'Bearer {token}'):
+            return JsonResponse({'Status': 'Ошибка!', 'Error': 'Неверный токен'}, status=403)
+        return HttpResponse(export_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
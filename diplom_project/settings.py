@@ -41,12 +41,14 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'api_backend',
     'rest_framework',
     'rest_framework.authtoken',
 ]
 
 MIDDLEWARE = [
+    'api_backend.metrics.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -54,6 +56,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'api_backend.replicas.ReplicaStickinessMiddleware',
 ]
 
 ROOT_URLCONF = 'diplom_project.urls'
@@ -80,17 +83,124 @@ WSGI_APPLICATION = 'diplom_project.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.1/ref/settings/#databases
 
+# Соединения с базой: DB_CONN_MAX_AGE - сколько секунд соединение используется повторно (0 - новое
+# соединение на каждый запрос), DB_CONN_HEALTH_CHECKS - проверка соединения перед повторным использованием.
+# DB_POOL=true - пул соединений в процессе (api_backend.postgresql_pool): от DB_POOL_MIN_SIZE до DB_POOL_MAX_SIZE
+# соединений, запрос ждет свободное соединение не дольше DB_POOL_TIMEOUT секунд, лишние соединения закрываются
+# после DB_POOL_MAX_IDLE секунд простоя. С пулом соединение возвращается в пул после каждого запроса
+
+DB_POOL = os.getenv('DB_POOL', 'false').lower() == 'true'
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': 'api_backend.postgresql_pool' if DB_POOL else 'django.db.backends.postgresql',
         'NAME': os.getenv('DB_NAME'),
         'USER': os.getenv('DB_USER'),
         'PASSWORD': os.getenv('DB_PASSWORD'),
         'HOST': os.getenv('HOST'),
-        'PORT': int(os.getenv('PORT'))
+        'PORT': int(os.getenv('PORT')),
+        'CONN_MAX_AGE': 0 if DB_POOL else int(os.getenv('DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': os.getenv('DB_CONN_HEALTH_CHECKS', 'true').lower() == 'true',
+        'POOL': {
+            'MIN_SIZE': int(os.getenv('DB_POOL_MIN_SIZE', 2)),
+            'MAX_SIZE': int(os.getenv('DB_POOL_MAX_SIZE', 10)),
+            'TIMEOUT': float(os.getenv('DB_POOL_TIMEOUT', 5)),
+            'MAX_IDLE': float(os.getenv('DB_POOL_MAX_IDLE', 300)),
+        },
     }
 }
 
+# Реплики только для чтения: DB_REPLICAS=host1:port,host2:port (имя базы, пользователь и пароль - как у основной).
+# Каталог и история заказов читаются из реплик с отставанием не больше REPLICA_MAX_LAG секунд (проверяется
+# раз в REPLICA_LAG_CHECK_INTERVAL секунд), после изменения данных пользователь REPLICA_STICKY_SECONDS секунд
+# читает из основной базы. Без реплик все запросы идут в основную базу
+
+DATABASE_REPLICAS = []
+
+for number, address in enumerate(filter(None, os.getenv('DB_REPLICAS', '').split(',')), 1):
+    replica_host, _, replica_port = address.strip().partition(':')
+    DATABASES[f'replica_{number}'] = dict(DATABASES['default'], HOST=replica_host,
+                                          PORT=int(replica_port or DATABASES['default']['PORT']),
+                                          TEST={'MIRROR': 'default'})
+    DATABASE_REPLICAS.append(f'replica_{number}')
+
+DATABASE_ROUTERS = ['api_backend.replicas.ReplicaRouter']
+
+REPLICA_MAX_LAG = float(os.getenv('REPLICA_MAX_LAG', 5))
+
+REPLICA_LAG_CHECK_INTERVAL = float(os.getenv('REPLICA_LAG_CHECK_INTERVAL', 5))
+
+REPLICA_STICKY_SECONDS = int(os.getenv('REPLICA_STICKY_SECONDS', 10))
+
+
+# Cache
+# Бэкенд выбирается переменной CACHE_BACKEND: locmem (по умолчанию, отдельный кеш в каждом процессе),
+# file (общий для процессов на одном сервере, CACHE_LOCATION - каталог) или redis (CACHE_LOCATION - redis://...)
+
+CACHE_BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'redis': 'django.core.cache.backends.redis.RedisCache',
+}
+
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'locmem')
+
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKENDS[CACHE_BACKEND],
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+        'TIMEOUT': int(os.getenv('CACHE_TTL', 300)),
+    }
+}
+
+if CACHE_BACKEND != 'redis':
+    CACHES['default']['OPTIONS'] = {'MAX_ENTRIES': int(os.getenv('CACHE_MAX_ENTRIES', 1000))}
+
+# Кеш (алиас из CACHES) для счетчиков ограничения частоты запросов. Должен быть общим для всех процессов
+# (CACHE_BACKEND=redis): с locmem и file каждый процесс считает лимит отдельно, и при DEBUG=False
+# manage.py check (runserver, migrate) завершается ошибкой api_backend.E001
+THROTTLE_CACHE = os.getenv('THROTTLE_CACHE', 'default')
+
+# Время хранения ответов каталога (categories, products) для анонимных пользователей
+# (и наибольшее отставание остатков в них: заказы кеш не сбрасывают)
+RESPONSE_CACHE_TIMEOUT = int(os.getenv('RESPONSE_CACHE_TIMEOUT', 300))
+
+
+# Кеш аутентификации по токену: время жизни записи (секунды) и число записей в памяти процесса.
+# AUTH_TOKEN_CACHE_SHARED=true (по умолчанию) - хранить записи в общем кеше, если он общий для процессов
+# (CACHE_BACKEND=redis), тогда выход и изменение пользователя сразу видны всем процессам. С другими бэкендами
+# и с false записи хранятся в памяти процесса AUTH_TOKEN_CACHE_LOCAL_TTL секунд: столько другие процессы
+# могут пропускать запросы с удаленным токеном и видеть старые данные пользователя
+
+AUTH_TOKEN_CACHE_TTL = int(os.getenv('AUTH_TOKEN_CACHE_TTL', 60))
+
+AUTH_TOKEN_CACHE_LOCAL_TTL = int(os.getenv('AUTH_TOKEN_CACHE_LOCAL_TTL', 10))
+
+AUTH_TOKEN_CACHE_SIZE = int(os.getenv('AUTH_TOKEN_CACHE_SIZE', 10000))
+
+AUTH_TOKEN_CACHE_SHARED = os.getenv('AUTH_TOKEN_CACHE_SHARED', 'true').lower() == 'true'
+
+# Хеширование паролей при входе и регистрации выполняется в пуле потоков: одновременно не больше
+# PASSWORD_HASH_WORKERS (по умолчанию - число процессоров), еще PASSWORD_HASH_QUEUE ждут в очереди
+# не дольше PASSWORD_HASH_TIMEOUT секунд, остальные запросы получают ответ 503
+
+PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', 0)) or os.cpu_count() or 2
+
+PASSWORD_HASH_QUEUE = int(os.getenv('PASSWORD_HASH_QUEUE', 4 * PASSWORD_HASH_WORKERS))
+
+PASSWORD_HASH_TIMEOUT = float(os.getenv('PASSWORD_HASH_TIMEOUT', 5))
+
+# Async view (api/v1/async/...) под ASGI: в каждом процессе одновременно обрабатывается не больше
+# ASYNC_VIEW_CONCURRENCY запросов, остальные ждут не дольше ASYNC_VIEW_QUEUE_TIMEOUT секунд и получают ответ 503
+
+ASYNC_VIEW_CONCURRENCY = int(os.getenv('ASYNC_VIEW_CONCURRENCY', 20))
+
+ASYNC_VIEW_QUEUE_TIMEOUT = float(os.getenv('ASYNC_VIEW_QUEUE_TIMEOUT', 5))
+
+# Выгрузка заказов магазина (shop/orders/export/): заказы моложе EXPORT_DELAY секунд попадают в следующую выгрузку
+
+EXPORT_DELAY = int(os.getenv('EXPORT_DELAY', 60))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.1/ref/settings/#auth-password-validators
@@ -112,6 +222,13 @@ AUTH_PASSWORD_VALIDATORS = [
 
 AUTH_USER_MODEL = 'api_backend.UserModel'
 
+# Поиск товаров: конфигурация полнотекстового поиска Postgres
+# и поиск с учетом опечаток (требуется расширение pg_trgm)
+
+SEARCH_CONFIG = os.getenv('SEARCH_CONFIG', 'russian')
+
+SEARCH_TRIGRAM = os.getenv('SEARCH_TRIGRAM', 'true').lower() == 'true'
+
 # Internationalization
 # https://docs.djangoproject.com/en/4.1/topics/i18n/
 
@@ -135,15 +252,43 @@ STATIC_URL = 'static/'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
+    # JSON кодируется через orjson (если установлен, иначе - стандартным json)
+    'DEFAULT_RENDERER_CLASSES': [
+        'api_backend.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api_backend.authentication.CachedTokenAuthentication',
     ],
+    # лимиты считаются в кеше THROTTLE_CACHE (общем для процессов, CACHE_BACKEND=redis);
+    # view с атрибутом throttle_scope получают собственный лимит вместо общих user/anon
     'DEFAULT_THROTTLE_CLASSES': [
-        'rest_framework.throttling.UserRateThrottle',
-        'rest_framework.throttling.AnonRateThrottle',
+        'api_backend.throttling.UserSlidingWindowThrottle',
+        'api_backend.throttling.AnonSlidingWindowThrottle',
     ],
     'DEFAULT_THROTTLE_RATES': {
         'user': '60/minute',
         'anon': '10/minute',
-    }
+        'catalog': os.getenv('THROTTLE_CATALOG_RATE', '120/minute'),
+        'shop_update': '5/minute',
+    },
+    'PAGE_SIZE': int(os.getenv('PAGE_SIZE', 50)),
 }
+
+# Метрики запросов (заголовок Server-Timing и api/v1/metrics/ для Prometheus): METRICS_ENABLED=false - отключить,
+# METRICS_TOKEN - токен для доступа к api/v1/metrics/ (Authorization: Bearer ...), METRICS_DUPLICATE_QUERIES_WARNING -
+# сколько повторов одного SQL-запроса за обработку запроса записывается в лог как N+1
+
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
+METRICS_DUPLICATE_QUERIES_WARNING = int(os.getenv('METRICS_DUPLICATE_QUERIES_WARNING', 10))
+
+# Списки категорий и товаров сериализуются из строк values_list без полей DRF (FAST_SERIALIZERS=false - через
+# ModelSerializer)
+
+FAST_SERIALIZERS = os.getenv('FAST_SERIALIZERS', 'true').lower() == 'true'
+
+# PAGE_SIZE используется постраничным выводом, который задается в каждом view (pagination_class)
+SILENCED_SYSTEM_CHECKS = ['rest_framework.W001']
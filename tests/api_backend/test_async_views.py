@@ -0,0 +1,77 @@
+import pytest
+from rest_framework.test import APIClient
+from rest_framework.authtoken.models import Token
+
+from api_backend.models import UserModel, Shop, Category, Product, Parameter, ProductParameter, Order, OrderItem
+
+
+URL = 'http://127.0.0.1:8000/api/v1'
+
+
+# fixtures:
+
+@pytest.fixture
+def client():
+    return APIClient()
+
+
+@pytest.fixture
+def create_catalog(db):
+    user = UserModel.objects.create_user(email='async_shop@testmail.com', type='shop')
+    shop = Shop.objects.create(name='Test Shop', owner=user)
+    parameter = Parameter.objects.create(name='Цвет')
+    products = []
+    for n in range(1, 6):
+        category = Category.objects.create(name=f'test_category_{n}')
+        product = Product.objects.create(name=f'Test Product {n}', shop=shop, category=category,
+                                         external_id=n, quantity=10, price=1000, price_rcc=1500 * n)
+        ProductParameter.objects.create(product=product, parameter=parameter, value='черный' if n % 2 else 'белый')
+        products.append(product)
+    return products
+
+
+# tests:
+
+@pytest.mark.django_db
+def test_async_catalog_matches_sync(client, create_catalog):
+    print('\n>>> test_async_catalog_matches_sync')
+    product = create_catalog[0]
+    for path, params in (('products/', {'page_size': 2}),
+                         ('products/', {'price_gte': 3000, 'facets': 'true', 'fields': 'id,name'}),
+                         ('products/', {'param[Цвет]': 'черный'}),
+                         (f'products/{product.id}', {}),
+                         ('categories/', {})):
+        sync_response = client.get(f'{URL}/{path}', params)
+        async_response = client.get(f'{URL}/async/{path}', params)
+        assert async_response.status_code == 200
+        sync_data, async_data = sync_response.json(), async_response.json()
+        if isinstance(sync_data, dict) and sync_data.get('next'):
+            # ссылка на следующую страницу отличается адресом view, курсор - тот же
+            assert sync_data.pop('next').split('cursor=')[1] == async_data.pop('next').split('cursor=')[1]
+        assert async_data == sync_data
+
+
+@pytest.mark.django_db
+def test_async_pagination(client, create_catalog):
+    print('\n>>> test_async_pagination')
+    response = client.get(f'{URL}/async/products/', {'page_size': 2}).json()
+    names = [product['name'] for product in response['results']]
+    while response['next']:
+        response = client.get(response['next']).json()
+        names += [product['name'] for product in response['results']]
+    assert names == [f'Test Product {n}' for n in range(5, 0, -1)]
+    assert client.get(f'{URL}/async/products/', {'cursor': 'broken'}).status_code == 404
+    assert client.post(f'{URL}/async/products/').status_code == 405
+
+
+@pytest.mark.django_db
+def test_async_basket(client, create_catalog):
+    print('\n>>> test_async_basket')
+    assert client.get(f'{URL}/async/basket/').status_code == 401
+    user = UserModel.objects.create_user(email='async_buyer@testmail.com')
+    client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=user)}')
+    assert client.get(f'{URL}/async/basket/').json()['Message'] == 'Корзина пуста'
+    order = Order.objects.create(user=user, status='basket')
+    OrderItem.objects.create(order=order, product=create_catalog[1], quantity=2)
+    assert client.get(f'{URL}/async/basket/').json() == client.get(f'{URL}/basket/').json()
+    assert client.get(f'{URL}/async/basket/').json()['Примерная сумма заказа'] == 6000
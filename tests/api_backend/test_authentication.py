@@ -0,0 +1,176 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework.authtoken.models import Token
+
+from api_backend.models import UserModel, Shop, Category, Product, ClientContact, Order
+from api_backend.authentication import token_cache, TOKEN_CACHE_LOCAL_TTL
+from api_backend.caching import shared_cache
+
+
+URL = 'http://127.0.0.1:8000/api/v1'
+
+
+# fixtures:
+
+@pytest.fixture
+def client():
+    return APIClient()
+
+
+@pytest.fixture
+def user_client(client, db):
+    user = UserModel.objects.create_user(email='auth_user@testmail.com')
+    token = Token.objects.create(user=user)
+    client.credentials(HTTP_AUTHORIZATION=f'Token {token}')
+    client.user = user
+    return client
+
+
+def count_queries(client, url: str) -> int:
+    with CaptureQueriesContext(connection) as context:
+        client.get(url)
+    return len(context.captured_queries)
+
+
+# tests:
+
+@pytest.mark.django_db
+def test_token_cache(user_client):
+    print('\n>>> test_token_cache')
+    first = count_queries(user_client, f'{URL}/user/contact/')
+    # пользователь берется из кеша аутентификации, остается только запрос адреса
+    assert count_queries(user_client, f'{URL}/user/contact/') == 1
+    assert first == 2
+
+
+def test_token_cache_not_shared_without_redis():
+    print('\n>>> test_token_cache_not_shared_without_redis')
+    # тестовый кеш - locmem: он отдельный в каждом процессе, поэтому записи токенов живут в памяти процесса
+    # и истекают быстро, даже при AUTH_TOKEN_CACHE_SHARED=true
+    assert shared_cache() is False
+    assert token_cache.shared is False
+    assert token_cache.ttl == TOKEN_CACHE_LOCAL_TTL
+
+
+@pytest.mark.django_db
+def test_token_cache_invalidation(user_client, django_capture_on_commit_callbacks):
+    print('\n>>> test_token_cache_invalidation')
+    assert user_client.get(f'{URL}/user/contact/').json()['Error'] == 'Адрес отсутствует'
+    with django_capture_on_commit_callbacks(execute=True):
+        ClientContact.objects.create(user=user_client.user, city='Москва', street='Тверская', house='1',
+                                     phone='+79990000000')
+    assert user_client.get(f'{URL}/user/contact/').json()['city'] == 'Москва'
+
+    with django_capture_on_commit_callbacks(execute=True):
+        user_client.user.is_active = False
+        user_client.user.save()
+    assert user_client.get(f'{URL}/user/contact/').status_code == 401
+
+
+@pytest.mark.django_db
+def test_logout(user_client, django_capture_on_commit_callbacks):
+    print('\n>>> test_logout')
+    assert user_client.get(f'{URL}/basket/').status_code == 200
+    with django_capture_on_commit_callbacks(execute=True):
+        response = user_client.post(f'{URL}/user/logout/')
+    assert response.json()['Message'] == 'Выход выполнен'
+    assert not Token.objects.filter(user=user_client.user).exists()
+    assert user_client.get(f'{URL}/basket/').status_code == 401
+
+
+@pytest.mark.django_db
+def test_login_queries(client):
+    print('\n>>> test_login_queries')
+    user = UserModel.objects.create_user(email='auth_login@testmail.com', password='Jn9c2Xy6Qm*1')
+    data = {'email': user.email, 'password': 'Jn9c2Xy6Qm*1'}
+    token = client.post(f'{URL}/user/login/', data=data, format='json').json()['Token']
+    with CaptureQueriesContext(connection) as context:
+        response = client.post(f'{URL}/user/login/', data=data, format='json')
+    assert response.json()['Token'] == token
+    assert len(context.captured_queries) == 1
+
+    data['password'] = 'wrong'
+    assert client.post(f'{URL}/user/login/', data=data, format='json').json()['Status'] == 'Ошибка!'
+    data['email'] = 'nobody@testmail.com'
+    assert client.post(f'{URL}/user/login/', data=data, format='json').json()['Status'] == 'Ошибка!'
+
+
+@pytest.mark.django_db
+def test_register_queries(client):
+    print('\n>>> test_register_queries')
+    data = {'email': 'auth_register@testmail.com', 'password': 'Jn9c2Xy6Qm*1'}
+    with CaptureQueriesContext(connection) as context:
+        response = client.post(f'{URL}/user/register/', data=data, format='json')
+    assert response.json()['Message'] == 'Регистрация прошла успешно'
+    assert len(context.captured_queries) == 2
+    assert UserModel.objects.get(email=data['email']).check_password(data['password'])
+
+    response = client.post(f'{URL}/user/register/', data=data, format='json')
+    assert response.json()['Error'] == 'Пользователь с таким email уже существует'
+
+
+@pytest.mark.django_db
+def test_token_cache_stale_contact(user_client):
+    print('\n>>> test_token_cache_stale_contact')
+    # кеш аутентификации запомнил, что адреса нет, затем адрес создан без сброса кеша
+    user_client.get(f'{URL}/user/contact/')
+    ClientContact.objects.bulk_create([ClientContact(user=user_client.user, city='Москва', street='Тверская',
+                                                     house='1', phone='+79990000000')])
+    assert user_client.get(f'{URL}/user/contact/').json()['city'] == 'Москва'
+
+    shop = UserModel.objects.create_user(email='auth_shop@testmail.com', type='shop')
+    product = Product.objects.create(name='Test Product', shop=Shop.objects.create(name='Test Shop', owner=shop),
+                                     category=Category.objects.create(name='test_category_1'),
+                                     external_id=1, quantity=10, price=1000, price_rcc=1500)
+    user_client.post(f'{URL}/basket/', data={'items': [{'product': product.id, 'quantity': 1}]}, format='json')
+    assert user_client.post(f'{URL}/order/').json()['Status'] == 'Успешно'
+    assert Order.objects.get(user=user_client.user).contact.city == 'Москва'
+
+
+@pytest.mark.django_db
+def test_token_cache_shop_id(client):
+    print('\n>>> test_token_cache_shop_id')
+    user = UserModel.objects.create_user(email='auth_shop@testmail.com', type='shop')
+    client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=user)}')
+    # кеш аутентификации запомнил, что магазина нет, затем магазин создан без сброса кеша
+    assert client.get(f'{URL}/shop/').json()['Status'] == 'Ошибка!'
+    Shop.objects.bulk_create([Shop(name='Test Shop', owner=user)])
+    assert client.get(f'{URL}/shop/').json()['name'] == 'Test Shop'
+
+    # магазин из кеша аутентификации выбирается по id
+    token_cache.clear()
+    client.get(f'{URL}/shop/')
+    with CaptureQueriesContext(connection) as context:
+        assert client.get(f'{URL}/shop/').json()['name'] == 'Test Shop'
+    assert '"api_backend_shop"."id" =' in context.captured_queries[0]['sql']
+
+    # id в кеше устарел: магазин удален и создан заново
+    Shop.objects.filter(owner=user).delete()
+    Shop.objects.bulk_create([Shop(name='New Shop', owner=user)])
+    assert client.get(f'{URL}/shop/').json()['name'] == 'New Shop'
+
+
+@pytest.mark.django_db
+def test_checkout_replaced_contact(user_client):
+    print('\n>>> test_checkout_replaced_contact')
+    first = ClientContact.objects.create(user=user_client.user, city='Москва', street='Тверская', house='1',
+                                         phone='+79990000000')
+    shop = UserModel.objects.create_user(email='auth_shop@testmail.com', type='shop')
+    product = Product.objects.create(name='Test Product', shop=Shop.objects.create(name='Test Shop', owner=shop),
+                                     category=Category.objects.create(name='test_category_1'),
+                                     external_id=1, quantity=10, price=1000, price_rcc=1500)
+    user_client.post(f'{URL}/basket/', data={'items': [{'product': product.id, 'quantity': 1}]}, format='json')
+    # id адреса в кеше аутентификации устарел: адрес удален и создан заново
+    ClientContact.objects.filter(pk=first.pk).delete()
+    second = ClientContact.objects.create(user=user_client.user, city='Тверь', street='Советская', house='2',
+                                          phone='+79990000000')
+    response = user_client.post(f'{URL}/order/')
+    assert response.status_code == 200 and response.json()['Status'] == 'Успешно'
+    assert Order.objects.get(user=user_client.user).contact_id == second.id
+
+    user_client.post(f'{URL}/basket/', data={'items': [{'product': product.id, 'quantity': 1}]}, format='json')
+    ClientContact.objects.filter(pk=second.pk).delete()
+    response = user_client.post(f'{URL}/order/')
+    assert response.json()['Error'] == 'Для оформления заказа необходимо заполнить адрес'
@@ -0,0 +1,184 @@
+import pytest
+from django.db import connection, IntegrityError
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework.authtoken.models import Token
+
+from api_backend.models import UserModel, Shop, Category, Product, Order, OrderItem
+from api_backend.basket import basket_items, price_basket, basket_version, remember_summary
+
+
+URL = 'http://127.0.0.1:8000/api/v1'
+
+
+# fixtures:
+
+@pytest.fixture
+def client():
+    return APIClient()
+
+
+@pytest.fixture
+def create_products(db):
+    user = UserModel.objects.create_user(email='basket_shop@testmail.com', type='shop')
+    shop = Shop.objects.create(name='Test Shop', owner=user)
+    category = Category.objects.create(name='test_category_1')
+    return [Product.objects.create(name=f'Test Product {n}', shop=shop, category=category,
+                                   external_id=n, quantity=10, price=50000, price_rcc=59900)
+            for n in range(1, 6)]
+
+
+@pytest.fixture
+def buyer_client(client, db):
+    user = UserModel.objects.create_user(email='basket_buyer@testmail.com')
+    token = Token.objects.create(user=user)
+    client.credentials(HTTP_AUTHORIZATION=f'Token {token}')
+    client.user = user
+    return client
+
+
+def basket_quantities(user) -> dict:
+    return dict(OrderItem.objects.filter(order__user=user, order__status='basket')
+                .values_list('product_id', 'quantity'))
+
+
+# tests:
+
+@pytest.mark.django_db
+def test_basket_add_merges_quantities(buyer_client, create_products):
+    print('\n>>> test_basket_add_merges_quantities')
+    first, second = create_products[:2]
+    data = {'items': [{'product': first.id, 'quantity': 1},
+                      {'product': second.id, 'quantity': 2},
+                      {'product': first.id, 'quantity': 3}]}
+    response = buyer_client.post(f'{URL}/basket/', data=data, format='json')
+    assert response.json()['Message'] == 'Товары добавлены в корзину'
+    assert basket_quantities(buyer_client.user) == {first.id: 4, second.id: 2}
+
+    data = {'items': [{'product': first.id, 'quantity': 5}]}
+    buyer_client.post(f'{URL}/basket/', data=data, format='json')
+    assert basket_quantities(buyer_client.user) == {first.id: 9, second.id: 2}
+
+
+@pytest.mark.django_db
+def test_basket_add_constant_queries(buyer_client, create_products):
+    print('\n>>> test_basket_add_constant_queries')
+    buyer_client.post(f'{URL}/basket/', data={'items': [{'product': create_products[0].id, 'quantity': 1}]},
+                      format='json')
+
+    def count_queries(products):
+        data = {'items': [{'product': product.id, 'quantity': 1} for product in products]}
+        with CaptureQueriesContext(connection) as context:
+            buyer_client.post(f'{URL}/basket/', data=data, format='json')
+        return len(context.captured_queries)
+
+    assert count_queries(create_products[:1]) == count_queries(create_products)
+
+
+@pytest.mark.django_db
+def test_basket_add_errors(buyer_client, create_products):
+    print('\n>>> test_basket_add_errors')
+    response = buyer_client.post(f'{URL}/basket/', data={'items': [{'product': 0, 'quantity': 1}]}, format='json')
+    assert response.json()['Error'] == 'Товар не найден'
+    response = buyer_client.post(f'{URL}/basket/', data={'items': [{'product': create_products[0].id,
+                                                                    'quantity': 0}]}, format='json')
+    assert response.json()['Status'] == 'Ошибка!'
+    response = buyer_client.post(f'{URL}/basket/', data={'items': [{'quantity': 1}]}, format='json')
+    assert response.json()['Status'] == 'Ошибка!'
+    response = buyer_client.post(f'{URL}/basket/', data={'items': [{'product': 2 ** 40, 'quantity': 1}]},
+                                 format='json')
+    assert response.json()['Error'] == 'Товар не найден'
+    response = buyer_client.post(f'{URL}/basket/', data={'items': [{'product': 2 ** 70, 'quantity': 1}]},
+                                 format='json')
+    assert response.json()['Error'] == 'Товар не найден'
+    product_id = create_products[0].id
+    response = buyer_client.post(f'{URL}/basket/', data={'items': [{'product': product_id, 'quantity': 2 ** 31}]},
+                                 format='json')
+    assert response.json()['Status'] == 'Ошибка!'
+    assert basket_quantities(buyer_client.user) == {}
+
+    # количество в корзине вместе с добавляемым не помещается в OrderItem.quantity
+    items = [{'product': product_id, 'quantity': 2 ** 31 - 1}]
+    assert buyer_client.post(f'{URL}/basket/', data={'items': items}, format='json').json()['Status'] == 'OK'
+    response = buyer_client.post(f'{URL}/basket/', data={'items': [{'product': product_id, 'quantity': 1}]},
+                                 format='json')
+    assert response.status_code == 200 and response.json()['Status'] == 'Ошибка!'
+    assert basket_quantities(buyer_client.user) == {product_id: 2 ** 31 - 1}
+
+
+@pytest.mark.django_db
+def test_basket_delete(buyer_client, create_products):
+    print('\n>>> test_basket_delete')
+    data = {'items': [{'product': product.id, 'quantity': 1} for product in create_products]}
+    buyer_client.post(f'{URL}/basket/', data=data, format='json')
+    remove = [create_products[0].id, create_products[2].id]
+    with CaptureQueriesContext(connection) as context:
+        response = buyer_client.delete(f'{URL}/basket/', data={'products': ','.join(map(str, remove))},
+                                       format='json')
+    assert response.json()['Message'] == 'Товары удалены'
+    assert len([q for q in context.captured_queries if q['sql'].startswith('DELETE')]) == 1
+    assert set(basket_quantities(buyer_client.user)) == {p.id for p in create_products} - set(remove)
+
+    buyer_client.delete(f'{URL}/basket/', data={'products': ','.join(str(p.id) for p in create_products)},
+                        format='json')
+    response = buyer_client.delete(f'{URL}/basket/', data={'products': str(create_products[0].id)}, format='json')
+    assert response.json()['Message'] == 'Корзина пуста'
+
+
+@pytest.mark.django_db
+def test_order_item_unique(buyer_client, create_products):
+    print('\n>>> test_order_item_unique')
+    order = Order.objects.create(user=buyer_client.user, status='basket')
+    OrderItem.objects.create(order=order, product=create_products[0], quantity=1)
+    with pytest.raises(IntegrityError):
+        OrderItem.objects.create(order=order, product=create_products[0], quantity=1)
+
+
+@pytest.mark.django_db
+def test_basket_get_single_query(buyer_client, create_products):
+    print('\n>>> test_basket_get_single_query')
+    data = {'items': [{'product': product.id, 'quantity': n} for n, product in enumerate(create_products, 1)]}
+    buyer_client.post(f'{URL}/basket/', data=data, format='json')
+    with CaptureQueriesContext(connection) as context:
+        response = buyer_client.get(f'{URL}/basket/')
+    basket_queries = [q for q in context.captured_queries if 'api_backend_orderitem' in q['sql']]
+    assert len(basket_queries) == 1
+    result = response.json()
+    assert len(result['Корзина']) == 5
+    assert result['Примерная сумма заказа'] == 59900 * 15
+
+
+@pytest.mark.django_db
+def test_basket_summary_cache(buyer_client, create_products, django_capture_on_commit_callbacks):
+    print('\n>>> test_basket_summary_cache')
+    response = buyer_client.get(f'{URL}/basket/summary/')
+    assert response.json()['Позиций'] == 0
+
+    with django_capture_on_commit_callbacks(execute=True):
+        buyer_client.post(f'{URL}/basket/', data={'items': [{'product': create_products[0].id, 'quantity': 2}]},
+                          format='json')
+    response = buyer_client.get(f'{URL}/basket/summary/')
+    assert response.json()['Кол-во'] == 2
+    assert response.json()['Примерная сумма заказа'] == 59900 * 2
+
+    with CaptureQueriesContext(connection) as context:
+        buyer_client.get(f'{URL}/basket/summary/')
+    assert not [q for q in context.captured_queries if 'api_backend_orderitem' in q['sql']]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        buyer_client.delete(f'{URL}/basket/', data={'products': str(create_products[0].id)}, format='json')
+    assert buyer_client.get(f'{URL}/basket/summary/').json()['Позиций'] == 0
+
+
+@pytest.mark.django_db
+def test_basket_summary_stale_view(buyer_client, create_products, django_capture_on_commit_callbacks):
+    print('\n>>> test_basket_summary_stale_view')
+    user_id = buyer_client.user.id
+    # просмотр корзины прочитал позиции до добавления товара, а записывает итоги после
+    version = basket_version(user_id)
+    priced = price_basket(basket_items(user_id))
+    with django_capture_on_commit_callbacks(execute=True):
+        buyer_client.post(f'{URL}/basket/', data={'items': [{'product': create_products[0].id, 'quantity': 2}]},
+                          format='json')
+    remember_summary(user_id, version, priced)
+    assert buyer_client.get(f'{URL}/basket/summary/').json()['Кол-во'] == 2
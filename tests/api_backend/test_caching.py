@@ -0,0 +1,91 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework.authtoken.models import Token
+
+from api_backend.models import UserModel, Shop, Category, Product, ClientContact, Order, OrderItem
+from api_backend.checkout import checkout
+
+
+URL = 'http://127.0.0.1:8000/api/v1'
+
+
+# fixtures:
+
+@pytest.fixture
+def client():
+    return APIClient()
+
+
+@pytest.fixture
+def create_product(db):
+    user = UserModel.objects.create_user(email='caching@testmail.com', type='shop')
+    shop = Shop.objects.create(name='Test Shop', owner=user)
+    category = Category.objects.create(name='test_category_1')
+    return Product.objects.create(name='Test Product 1', shop=shop, category=category,
+                                  external_id=1111, quantity=10, price=50000, price_rcc=59900)
+
+
+# tests:
+
+@pytest.mark.django_db
+def test_products_response_cache(client, create_product):
+    print('\n>>> test_products_response_cache')
+    response = client.get(f'{URL}/products/?page_size=10&name=test')
+    assert response['X-Cache'] == 'MISS'
+    etag = response['ETag']
+
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(f'{URL}/products/?name=test&page_size=10')
+    assert response['X-Cache'] == 'HIT'
+    assert len(context.captured_queries) == 0
+    assert response.json()['results'][0]['name'] == 'Test Product 1'
+
+    response = client.get(f'{URL}/products/?name=test&page_size=10', HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+
+
+@pytest.mark.django_db
+def test_response_cache_invalidation(client, create_product, django_capture_on_commit_callbacks):
+    print('\n>>> test_response_cache_invalidation')
+    product = create_product
+    assert client.get(f'{URL}/products/{product.id}')['X-Cache'] == 'MISS'
+    assert client.get(f'{URL}/products/{product.id}')['X-Cache'] == 'HIT'
+
+    with django_capture_on_commit_callbacks(execute=True):
+        product.shop.state = False
+        product.shop.save()
+    response = client.get(f'{URL}/products/')
+    assert response['X-Cache'] == 'MISS'
+    assert response.json()['results'] == []
+    assert client.get(f'{URL}/products/{product.id}')['X-Cache'] == 'MISS'
+
+
+@pytest.mark.django_db
+def test_response_cache_kept_after_checkout(client, create_product, django_capture_on_commit_callbacks):
+    print('\n>>> test_response_cache_kept_after_checkout')
+    product = create_product
+    assert client.get(f'{URL}/products/{product.id}')['X-Cache'] == 'MISS'
+
+    user = UserModel.objects.create_user(email='caching_buyer@testmail.com')
+    contact = ClientContact.objects.create(user=user, city='Москва', street='Тверская', house='1',
+                                           phone='+79990000000')
+    order = Order.objects.create(user=user, status='basket')
+    OrderItem.objects.create(order=order, product=product, quantity=1)
+    with django_capture_on_commit_callbacks(execute=True):
+        checkout(user, contact.id)
+    assert Product.objects.get(pk=product.pk).quantity == 9
+    # заказ не сбрасывает кеш каталога: остаток в ответе обновится по истечении RESPONSE_CACHE_TIMEOUT
+    response = client.get(f'{URL}/products/{product.id}')
+    assert response['X-Cache'] == 'HIT'
+    assert response.json()['quantity'] == 10
+
+
+@pytest.mark.django_db
+def test_response_cache_skips_authenticated(client, create_product):
+    print('\n>>> test_response_cache_skips_authenticated')
+    token = Token.objects.create(user=create_product.shop.owner)
+    client.credentials(HTTP_AUTHORIZATION=f'Token {token}')
+    client.get(f'{URL}/categories/')
+    assert not client.get(f'{URL}/categories/').has_header('X-Cache')
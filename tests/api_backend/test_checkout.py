@@ -0,0 +1,86 @@
+import threading
+
+import pytest
+from django.db import connection
+
+from api_backend.models import UserModel, Shop, Category, Product, ClientContact, Order, OrderItem
+from api_backend.checkout import checkout, CheckoutError
+
+
+STOCK = 5
+BUYERS = 12
+
+
+# fixtures:
+
+@pytest.fixture
+def create_products(db):
+    user = UserModel.objects.create_user(email='checkout_shop@testmail.com', type='shop')
+    shop = Shop.objects.create(name='Test Shop', owner=user)
+    category = Category.objects.create(name='test_category_1')
+    return [Product.objects.create(name=f'Test Product {n}', shop=shop, category=category,
+                                   external_id=n, quantity=STOCK, price=1000, price_rcc=1500)
+            for n in range(1, 3)]
+
+
+def create_buyer(n: int, items: list):
+    user = UserModel.objects.create_user(email=f'checkout_buyer_{n}@testmail.com')
+    contact = ClientContact.objects.create(user=user, city='Москва', street='Тверская', house='1',
+                                           phone='+79990000000')
+    order = Order.objects.create(user=user, status='basket')
+    OrderItem.objects.bulk_create([OrderItem(order=order, product=product, quantity=quantity)
+                                   for product, quantity in items])
+    return user, contact.id
+
+
+# tests:
+
+@pytest.mark.django_db
+def test_checkout_reserves_stock(create_products):
+    print('\n>>> test_checkout_reserves_stock')
+    first, second = create_products
+    user, contact = create_buyer(1, [(first, 2), (second, 5)])
+    priced = checkout(user, contact)
+    assert priced['total'] == 1500 * 7
+    assert dict(Product.objects.values_list('id', 'quantity')) == {first.id: 3, second.id: 0}
+    assert Order.objects.get(user=user).status == 'new'
+
+    user, contact = create_buyer(2, [(first, 1), (second, 1)])
+    with pytest.raises(CheckoutError) as error:
+        checkout(user, contact)
+    assert error.value.problems == [{'product': second.id, 'error': 'Недостаточно товара', 'available': 0}]
+    assert Product.objects.get(pk=first.id).quantity == 3
+    assert Order.objects.get(user=user).status == 'basket'
+
+
+@pytest.mark.django_db(transaction=True)
+def test_checkout_concurrent(create_products):
+    print('\n>>> test_checkout_concurrent')
+    first, second = create_products
+    # половина покупателей кладет товары в корзину в обратном порядке:
+    # порядок блокировок не должен зависеть от порядка позиций
+    buyers = [create_buyer(n, [(first, 1), (second, 1)] if n % 2 else [(second, 1), (first, 1)])
+              for n in range(BUYERS)]
+    barrier = threading.Barrier(BUYERS)
+    results = []
+
+    def buy(user, contact):
+        barrier.wait()
+        try:
+            checkout(user, contact)
+            results.append('ok')
+        except CheckoutError:
+            results.append('rejected')
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=buy, args=buyer) for buyer in buyers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results.count('ok') == STOCK
+    assert results.count('rejected') == BUYERS - STOCK
+    assert dict(Product.objects.values_list('id', 'quantity')) == {first.id: 0, second.id: 0}
+    assert Order.objects.filter(status='new').count() == STOCK
@@ -0,0 +1,136 @@
+import os
+import threading
+
+import pytest
+from django.db import connection, connections, OperationalError
+from rest_framework.test import APIClient
+from rest_framework.authtoken.models import Token
+
+from api_backend.models import UserModel
+from api_backend.postgresql_pool.base import ConnectionPool, DatabaseWrapper, PoolTimeout, connect
+
+
+URL = 'http://127.0.0.1:8000/api/v1'
+
+
+# fixtures:
+
+@pytest.fixture
+def pool(db):
+    conn_params = connection.get_connection_params()
+    pool = ConnectionPool(lambda: connect(conn_params, {}), min_size=1, max_size=2, timeout=0.2, max_idle=0)
+    yield pool
+    pool.close()
+
+
+@pytest.fixture
+def pooled_wrapper(db):
+    # отдельный alias с бэкендом пула (обработчики connection_created ищут соединение по alias)
+    connections.settings['pooled_test'] = dict(connection.settings_dict, ENGINE='api_backend.postgresql_pool',
+                                               CONN_MAX_AGE=0, POOL={'MIN_SIZE': 1, 'MAX_SIZE': 2, 'TIMEOUT': 0.2})
+    wrapper = connections['pooled_test']
+    yield wrapper
+    wrapper.close()
+    if hasattr(wrapper, 'pool'):
+        wrapper.pool.close()
+    del connections['pooled_test']
+    del connections.settings['pooled_test']
+
+
+# tests:
+
+def test_pool_reuse_and_limits(pool):
+    print('\n>>> test_pool_reuse_and_limits')
+    pool.fill()
+    assert pool.stats()['size'] == 1 and pool.stats()['idle'] == 1
+    first = pool.get()
+    second = pool.get()
+    assert pool.stats()['saturation'] == 1
+    with pytest.raises(PoolTimeout):
+        pool.get()
+    assert pool.stats()['timeouts'] == 1
+
+    # соединение, освобожденное другим потоком, достается ожидающему
+    threading.Timer(0.05, pool.put, (second,)).start()
+    assert pool.get() is second
+    assert pool.stats()['waits'] == 1
+    pool.put(second)
+    pool.put(first)
+    # соединения сверх min_size с истекшим временем простоя закрываются
+    assert pool.stats()['size'] == 1
+    assert second.closed
+
+
+def test_pool_resets_connections(pool):
+    print('\n>>> test_pool_resets_connections')
+    first = pool.get()
+    first.autocommit = False
+    with first.cursor() as cursor:
+        cursor.execute('SELECT 1')
+    # незавершенная транзакция откатывается при возврате в пул
+    pool.put(first)
+    assert pool.get() is first
+    first.close()
+    # закрытое соединение не возвращается в пул
+    pool.put(first)
+    assert pool.stats()['size'] == 0
+    assert not pool.get().closed
+
+
+def test_pooled_backend(pooled_wrapper):
+    print('\n>>> test_pooled_backend')
+    with pooled_wrapper.cursor() as cursor:
+        cursor.execute('SELECT pg_backend_pid()')
+        pid = cursor.fetchone()[0]
+    raw_connection = pooled_wrapper.connection
+    pooled_wrapper.close()
+    assert not raw_connection.closed
+    assert pooled_wrapper.pool.stats()['in_use'] == 0
+
+    # следующий запрос получает то же соединение из пула
+    with pooled_wrapper.cursor() as cursor:
+        cursor.execute('SELECT pg_backend_pid()')
+        assert cursor.fetchone()[0] == pid
+    assert pooled_wrapper.get_autocommit()
+
+    other = DatabaseWrapper(pooled_wrapper.settings_dict, alias='pooled_test')
+    third = DatabaseWrapper(pooled_wrapper.settings_dict, alias='pooled_test')
+    other.ensure_connection()
+    with pytest.raises(OperationalError):
+        third.ensure_connection()
+    other.close()
+
+
+def test_pool_filled_on_create(pooled_wrapper):
+    print('\n>>> test_pool_filled_on_create')
+    # другие параметры подключения - отдельный пул
+    wrapper = DatabaseWrapper(dict(pooled_wrapper.settings_dict, OPTIONS={'application_name': 'pool_fill_test'},
+                                   POOL={'MIN_SIZE': 2, 'MAX_SIZE': 3, 'TIMEOUT': 0.2}), alias='pooled_test')
+    wrapper.ensure_connection()
+    stats = wrapper.pool.stats()
+    assert stats['size'] == 2 and stats['in_use'] == 1
+    wrapper.close()
+    wrapper.pool.close()
+
+
+@pytest.mark.django_db
+def test_pool_status_view(pooled_wrapper):
+    print('\n>>> test_pool_status_view')
+    client = APIClient()
+    user = UserModel.objects.create_user(email='pool_user@testmail.com')
+    client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=user)}')
+    assert client.get(f'{URL}/status/db-pool/').status_code == 403
+
+    admin = UserModel.objects.create_superuser(email='pool_admin@testmail.com', password='admin_password')
+    client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=admin)}')
+    pooled_wrapper.ensure_connection()
+    stats = client.get(f'{URL}/status/db-pool/').json()['Пулы']['pooled_test']
+    assert stats['in_use'] == 1 and stats['max_size'] == 2
+
+
+def test_connection_settings(settings):
+    print('\n>>> test_connection_settings')
+    database = connections['default'].settings_dict
+    assert database['CONN_HEALTH_CHECKS'] == (os.getenv('DB_CONN_HEALTH_CHECKS', 'true').lower() == 'true')
+    # с пулом соединение возвращается в пул после каждого запроса, без пула - используется повторно
+    assert database['CONN_MAX_AGE'] == (0 if settings.DB_POOL else int(os.getenv('DB_CONN_MAX_AGE', 60)))
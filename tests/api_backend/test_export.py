@@ -0,0 +1,95 @@
+import csv
+import json
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework.authtoken.models import Token
+
+from api_backend.models import UserModel, Shop, Category, Product, ClientContact, Order, OrderItem
+
+
+URL = 'http://127.0.0.1:8000/api/v1'
+
+
+# fixtures:
+
+@pytest.fixture
+def shop_client(db):
+    user = UserModel.objects.create_user(email='export_shop@testmail.com', type='shop')
+    shop = Shop.objects.create(name='Test Shop', owner=user)
+    category = Category.objects.create(name='test_category_1')
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=user)}')
+    client.products = [Product.objects.create(name=f'Товар {n}', shop=shop, category=category,
+                                              external_id=n, quantity=10, price=1000, price_rcc=1500)
+                       for n in range(1, 3)]
+    return client
+
+
+def create_order(client, n: int, status: str = 'new', age: int = 600):
+    """Заказ, оформленный age секунд назад"""
+    user = UserModel.objects.create_user(email=f'export_buyer_{n}@testmail.com')
+    contact = ClientContact.objects.create(user=user, city='Москва', street='Тверская', house='1',
+                                           phone='+79990000000')
+    order = Order.objects.create(user=user, status=status, contact=contact)
+    OrderItem.objects.bulk_create([OrderItem(order=order, product=product, quantity=n)
+                                   for product in client.products])
+    Order.objects.filter(pk=order.pk).update(date=timezone.now() - timedelta(seconds=age))
+    return order
+
+
+def read_body(response) -> str:
+    assert response.streaming
+    return b''.join(response.streaming_content).decode()
+
+
+# tests:
+
+@pytest.mark.django_db
+def test_export_csv(shop_client):
+    print('\n>>> test_export_csv')
+    order = create_order(shop_client, 1)
+    create_order(shop_client, 2, status='basket')
+    response = shop_client.get(f'{URL}/shop/orders/export/')
+    assert response['Content-Type'].startswith('text/csv')
+    rows = list(csv.DictReader(read_body(response).splitlines()))
+    assert len(rows) == 2
+    assert rows[0]['order'] == str(order.id)
+    assert rows[0]['name'] == 'Товар 1'
+    assert rows[0]['total'] == '1500'
+
+
+@pytest.mark.django_db
+def test_export_jsonl_since(shop_client, monkeypatch):
+    print('\n>>> test_export_jsonl_since')
+    first = create_order(shop_client, 1)
+    response = shop_client.get(f'{URL}/shop/orders/export/', {'output': 'jsonl'})
+    rows = [json.loads(line) for line in read_body(response).splitlines()]
+    assert {row['order'] for row in rows} == {first.id}
+    cursor = response['X-Export-Cursor']
+
+    # заказ моложе EXPORT_DELAY (транзакция могла еще не зафиксироваться) пока не выгружается
+    second = create_order(shop_client, 2, age=10)
+    response = shop_client.get(f'{URL}/shop/orders/export/', {'output': 'jsonl', 'since': cursor})
+    assert read_body(response) == ''
+
+    monkeypatch.setattr('api_backend.export.EXPORT_DELAY', 0)
+    response = shop_client.get(f'{URL}/shop/orders/export/', {'output': 'jsonl', 'since': cursor})
+    rows = [json.loads(line) for line in read_body(response).splitlines()]
+    assert {row['order'] for row in rows} == {second.id}
+    assert rows[0]['quantity'] == 2
+
+    response = shop_client.get(f'{URL}/shop/orders/export/', {'output': 'jsonl',
+                                                              'since': response['X-Export-Cursor']})
+    assert read_body(response) == ''
+
+
+@pytest.mark.django_db
+def test_export_errors(shop_client):
+    print('\n>>> test_export_errors')
+    assert shop_client.get(f'{URL}/shop/orders/export/', {'output': 'xlsx'}).json()['Status'] == 'Ошибка!'
+    assert shop_client.get(f'{URL}/shop/orders/export/', {'since': 'yesterday'}).json()['Status'] == 'Ошибка!'
+    response = shop_client.get(f'{URL}/shop/orders/export/', {'since': '2023-13-45T00:00:00Z'})
+    assert response.json()['Error'] == 'Неверный курсор выгрузки'
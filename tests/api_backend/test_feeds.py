@@ -0,0 +1,255 @@
+import io
+import json
+import time
+import threading
+
+import pytest
+from django.db import connection
+from pathlib import Path
+
+import requests
+from yaml import load as load_yaml, Loader
+
+from api_backend.models import UserModel, Shop, Product, ProductParameter, ClientContact, Order, OrderItem
+from api_backend.feeds import iter_feed, download_feed, PriceListError
+from api_backend.importer import load_price_list
+from api_backend.checkout import checkout
+
+
+TEST_FILE = Path(__file__).parent / 'upload_test_shop_products.yml'
+
+
+class BytesResponse:
+
+    def __init__(self, content, status_code=200, headers=None):
+        self.content = content
+        self.status_code = status_code
+        self.headers = headers or {}
+
+    def iter_content(self, chunk_size=1):
+        for n in range(0, len(self.content), chunk_size):
+            yield self.content[n:n + chunk_size]
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f'{self.status_code} Error')
+
+    def close(self):
+        pass
+
+
+def serve(monkeypatch, content: bytes, status_code=200, headers=None):
+    sent = []
+
+    def get(url, **kwargs):
+        assert kwargs.get('timeout')
+        sent.append(kwargs.get('headers'))
+        return BytesResponse(content, status_code, headers)
+
+    monkeypatch.setattr('api_backend.feeds.requests.get', get)
+    return sent
+
+
+@pytest.fixture
+def create_shop(db):
+    user = UserModel.objects.create_user(email='feeds@testmail.com', type='shop')
+    return Shop.objects.create(name='Test Shop', owner=user)
+
+
+# tests:
+
+def test_yaml_feed_matches_full_load():
+    print('\n>>> test_yaml_feed_matches_full_load')
+    content = TEST_FILE.read_bytes()
+    data = load_yaml(content, Loader=Loader)
+    records = list(iter_feed(io.BytesIO(content), 'yaml'))
+    assert records[0] == ('shop', data['shop'])
+    assert [value for key, value in records if key == 'good'] == data['goods']
+    assert records[-1] == ('goods_end', None)
+
+
+def test_yaml_feed_error():
+    print('\n>>> test_yaml_feed_error')
+    with pytest.raises(PriceListError):
+        list(iter_feed(io.BytesIO(b'shop: Test Shop\ngoods: [{name: "a"'), 'yaml'))
+
+
+def test_jsonl_feed_leading_blank_lines():
+    print('\n>>> test_jsonl_feed_leading_blank_lines')
+    content = b'\n  \n{"shop": "Test Shop"}\n{"shop": "not a shop record"}\n'
+    assert list(iter_feed(io.BytesIO(content), 'jsonl')) == [
+        ('shop', 'Test Shop'), ('good', {'shop': 'not a shop record'}), ('goods_end', None)]
+
+
+def test_download_feed_errors(monkeypatch):
+    print('\n>>> test_download_feed_errors')
+    serve(monkeypatch, b'<html>Not Found</html>', status_code=404)
+    with pytest.raises(PriceListError):
+        download_feed('http://testshop123.com/goods.yml')
+
+    def timeout(url, **kwargs):
+        raise requests.ReadTimeout('read timed out')
+
+    monkeypatch.setattr('api_backend.feeds.requests.get', timeout)
+    with pytest.raises(PriceListError):
+        download_feed('http://testshop123.com/goods.yml')
+
+
+@pytest.mark.django_db
+def test_load_price_list_jsonl(monkeypatch, create_shop):
+    print('\n>>> test_load_price_list_jsonl')
+    shop = create_shop
+    data = load_yaml(TEST_FILE.read_bytes(), Loader=Loader)
+    lines = [json.dumps({'shop': data['shop']})] + [json.dumps(good) for good in data['goods']]
+    serve(monkeypatch, '\n'.join(lines).encode())
+    result = load_price_list(shop.owner, 'http://testshop123.com/goods.jsonl')
+    assert result['products']['inserted'] == 3
+    assert Product.objects.filter(shop=shop).count() == 3
+
+
+@pytest.mark.django_db
+def test_load_price_list_in_batches(monkeypatch, create_shop):
+    print('\n>>> test_load_price_list_in_batches')
+    shop = create_shop
+    serve(monkeypatch, TEST_FILE.read_bytes())
+    monkeypatch.setattr('api_backend.importer.BATCH_SIZE', 2)
+    progress = []
+    result = load_price_list(shop.owner, 'http://testshop123.com/goods.yml',
+                             progress=lambda phase, processed: progress.append((phase, processed)))
+    assert result['products'] == {'inserted': 3, 'updated': 0, 'unchanged': 0}
+    assert ('importing', 2) in progress and ('importing', 3) in progress
+    product = Product.objects.get(shop=shop, name='Product 1')
+    assert ProductParameter.objects.get(product=product, parameter__name='Диагональ (дюйм)').value == '6.6'
+
+
+@pytest.mark.django_db
+def test_load_price_list_error_rolls_back(monkeypatch, create_shop):
+    print('\n>>> test_load_price_list_error_rolls_back')
+    shop = create_shop
+    data = load_yaml(TEST_FILE.read_bytes(), Loader=Loader)
+    lines = [json.dumps({'shop': data['shop']})] + [json.dumps(good) for good in data['goods']] + ['{broken']
+    serve(monkeypatch, '\n'.join(lines).encode())
+    monkeypatch.setattr('api_backend.importer.BATCH_SIZE', 2)
+    with pytest.raises(PriceListError):
+        load_price_list(shop.owner, 'http://testshop123.com/goods.jsonl')
+    # первый пакет уже был записан, но прайс-лист не применяется частично
+    assert Product.objects.filter(shop=shop).count() == 0
+    shop.refresh_from_db()
+    assert shop.feed_hash == ''
+
+
+@pytest.mark.django_db
+def test_load_price_list_unchanged_feed(monkeypatch, create_shop):
+    print('\n>>> test_load_price_list_unchanged_feed')
+    shop = create_shop
+    url = 'http://testshop123.com/goods.yml'
+    content = TEST_FILE.read_bytes()
+    sent = serve(monkeypatch, content, headers={'ETag': '"v1"'})
+    assert load_price_list(shop.owner, url)['feed'] == 'updated'
+    shop.refresh_from_db()
+    assert shop.feed_etag == '"v1"'
+
+    result = load_price_list(shop.owner, url)
+    assert result['feed'] == 'unchanged'
+    assert sent[-1] == {'If-None-Match': '"v1"'}
+
+    serve(monkeypatch, b'', status_code=304)
+    assert load_price_list(shop.owner, url)['feed'] == 'unchanged'
+
+    serve(monkeypatch, content.replace(b'price_rcc: 12990', b'price_rcc: 11990'))
+    result = load_price_list(shop.owner, url)
+    assert result['feed'] == 'updated'
+    assert result['products'] == {'inserted': 0, 'updated': 1, 'unchanged': 2}
+    assert result['parameters']['inserted'] == 0 and result['parameters']['updated'] == 0
+
+
+@pytest.mark.django_db
+def test_changed_feed_restores_stock_after_checkout(monkeypatch, create_shop):
+    print('\n>>> test_changed_feed_restores_stock_after_checkout')
+    shop = create_shop
+    url = 'http://testshop123.com/goods.yml'
+    serve(monkeypatch, TEST_FILE.read_bytes(), headers={'ETag': '"v1"'})
+    load_price_list(shop.owner, url)
+    stock = dict(Product.objects.filter(shop=shop).values_list('id', 'quantity'))
+
+    user = UserModel.objects.create_user(email='feeds_buyer@testmail.com')
+    contact = ClientContact.objects.create(user=user, city='Москва', street='Тверская', house='1',
+                                           phone='+79990000000')
+    order = Order.objects.create(user=user, status='basket')
+    product = Product.objects.filter(shop=shop).first()
+    OrderItem.objects.create(order=order, product=product, quantity=1)
+    checkout(user, contact.id)
+    assert Product.objects.get(pk=product.pk).quantity == stock[product.pk] - 1
+
+    # тот же файл пропускается, заказ не сбрасывает данные о загруженном прайс-листе
+    assert load_price_list(shop.owner, url)['feed'] == 'unchanged'
+    assert Product.objects.get(pk=product.pk).quantity == stock[product.pk] - 1
+
+    # в новой версии файла изменена только цена одного товара: остаток заказанного товара
+    # берется из файла, хотя его содержимое (отпечаток) не изменилось
+    data = load_yaml(TEST_FILE.read_bytes(), Loader=Loader)
+    changed = next(good for good in data['goods'] if good['external_id'] != product.external_id)
+    changed['price'] += 1
+    lines = [json.dumps({'shop': data['shop']})] + [json.dumps(good, ensure_ascii=False) for good in data['goods']]
+    serve(monkeypatch, '\n'.join(lines).encode(), headers={'ETag': '"v2"'})
+    result = load_price_list(shop.owner, url, feed_format='jsonl')
+    assert result['feed'] == 'updated'
+    assert result['products'] == {'inserted': 0, 'updated': 2, 'unchanged': len(data['goods']) - 2}
+    assert dict(Product.objects.filter(shop=shop).values_list('id', 'quantity')) == stock
+    assert Product.objects.get(pk=product.pk).content_hash != ''
+
+
+@pytest.mark.django_db(transaction=True)
+def test_import_concurrent_with_checkout(monkeypatch, create_shop):
+    print('\n>>> test_import_concurrent_with_checkout')
+    shop = create_shop
+    data = load_yaml(TEST_FILE.read_bytes(), Loader=Loader)
+    serve(monkeypatch, TEST_FILE.read_bytes())
+    load_price_list(shop.owner, 'http://testshop123.com/goods.yml')
+    products = list(Product.objects.filter(shop=shop).order_by('pk'))
+
+    user = UserModel.objects.create_user(email='feeds_buyer@testmail.com')
+    contact = ClientContact.objects.create(user=user, city='Москва', street='Тверская', house='1',
+                                           phone='+79990000000')
+    order = Order.objects.create(user=user, status='basket')
+    OrderItem.objects.bulk_create([OrderItem(order=order, product=products[0], quantity=1),
+                                   OrderItem(order=order, product=products[-1], quantity=1)])
+
+    # товары в файле - в обратном порядке id, по одному в пакете: импорт блокирует строки
+    # в порядке, обратном порядку блокировок при оформлении заказа
+    goods = [dict(good, quantity=good['quantity'] + 5) for good in reversed(data['goods'])]
+    lines = [json.dumps({'shop': data['shop']})] + [json.dumps(good, ensure_ascii=False) for good in goods]
+    serve(monkeypatch, '\n'.join(lines).encode())
+    monkeypatch.setattr('api_backend.importer.BATCH_SIZE', 1)
+    first_batch = threading.Event()
+    errors = []
+
+    def progress(phase, processed):
+        if phase == 'importing' and processed == 1:
+            first_batch.set()
+            time.sleep(0.5)
+
+    def run(target):
+        try:
+            target()
+        except Exception as e:
+            errors.append(e)
+        finally:
+            first_batch.set()
+            connection.close()
+
+    importer = threading.Thread(target=run, args=(lambda: load_price_list(
+        shop.owner, 'http://testshop123.com/goods.jsonl', progress=progress),))
+    buyer = threading.Thread(target=run, args=(lambda: first_batch.wait(5) and checkout(user, contact.id),))
+    importer.start()
+    buyer.start()
+    importer.join()
+    buyer.join()
+
+    assert errors == []
+    quantities = {good['external_id']: good['quantity'] for good in goods}
+    stock = dict(Product.objects.filter(shop=shop).values_list('external_id', 'quantity'))
+    # заказ оформлен после загрузки: остатки из файла минус заказанные товары
+    assert stock == {external_id: quantity - (external_id in (products[0].external_id, products[-1].external_id))
+                     for external_id, quantity in quantities.items()}
+    assert Order.objects.get(user=user).status == 'new'
@@ -0,0 +1,97 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api_backend.models import UserModel, Shop, Category, Product, ProductParameter
+from api_backend.importer import import_products
+from api_backend.interning import category_names
+
+
+PARAMETERS = ('Диагональ (дюйм)', 'Оперативная память (Гб)', 'Встроенная память (Гб)', 'Цвет')
+
+
+def generate_goods(count: int, prefix: str = '') -> list:
+    goods = []
+    for n in range(count):
+        goods.append({
+            'name': f'Product {n}',
+            'brand': 'Brand A',
+            'model': f'M{n}',
+            'category': f'{prefix}Category {n % 5}',
+            'external_id': 100000 + n,
+            'quantity': 10,
+            'price': 10000,
+            'price_rcc': 12990,
+            'parameters': {f'{prefix}{name}': n % 3 for name in PARAMETERS},
+        })
+    return goods
+
+
+def create_shop(name: str):
+    user = UserModel.objects.create_user(email=f'{name}@testmail.com', type='shop')
+    return Shop.objects.create(name=name, owner=user)
+
+
+# tests:
+
+@pytest.mark.django_db
+def test_import_products_counts():
+    print('\n>>> test_import_products_counts')
+    shop = create_shop('import_shop')
+    goods = generate_goods(10)
+    result = import_products(shop, goods)
+    assert result['products'] == {'inserted': 10, 'updated': 0, 'unchanged': 0}
+    assert result['parameters'] == {'inserted': 40, 'updated': 0, 'unchanged': 0}
+    assert Product.objects.filter(shop=shop).count() == 10
+    assert ProductParameter.objects.filter(product__shop=shop).count() == 40
+
+    goods[0]['price_rcc'] = 11990
+    goods[1]['parameters']['Цвет'] = 'черный'
+    result = import_products(shop, goods)
+    assert result['products'] == {'inserted': 0, 'updated': 2, 'unchanged': 8}
+    assert result['parameters'] == {'inserted': 0, 'updated': 1, 'unchanged': 39}
+    assert Product.objects.get(shop=shop, external_id=100000).price_rcc == 11990
+
+
+@pytest.mark.django_db
+def test_import_products_query_count_is_constant():
+    print('\n>>> test_import_products_query_count_is_constant')
+    query_counts = []
+    for count, prefix in ((10, 'a'), (300, 'b')):
+        shop = create_shop(f'shop_{prefix}')
+        with CaptureQueriesContext(connection) as context:
+            import_products(shop, generate_goods(count, prefix))
+        query_counts.append(len(context.captured_queries))
+    assert query_counts[0] == query_counts[1]
+
+
+@pytest.mark.django_db
+def test_import_products_skips_unchanged():
+    print('\n>>> test_import_products_skips_unchanged')
+    shop = create_shop('hash_shop')
+    goods = generate_goods(20)
+    import_products(shop, goods)
+    with CaptureQueriesContext(connection) as context:
+        result = import_products(shop, goods)
+    assert result['products'] == {'inserted': 0, 'updated': 0, 'unchanged': 20}
+    assert not [q for q in context.captured_queries if q['sql'].startswith(('INSERT', 'UPDATE'))]
+
+
+@pytest.mark.django_db
+def test_name_cache():
+    print('\n>>> test_name_cache')
+    category_names.invalidate()
+    ids = category_names.resolve({'Смартфоны', 'Телевизоры'})
+    assert Category.objects.filter(name__in=ids).count() == 2
+    with CaptureQueriesContext(connection) as context:
+        assert category_names.resolve({'Смартфоны'}) == {'Смартфоны': ids['Смартфоны']}
+    assert len(context.captured_queries) == 1
+
+    category_names.preload()
+    with CaptureQueriesContext(connection) as context:
+        assert category_names.resolve({'Смартфоны', 'Телевизоры'}) == ids
+    assert len(context.captured_queries) == 0
+
+    Category.objects.filter(name='Телевизоры').delete()
+    Category.objects.get(name='Смартфоны').delete()
+    assert category_names.ids == {}
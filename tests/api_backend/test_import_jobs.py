@@ -0,0 +1,90 @@
+import pytest
+from pathlib import Path
+from rest_framework.test import APIClient
+from rest_framework.authtoken.models import Token
+
+from api_backend.models import UserModel, Shop, Product, ImportJob
+from api_backend.jobs import run_pending_jobs
+
+
+URL = 'http://127.0.0.1:8000/api/v1'
+
+TEST_SHOP = 'Test Shop'
+TEST_FILE_URL = 'https://raw.githubusercontent.com/gchernousov/diplom/master/tests/api_backend/upload_test_shop_products.yml'
+TEST_FILE = Path(__file__).parent / 'upload_test_shop_products.yml'
+
+
+class FileResponse:
+
+    status_code = 200
+    headers = {}
+
+    def __init__(self, path):
+        self.content = path.read_bytes()
+
+    def iter_content(self, chunk_size=1):
+        for n in range(0, len(self.content), chunk_size):
+            yield self.content[n:n + chunk_size]
+
+    def raise_for_status(self):
+        pass
+
+    def close(self):
+        pass
+
+
+# fixtures:
+
+@pytest.fixture
+def client():
+    return APIClient()
+
+
+@pytest.fixture
+def create_shop(db):
+    user = UserModel.objects.create_user(email='import_jobs@testmail.com', type='shop')
+    token = Token.objects.create(user=user)
+    shop = Shop.objects.create(name=TEST_SHOP, owner=user)
+    return shop, token
+
+
+@pytest.fixture
+def local_price_list(monkeypatch):
+    monkeypatch.setattr('api_backend.feeds.requests.get', lambda url, **kwargs: FileResponse(TEST_FILE))
+
+
+# tests:
+
+@pytest.mark.django_db
+def test_import_job(client, create_shop, local_price_list):
+    print('\n>>> test_import_job')
+    shop, token = create_shop
+    client.credentials(HTTP_AUTHORIZATION=f'Token {token}')
+    response = client.post(f'{URL}/shop/import/', data={'url': TEST_FILE_URL}, format='json')
+    assert response.status_code == 200
+    job_id = response.json()['Job']
+    assert ImportJob.objects.get(pk=job_id).phase == 'queued'
+    assert Product.objects.count() == 0
+
+    assert run_pending_jobs() == 1
+
+    response = client.get(f'{URL}/shop/import/{job_id}')
+    assert response.status_code == 200
+    job = response.json()
+    assert job['phase'] == 'done'
+    assert job['processed'] == 3
+    assert job['result']['products']['inserted'] == 3
+    assert Product.objects.filter(shop=shop).count() == 3
+
+
+@pytest.mark.django_db
+def test_import_job_wrong_shop(client, create_shop, local_price_list):
+    print('\n>>> test_import_job_wrong_shop')
+    shop, token = create_shop
+    shop.name = 'Another Shop'
+    shop.save()
+    job = ImportJob.objects.create(user=shop.owner, url=TEST_FILE_URL)
+    run_pending_jobs()
+    job.refresh_from_db()
+    assert job.phase == 'failed'
+    assert job.error == 'Неправильное название магазина'
@@ -0,0 +1,88 @@
+import pytest
+from django.db import connection, IntegrityError
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api_backend.models import UserModel, Shop, Category, Product, Order
+from api_backend.pagination import ProductPagination, ShopOrderPagination
+from api_backend.basket import user_basket, user_orders, basket_items
+from api_backend.catalog import product_queryset
+from api_backend.importer import shop_products
+from api_backend.views import ProductView
+
+
+# fixtures:
+
+@pytest.fixture
+def create_data(db):
+    user = UserModel.objects.create_user(email='indexes_shop@testmail.com', type='shop')
+    shop = Shop.objects.create(name='Test Shop', owner=user)
+    category = Category.objects.create(name='test_category_1')
+    Product.objects.create(name='Test Product 1', shop=shop, category=category,
+                           external_id=1, quantity=10, price=1000, price_rcc=1500)
+    buyer = UserModel.objects.create_user(email='indexes_buyer@testmail.com')
+    Order.objects.create(user=buyer, status='basket')
+    return shop, category, buyer
+
+
+@pytest.fixture
+def no_seqscan(db):
+    """На маленьких тестовых таблицах планировщик выбирает последовательное чтение,
+    поэтому для проверки применимости индексов оно отключается"""
+    with connection.cursor() as cursor:
+        cursor.execute('SET enable_seqscan = off')
+    yield
+    with connection.cursor() as cursor:
+        cursor.execute('RESET enable_seqscan')
+
+
+# tests:
+
+def page_plan(view_class, query: str) -> str:
+    """План запроса страницы так, как его строит view: get_queryset и постраничный вывод"""
+    request = Request(APIRequestFactory().get(f'/?{query}'))
+    view = view_class(request=request, format_kwarg=None)
+    queryset = view.pagination_class().page_queryset(view.get_queryset(), request, view)
+    return queryset.explain()
+
+
+@pytest.mark.django_db
+def test_hot_queries_use_indexes(create_data, no_seqscan):
+    print('\n>>> test_hot_queries_use_indexes')
+    shop, category, buyer = create_data
+    queries = (
+        (user_basket(buyer.id).explain(), ('order_single_basket', 'order_user_status_idx')),
+        (user_orders(buyer.id).explain(), ('order_user_status_idx',)),
+        (basket_items(buyer.id).explain(), ('order_single_basket', 'order_user_status_idx')),
+        (shop_products(shop, [1, 2]).explain(), ('product_shop_external_id_unique',)),
+        (product_queryset({'category': category.id, 'price_lte': 2000})[0].explain(),
+         ('product_category_price_idx',)),
+        (page_plan(ProductView, f'category={category.id}&price_lte=2000'),
+         ('product_category_price_idx', 'product_name_id_idx')),
+    )
+    for plan, indexes in queries:
+        assert 'Seq Scan' not in plan, plan
+        assert any(index in plan for index in indexes), plan
+
+
+@pytest.mark.django_db
+def test_keyset_page_uses_index_range(create_data, no_seqscan):
+    print('\n>>> test_keyset_page_uses_index_range')
+    for pagination, queryset, position, index in (
+            (ProductPagination(), Product.objects.all(), ['Test Product 5', 10], 'product_name_id_idx'),
+            (ShopOrderPagination(), Order.objects.all(), ['2023-01-31 12:00:00+00:00', 10], 'order_date_id_idx')):
+        queryset = queryset.filter(pagination.keyset_filter(position)).order_by(*pagination.ordering)[:50]
+        plan = queryset.explain()
+        # следующая страница - один диапазон индекса, условие по ключу целиком в Index Cond
+        assert index in plan and 'Index Cond: (ROW(' in plan, plan
+        assert 'Filter' not in plan, plan
+
+
+@pytest.mark.django_db
+def test_single_basket(create_data):
+    print('\n>>> test_single_basket')
+    shop, category, buyer = create_data
+    Order.objects.create(user=buyer, status='new')
+    assert Order.objects.get_or_create(user=buyer, status='basket')[1] is False
+    with pytest.raises(IntegrityError):
+        Order.objects.create(user=buyer, status='basket')
@@ -0,0 +1,126 @@
+import re
+import logging
+
+import pytest
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.http import HttpResponse
+from django.test import RequestFactory, AsyncClient
+from rest_framework.test import APIClient
+from rest_framework.authtoken.models import Token
+
+from api_backend import metrics
+from api_backend.models import UserModel, Shop, Category, Product
+
+
+URL = 'http://127.0.0.1:8000/api/v1'
+
+
+# fixtures:
+
+@pytest.fixture
+def client():
+    return APIClient()
+
+
+@pytest.fixture
+def create_products(db):
+    user = UserModel.objects.create_user(email='metrics_shop@testmail.com', type='shop')
+    shop = Shop.objects.create(name='Test Shop', owner=user)
+    category = Category.objects.create(name='test_category_1')
+    return [Product.objects.create(name=f'Test Product {n}', shop=shop, category=category,
+                                   external_id=n, quantity=10, price=50000, price_rcc=59900)
+            for n in range(1, 4)]
+
+
+def metric_value(text: str, line_start: str) -> float:
+    for line in text.splitlines():
+        if line.startswith(line_start):
+            return float(line.rsplit(' ', 1)[1])
+    return 0
+
+
+# tests:
+
+@pytest.mark.django_db
+def test_server_timing(client, create_products):
+    print('\n>>> test_server_timing')
+    response = client.get(f'{URL}/products/')
+    timing = response['Server-Timing']
+    match = re.fullmatch(r'db;dur=([\d.]+);desc="(\d+) queries, (\d+) duplicates", '
+                         r'serialize;dur=([\d.]+), total;dur=([\d.]+)', timing)
+    assert match, timing
+    db_time, queries, duplicates, serialize, total = map(float, match.groups())
+    assert queries >= 1 and duplicates == 0
+    assert 0 < serialize < total and db_time < total
+
+
+@pytest.mark.django_db
+def test_duplicate_queries(create_products, monkeypatch, caplog):
+    print('\n>>> test_duplicate_queries')
+    monkeypatch.setattr(metrics, 'DUPLICATE_QUERIES_WARNING', 3)
+
+    def n_plus_one(request):
+        for product in Product.objects.all():
+            product.shop.name
+        return HttpResponse()
+
+    with caplog.at_level(logging.WARNING, logger='api_backend.metrics'):
+        response = metrics.RequestMetricsMiddleware(n_plus_one)(RequestFactory().get('/n-plus-one/'))
+    assert 'desc="4 queries, 2 duplicates"' in response['Server-Timing']
+    assert 'вероятно, N+1' in caplog.text and 'api_backend_shop' in caplog.text
+
+
+@pytest.mark.django_db
+def test_server_timing_async(create_products):
+    print('\n>>> test_server_timing_async')
+
+    async def get_response(request):
+        pass
+
+    assert iscoroutinefunction(metrics.RequestMetricsMiddleware(get_response))
+
+    async def get_products():
+        # async view под ASGI: запросы к базе выполняются в другом потоке (sync_to_async)
+        return await AsyncClient().get(f'{URL}/async/products/')
+
+    response = async_to_sync(get_products)()
+    assert response.status_code == 200
+    queries = int(re.search(r'desc="(\d+) queries', response['Server-Timing']).group(1))
+    assert queries >= 1
+
+
+@pytest.mark.django_db
+def test_metrics_endpoint(client, create_products, settings):
+    print('\n>>> test_metrics_endpoint')
+    settings.METRICS_TOKEN = ''
+    # без METRICS_TOKEN метрики доступны только администратору
+    assert client.get(f'{URL}/metrics/').status_code == 401
+    admin = UserModel.objects.create_superuser(email='metrics_admin@testmail.com', password='admin_password')
+    admin_client = APIClient()
+    admin_client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=admin)}')
+
+    labels = 'endpoint="api/v1/products/",method="GET"'
+    before = metric_value(admin_client.get(f'{URL}/metrics/').content.decode(),
+                          f'http_request_duration_seconds_count{{{labels}}}')
+    for _ in range(3):
+        client.get(f'{URL}/products/')
+
+    response = admin_client.get(f'{URL}/metrics/')
+    assert response['Content-Type'].startswith('text/plain')
+    text = response.content.decode()
+    assert metric_value(text, f'http_request_duration_seconds_count{{{labels}}}') == before + 3
+    assert metric_value(text, f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}}') == before + 3
+    assert metric_value(text, f'http_requests_total{{{labels},status="200"}}') >= 3
+    assert '# TYPE http_request_db_queries histogram' in text
+    assert 'http_request_serialization_seconds_sum' in text
+
+    # нестандартные методы учитываются одной серией other
+    for method in ('FOO', 'BAR'):
+        client.generic(method, f'{URL}/products/')
+    text = admin_client.get(f'{URL}/metrics/').content.decode()
+    assert metric_value(text, 'http_request_duration_seconds_count{endpoint="api/v1/products/",method="other"}') >= 2
+    assert 'method="FOO"' not in text and 'method="BAR"' not in text
+
+    settings.METRICS_TOKEN = 'secret'
+    assert client.get(f'{URL}/metrics/').status_code == 403
+    assert client.get(f'{URL}/metrics/', HTTP_AUTHORIZATION='Bearer secret').status_code == 200
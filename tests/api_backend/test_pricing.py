@@ -0,0 +1,80 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework.authtoken.models import Token
+
+from api_backend.models import UserModel, Shop, Category, Product, ClientContact
+from api_backend.pricing import price_items
+
+
+URL = 'http://127.0.0.1:8000/api/v1'
+
+
+# fixtures:
+
+@pytest.fixture
+def client():
+    return APIClient()
+
+
+@pytest.fixture
+def create_products(db):
+    user = UserModel.objects.create_user(email='pricing_shop@testmail.com', type='shop')
+    shop = Shop.objects.create(name='Test Shop', owner=user)
+    category = Category.objects.create(name='test_category_1')
+    return [Product.objects.create(name=f'Test Product {n}', shop=shop, category=category,
+                                   external_id=n, quantity=n, price=1000 * n, price_rcc=1500 * n)
+            for n in range(1, 6)]
+
+
+@pytest.fixture
+def buyer_client(client, db):
+    user = UserModel.objects.create_user(email='pricing_buyer@testmail.com')
+    ClientContact.objects.create(user=user, city='Москва', street='Тверская', house='1', phone='+79990000000')
+    token = Token.objects.create(user=user)
+    client.credentials(HTTP_AUTHORIZATION=f'Token {token}')
+    return client
+
+
+# tests:
+
+@pytest.mark.django_db
+def test_price_items_single_query(create_products):
+    print('\n>>> test_price_items_single_query')
+    items = [(product.id, 1) for product in create_products]
+    with CaptureQueriesContext(connection) as context:
+        priced = price_items(items + [(create_products[-1].id, 1)])
+    assert len(context.captured_queries) == 1
+    assert priced['total'] == 1500 * (1 + 2 + 3 + 4 + 5) + 1500 * 5
+    assert priced['lines'][-1]['quantity'] == 2
+    assert priced['problems'] == []
+
+
+@pytest.mark.django_db
+def test_price_items_problems(create_products):
+    print('\n>>> test_price_items_problems')
+    first, second = create_products[:2]
+    priced = price_items([(first.id, 5), (0, 1)])
+    assert priced['problems'] == [{'product': first.id, 'error': 'Недостаточно товара', 'available': 1},
+                                  {'product': 0, 'error': 'Товар не найден'}]
+    Shop.objects.filter(pk=second.shop_id).update(state=False)
+    priced = price_items([(second.id, 1)])
+    assert priced['problems'] == [{'product': second.id, 'error': 'Магазин не принимает заказы'}]
+
+
+@pytest.mark.django_db
+def test_checkout_reports_unavailable(buyer_client, create_products):
+    print('\n>>> test_checkout_reports_unavailable')
+    first, second = create_products[:2]
+    data = {'items': [{'product': first.id, 'quantity': 3}, {'product': second.id, 'quantity': 1}]}
+    buyer_client.post(f'{URL}/basket/', data=data, format='json')
+    response = buyer_client.post(f'{URL}/order/')
+    result = response.json()
+    assert result['Status'] == 'Ошибка!'
+    assert result['Товары'] == [{'product': first.id, 'error': 'Недостаточно товара', 'available': 1}]
+
+    buyer_client.delete(f'{URL}/basket/', data={'products': str(first.id)}, format='json')
+    result = buyer_client.post(f'{URL}/order/').json()
+    assert result['Message'] == 'Заказ оформлен'
+    assert result['Сумма заказа'] == 3000
@@ -0,0 +1,109 @@
+import pytest
+from rest_framework.test import APIClient
+
+from api_backend.models import UserModel, Shop, Category, Product, Parameter, ProductParameter
+
+
+URL = 'http://127.0.0.1:8000/api/v1'
+
+
+# fixtures:
+
+@pytest.fixture
+def client():
+    return APIClient()
+
+
+@pytest.fixture
+def create_products(db):
+    user = UserModel.objects.create_user(email='products@testmail.com', type='shop')
+    shop = Shop.objects.create(name='Test Shop', owner=user)
+    category = Category.objects.create(name='test_category_1')
+    products = []
+    for n in range(7):
+        products.append(Product.objects.create(name=f'Product {n % 3}', shop=shop, category=category,
+                                               external_id=n, quantity=10, price=100 * n, price_rcc=120 * n))
+    return products
+
+
+# tests:
+
+@pytest.mark.django_db
+def test_products_keyset_pagination(client, create_products):
+    print('\n>>> test_products_keyset_pagination')
+    url = f'{URL}/products/?page_size=3'
+    ids = []
+    while url is not None:
+        response = client.get(url)
+        assert response.status_code == 200
+        data = response.json()
+        assert len(data['results']) <= 3
+        ids += [product['id'] for product in data['results']]
+        url = data['next']
+    expected = Product.objects.order_by('-name', '-id').values_list('id', flat=True)
+    assert ids == list(expected)
+
+
+@pytest.mark.django_db
+def test_products_page_size_cap_and_fields(client, create_products):
+    print('\n>>> test_products_page_size_cap_and_fields')
+    response = client.get(f'{URL}/products/?page_size=100000&fields=id,name')
+    assert response.status_code == 200
+    data = response.json()
+    assert len(data['results']) == 7
+    assert data['next'] is None
+    assert set(data['results'][0]) == {'id', 'name'}
+
+    response = client.get(f'{URL}/products/?cursor=broken')
+    assert response.status_code == 404
+
+
+@pytest.mark.django_db
+def test_products_search(client, create_products):
+    print('\n>>> test_products_search')
+    products = create_products
+    phone = Category.objects.create(name='Смартфоны')
+    galaxy = Product.objects.create(name='Samsung Galaxy A13 (черный)', brand='Samsung', model='A13',
+                                    shop=products[0].shop, category=phone, external_id=100,
+                                    quantity=1, price=10000, price_rcc=12990)
+    note = Product.objects.create(name='Xiaomi Redmi Note 11', brand='Xiaomi', model='Galaxy',
+                                  shop=products[0].shop, category=phone, external_id=101,
+                                  quantity=1, price=10000, price_rcc=12990)
+    response = client.get(f'{URL}/products/?search=galaxy')
+    assert response.status_code == 200
+    assert [product['id'] for product in response.json()['results']] == [galaxy.id, note.id]
+
+    response = client.get(f'{URL}/products/', {'search': 'смартфоны', 'page_size': 1})
+    data = response.json()
+    assert len(data['results']) == 1
+    assert len(client.get(data['next']).json()['results']) == 1
+
+    response = client.get(f'{URL}/products/', {'search': 'черные'})
+    assert [product['id'] for product in response.json()['results']] == [galaxy.id]
+
+
+@pytest.mark.django_db
+def test_products_param_filters_and_facets(client, create_products):
+    print('\n>>> test_products_param_filters_and_facets')
+    products = create_products
+    memory = Parameter.objects.create(name='Оперативная память (Гб)')
+    color = Parameter.objects.create(name='Цвет')
+    for n, product in enumerate(products):
+        ProductParameter.objects.create(product=product, parameter=memory, value=str(4 * (1 + n % 2)))
+        ProductParameter.objects.create(product=product, parameter=color, value='черный' if n < 3 else 'белый')
+
+    response = client.get(f'{URL}/products/', {'param[Оперативная память (Гб)]': '8', 'facets': 'true'})
+    assert response.status_code == 200
+    data = response.json()
+    assert {product['id'] for product in data['results']} == {p.id for p in products[1::2]}
+    assert data['facets'] == {'Оперативная память (Гб)': {'8': 3}, 'Цвет': {'белый': 2, 'черный': 1}}
+
+    response = client.get(f'{URL}/products/', {'param[Цвет]': ['черный', 'белый'], 'price_lte': 240})
+    assert len(response.json()['results']) == 3
+
+    color.name = 'Цвет корпуса'
+    color.save()
+    response = client.get(f'{URL}/products/', {'param[Цвет корпуса]': 'черный', 'facets': 'true'})
+    data = response.json()
+    assert {product['id'] for product in data['results']} == {p.id for p in products[:3]}
+    assert set(data['facets']) == {'Оперативная память (Гб)', 'Цвет корпуса'}
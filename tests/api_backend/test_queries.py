@@ -0,0 +1,72 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework.authtoken.models import Token
+
+from api_backend.models import UserModel, Shop, Category, Product, Parameter, ProductParameter
+
+
+URL = 'http://127.0.0.1:8000/api/v1'
+
+
+def create_catalog(size: int, prefix: str):
+    """Каталог из size товаров в size категориях, у каждого товара size параметров"""
+    user = UserModel.objects.create_user(email=f'{prefix}@testmail.com', type='shop')
+    shop = Shop.objects.create(name=f'Shop {prefix}', owner=user)
+    parameters = [Parameter.objects.create(name=f'{prefix} parameter {n}') for n in range(size)]
+    products = []
+    for n in range(size):
+        category = Category.objects.create(name=f'{prefix} category {n}')
+        product = Product.objects.create(name=f'{prefix} product {n}', shop=shop, category=category,
+                                         external_id=n, quantity=10, price=100, price_rcc=120)
+        for parameter in parameters:
+            ProductParameter.objects.create(product=product, parameter=parameter, value=str(n))
+        products.append(product)
+    return user, products
+
+
+def count_queries(client, url: str) -> int:
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url)
+    assert response.status_code == 200
+    return len(context.captured_queries)
+
+
+def assert_constant_queries(endpoint):
+    """Количество запросов не должно зависеть от размера каталога"""
+    counts = []
+    for size, prefix in ((2, 'small'), (8, 'large')):
+        user, products = create_catalog(size, prefix)
+        client = APIClient()
+        token = Token.objects.create(user=user)
+        client.credentials(HTTP_AUTHORIZATION=f'Token {token}')
+        counts.append(count_queries(client, endpoint(products)))
+        Shop.objects.filter(owner=user).update(state=False)
+    assert counts[0] == counts[1], counts
+
+
+# tests:
+
+@pytest.mark.django_db
+def test_categories_queries():
+    print('\n>>> test_categories_queries')
+    assert_constant_queries(lambda products: f'{URL}/categories/')
+
+
+@pytest.mark.django_db
+def test_products_queries():
+    print('\n>>> test_products_queries')
+    assert_constant_queries(lambda products: f'{URL}/products/')
+
+
+@pytest.mark.django_db
+def test_product_detail_queries():
+    print('\n>>> test_product_detail_queries')
+    assert_constant_queries(lambda products: f'{URL}/products/{products[-1].id}')
+
+
+@pytest.mark.django_db
+def test_shop_detail_queries():
+    print('\n>>> test_shop_detail_queries')
+    assert_constant_queries(lambda products: f'{URL}/shop/')
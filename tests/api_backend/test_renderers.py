@@ -0,0 +1,86 @@
+import json
+from decimal import Decimal
+
+import pytest
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework.request import Request
+
+from api_backend import renderers
+from api_backend.catalog import category_queryset, product_queryset
+from api_backend.models import UserModel, Shop, Category, Product
+from api_backend.renderers import FastJSONRenderer, json_dumps
+from api_backend.serializers import CategorySerializer, CategoryValuesSerializer, ProductSerializer, \
+    ProductValuesSerializer
+
+
+URL = 'http://127.0.0.1:8000/api/v1'
+
+
+# fixtures:
+
+@pytest.fixture
+def create_catalog(db):
+    user = UserModel.objects.create_user(email='render_shop@testmail.com', type='shop')
+    shop = Shop.objects.create(name='Test Shop', owner=user)
+    for n in range(1, 4):
+        category = Category.objects.create(name=f'test_category_{n}')
+        for m in range(1, 4):
+            Product.objects.create(name=f'Товар {n}-{m}', shop=shop, category=category, external_id=n * 10 + m,
+                                   quantity=10, price=1000 * m, price_rcc=1500 * m)
+
+
+# tests:
+
+def test_fast_renderer():
+    print('\n>>> test_fast_renderer')
+    data = {'name': 'Товар', 'price': Decimal('10.50'), 'date': timezone.now(), 1: [None, True, 2 ** 70]}
+    expected = JSONRenderer().render(data)
+    assert FastJSONRenderer().render(data) == expected
+    assert json_dumps(data) == expected
+    # с отступами - стандартный JSONRenderer
+    assert FastJSONRenderer().render(data, 'application/json; indent=2') == \
+        JSONRenderer().render(data, 'application/json; indent=2')
+    assert FastJSONRenderer().render(None) == b''
+
+
+def test_renderer_fallback(monkeypatch):
+    print('\n>>> test_renderer_fallback')
+    monkeypatch.setattr(renderers, 'orjson', None)
+    data = {'name': 'Товар', 'price': Decimal('10.50'), 'items': [1, 2]}
+    assert FastJSONRenderer().render(data) == JSONRenderer().render(data)
+    assert json.loads(json_dumps(data)) == json.loads(JSONRenderer().render(data))
+
+
+@pytest.mark.django_db
+def test_values_serializers(create_catalog):
+    print('\n>>> test_values_serializers')
+    categories = category_queryset().order_by('id')
+    assert CategoryValuesSerializer(CategoryValuesSerializer.select(categories), many=True).data == \
+        CategorySerializer(categories, many=True).data
+
+    for query in ('', 'fields=id,name', 'fields=price', 'fields=foo'):
+        request = Request(APIRequestFactory().get(f'/api/v1/products/?{query}'))
+        products, _ = product_queryset(request.query_params)
+        products = products.order_by('id')
+        fast = ProductValuesSerializer(ProductValuesSerializer.select(products), many=True, context={'request': request})
+        assert fast.data == ProductSerializer(products, many=True, context={'request': request}).data
+    assert fast.data == [{}] * products.count()
+    assert ProductValuesSerializer.fields['price'] == 'price'
+
+
+@pytest.mark.django_db
+def test_fast_listing_views(create_catalog):
+    print('\n>>> test_fast_listing_views')
+    client = APIClient()
+    response = client.get(f'{URL}/products/', {'page_size': 4, 'fields': 'id,price_rcc'})
+    assert response['Content-Type'] == 'application/json'
+    data = response.json()
+    assert set(data['results'][0]) == {'id', 'price_rcc'}
+    # курсор строится по полям ключа сортировки, даже если их нет в ответе
+    ids = [product['id'] for product in client.get(data['next']).json()['results']]
+    assert ids == [Product.objects.get(name=name).id for name in ('Товар 2-2', 'Товар 2-1', 'Товар 1-3', 'Товар 1-2')]
+    assert client.get(f'{URL}/products/', {'page_size': 4, 'fields': 'foo'}).json()['results'] == [{}] * 4
+    categories = client.get(f'{URL}/categories/').json()
+    assert sorted(len(category['products']) for category in categories) == [3, 3, 3]
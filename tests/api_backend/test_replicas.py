@@ -0,0 +1,138 @@
+import pytest
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.db import connection, connections, router, transaction
+from django.test import AsyncClient
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework.authtoken.models import Token
+
+from api_backend import replicas
+from api_backend.models import UserModel, Shop, Category, Product
+
+
+URL = 'http://127.0.0.1:8000/api/v1'
+
+
+# fixtures:
+
+@pytest.fixture
+def replica(settings, transactional_db):
+    # реплика - отдельное соединение с той же тестовой базой, поэтому данные теста должны быть зафиксированы
+    connections.settings['replica_test'] = dict(connection.settings_dict)
+    settings.DATABASE_REPLICAS = ['replica_test']
+    replicas.lag_checks.clear()
+    yield connections['replica_test']
+    connections['replica_test'].close()
+    del connections['replica_test']
+    del connections.settings['replica_test']
+    replicas.lag_checks.clear()
+
+
+@pytest.fixture
+def create_products(transactional_db):
+    user = UserModel.objects.create_user(email='replica_shop@testmail.com', type='shop')
+    shop = Shop.objects.create(name='Test Shop', owner=user)
+    category = Category.objects.create(name='test_category_1')
+    return [Product.objects.create(name=f'Test Product {n}', shop=shop, category=category,
+                                   external_id=n, quantity=10, price=50000, price_rcc=59900)
+            for n in range(1, 4)]
+
+
+@pytest.fixture
+def buyer_client(transactional_db):
+    client = APIClient()
+    user = UserModel.objects.create_user(email='replica_buyer@testmail.com')
+    client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=user)}')
+    client.user = user
+    return client
+
+
+def get_queries(client, url: str, alias: str = 'replica_test') -> tuple:
+    """Запросы, выполненные в основной базе и в реплике при обработке GET-запроса"""
+    with CaptureQueriesContext(connection) as primary, CaptureQueriesContext(connections[alias]) as replica:
+        response = client.get(url)
+    assert response.status_code == 200
+    return [query['sql'] for query in primary.captured_queries], [query['sql'] for query in replica.captured_queries]
+
+
+# tests:
+
+def test_catalog_reads_from_replica(replica, create_products, buyer_client):
+    print('\n>>> test_catalog_reads_from_replica')
+    for path in ('products/', f'products/{create_products[0].id}', 'categories/', 'order/'):
+        primary, replica_queries = get_queries(buyer_client, f'{URL}/{path}')
+        assert replica_queries
+        # в основной базе - только проверка токена
+        assert not [sql for sql in primary if 'api_backend_product' in sql or 'api_backend_order' in sql]
+
+
+def test_read_your_writes(replica, create_products, buyer_client):
+    print('\n>>> test_read_your_writes')
+    response = buyer_client.post(f'{URL}/basket/', data={'items': [{'product': create_products[0].id, 'quantity': 1}]},
+                                 format='json')
+    assert response.json()['Status'] == 'OK'
+    # сразу после изменения данных пользователь читает из основной базы
+    primary, replica_queries = get_queries(buyer_client, f'{URL}/products/')
+    assert not replica_queries
+    assert [sql for sql in primary if 'api_backend_product' in sql]
+
+    replicas.cache.delete(replicas.sticky_key(buyer_client.user.id))
+    assert get_queries(buyer_client, f'{URL}/products/')[1]
+
+
+def test_cached_responses_after_catalog_change(replica, create_products):
+    print('\n>>> test_cached_responses_after_catalog_change')
+    client = APIClient()
+    # каталог только что изменен: ответ для кеша читается из основной базы, а не из отстающей реплики
+    assert replicas.catalog_recently_changed()
+    primary, replica_queries = get_queries(client, f'{URL}/products/')
+    assert not replica_queries
+    assert [sql for sql in primary if 'api_backend_product' in sql]
+
+    replicas.cache.delete(replicas.CATALOG_CHANGED_KEY)
+    assert get_queries(client, f'{URL}/categories/')[1]
+
+
+def test_stickiness_middleware_async(replica, create_products, buyer_client):
+    print('\n>>> test_stickiness_middleware_async')
+
+    async def get_response(request):
+        pass
+
+    assert iscoroutinefunction(replicas.ReplicaStickinessMiddleware(get_response))
+    async def post_basket():
+        # запрос через ASGI-обработчик: цепочка middleware выполняется асинхронно
+        return await AsyncClient().post(f'{URL}/basket/', {'items': [{'product': create_products[0].id,
+                                                                      'quantity': 1}]},
+                                        content_type='application/json', AUTHORIZATION=f'Token {token}')
+
+    token = Token.objects.get(user=buyer_client.user).key
+    response = async_to_sync(post_basket)()
+    assert response.json()['Status'] == 'OK'
+    assert replicas.is_sticky(buyer_client.user)
+
+
+def test_replica_lag(replica, create_products, monkeypatch):
+    print('\n>>> test_replica_lag')
+    replicas.cache.delete(replicas.CATALOG_CHANGED_KEY)
+    monkeypatch.setattr(replicas, 'replica_lag', lambda alias: 60.0)
+    primary, replica_queries = get_queries(APIClient(), f'{URL}/products/')
+    assert not replica_queries
+
+    # отставание проверяется не чаще раза в REPLICA_LAG_CHECK_INTERVAL секунд
+    monkeypatch.setattr(replicas, 'replica_lag', lambda alias: 0.0)
+    with replicas.use_replica():
+        assert router.db_for_read(Product) == 'default'
+        replicas.lag_checks.clear()
+        assert router.db_for_read(Product) == 'replica_test'
+
+
+def test_writes_go_to_primary(replica):
+    print('\n>>> test_writes_go_to_primary')
+    with replicas.use_replica():
+        assert router.db_for_write(Product) == 'default'
+        assert router.db_for_read(Product) == 'replica_test'
+        with transaction.atomic():
+            assert router.db_for_read(Product) == 'default'
+    assert router.db_for_read(Product) == 'default'
+    assert not router.allow_migrate('replica_test', 'api_backend')
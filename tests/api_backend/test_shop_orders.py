@@ -0,0 +1,95 @@
+from datetime import timedelta
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework.authtoken.models import Token
+
+from api_backend.models import UserModel, Shop, Category, Product, ClientContact, Order, OrderItem
+
+
+URL = 'http://127.0.0.1:8000/api/v1'
+
+
+# fixtures:
+
+@pytest.fixture
+def shop_client(db):
+    user = UserModel.objects.create_user(email='orders_shop@testmail.com', type='shop')
+    shop = Shop.objects.create(name='Test Shop', owner=user)
+    other = Shop.objects.create(name='Other Shop',
+                                owner=UserModel.objects.create_user(email='orders_other@testmail.com', type='shop'))
+    category = Category.objects.create(name='test_category_1')
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=user)}')
+    client.products = [Product.objects.create(name=f'Test Product {n}', shop=shop, category=category,
+                                              external_id=n, quantity=10, price=1000, price_rcc=1500)
+                       for n in range(1, 3)]
+    client.other_product = Product.objects.create(name='Other Product', shop=other, category=category,
+                                                  external_id=1, quantity=10, price=1000, price_rcc=1500)
+    return client
+
+
+def create_orders(client, count: int, start: int = 0):
+    """count заказов разных покупателей, по одному дню между заказами"""
+    now = timezone.now()
+    for n in range(start, start + count):
+        user = UserModel.objects.create_user(email=f'orders_buyer_{n}@testmail.com')
+        contact = ClientContact.objects.create(user=user, city='Москва', street='Тверская', house='1',
+                                               phone='+79990000000')
+        order = Order.objects.create(user=user, status='new', contact=contact)
+        Order.objects.filter(pk=order.pk).update(date=now - timedelta(days=n))
+        OrderItem.objects.bulk_create([OrderItem(order=order, product=product, quantity=2)
+                                       for product in client.products + [client.other_product]])
+
+
+def count_queries(client, url: str) -> int:
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url)
+    assert response.status_code == 200
+    return len(context.captured_queries)
+
+
+# tests:
+
+@pytest.mark.django_db
+def test_shop_orders_constant_queries(shop_client):
+    print('\n>>> test_shop_orders_constant_queries')
+    create_orders(shop_client, 2)
+    shop_client.get(f'{URL}/shop/orders/')
+    small = count_queries(shop_client, f'{URL}/shop/orders/')
+    create_orders(shop_client, 20, start=2)
+    assert count_queries(shop_client, f'{URL}/shop/orders/') == small
+
+
+@pytest.mark.django_db
+def test_shop_orders_content(shop_client):
+    print('\n>>> test_shop_orders_content')
+    create_orders(shop_client, 1)
+    orders = shop_client.get(f'{URL}/shop/orders/').json()['Заказы']
+    assert len(orders) == 1
+    assert [product['external_id'] for product in orders[0]['product']] == [1, 2]
+    assert orders[0]['total'] == 1500 * 2 * 2
+    assert orders[0]['contact']['city'] == 'Москва'
+
+
+@pytest.mark.django_db
+def test_shop_orders_pagination_and_dates(shop_client):
+    print('\n>>> test_shop_orders_pagination_and_dates')
+    create_orders(shop_client, 5)
+    response = shop_client.get(f'{URL}/shop/orders/', {'page_size': 2}).json()
+    seen = [order['order'] for order in response['Заказы']]
+    while response['next']:
+        response = shop_client.get(response['next']).json()
+        seen += [order['order'] for order in response['Заказы']]
+    assert seen == list(Order.objects.order_by('-date', '-id').values_list('id', flat=True))
+
+    today = timezone.now().date()
+    params = {'date_from': str(today - timedelta(days=2)), 'date_to': str(today - timedelta(days=1))}
+    orders = shop_client.get(f'{URL}/shop/orders/', params).json()['Заказы']
+    assert len(orders) == 2
+
+    response = shop_client.get(f'{URL}/shop/orders/', {'date_from': '18.10.2026'}).json()
+    assert response['Status'] == 'Ошибка!'
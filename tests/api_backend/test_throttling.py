@@ -0,0 +1,84 @@
+import pytest
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework.views import APIView
+
+from api_backend.throttling import ScopedSlidingWindowThrottle
+from api_backend.checks import throttle_cache_check
+
+
+URL = 'http://127.0.0.1:8000/api/v1'
+
+
+class FakeView(APIView):
+    throttle_scope = 'catalog'
+
+
+class FakeTimer:
+
+    def __init__(self, now: float):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def make_throttle(timer, rate: str = '10/minute'):
+    throttle = ScopedSlidingWindowThrottle()
+    throttle.timer = timer
+    throttle.THROTTLE_RATES = {'catalog': rate}
+    return throttle
+
+
+def count_allowed(timer, requests: int) -> int:
+    request = APIView().initialize_request(APIRequestFactory().get('/'))
+    return sum(make_throttle(timer).allow_request(request, FakeView()) for _ in range(requests))
+
+
+# tests:
+
+def test_sliding_window():
+    print('\n>>> test_sliding_window')
+    timer = FakeTimer(60 * 1000)
+    assert count_allowed(timer, 15) == 10
+    # середина следующего интервала: половина запросов предыдущего еще учитывается
+    timer.now += 90
+    assert count_allowed(timer, 15) == 5
+    # через два интервала предыдущих запросов в окне нет
+    timer.now += 120
+    assert count_allowed(timer, 15) == 10
+
+
+def test_wait():
+    print('\n>>> test_wait')
+    timer = FakeTimer(60 * 1000 + 30)
+    request = APIView().initialize_request(APIRequestFactory().get('/'))
+    throttle = make_throttle(timer)
+    for _ in range(10):
+        assert throttle.allow_request(request, FakeView())
+    assert not throttle.allow_request(request, FakeView())
+    assert throttle.wait() == 30
+
+
+@pytest.mark.django_db
+def test_endpoint_scopes():
+    print('\n>>> test_endpoint_scopes')
+    client = APIClient()
+    # каталог для анонимных пользователей ограничен лимитом catalog, а не общим лимитом anon (10/minute)
+    statuses = [client.get(f'{URL}/categories/').status_code for _ in range(20)]
+    assert statuses == [200] * 20
+    response = client.post(f'{URL}/user/login/', data={'email': 'x@testmail.com', 'password': 'x'}, format='json')
+    assert response.status_code == 200
+
+
+def test_throttle_cache_check(settings):
+    print('\n>>> test_throttle_cache_check')
+    # тестовый кеш - locmem: отдельный в каждом процессе
+    settings.DEBUG = False
+    assert [error.id for error in throttle_cache_check(None)] == ['api_backend.E001']
+    settings.DEBUG = True
+    assert [error.id for error in throttle_cache_check(None)] == ['api_backend.W001']
+
+    settings.CACHES = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+                                   'LOCATION': 'redis://127.0.0.1:6379'}}
+    settings.DEBUG = False
+    assert throttle_cache_check(None) == []
@@ -0,0 +1,26 @@
+import pytest
+from django.core.cache import cache
+
+from api_backend.interning import invalidate_names
+from api_backend.authentication import token_cache
+
+
+@pytest.fixture(autouse=True)
+def clear_name_caches():
+    """Кеши справочников живут дольше теста, а данные теста откатываются"""
+    yield
+    invalidate_names()
+
+
+@pytest.fixture(autouse=True)
+def clear_token_cache():
+    """Кеш аутентификации хранит пользователей, которые откатываются вместе с тестом"""
+    yield
+    token_cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Кеш (в том числе история throttling) не должен переходить из теста в тест"""
+    cache.clear()
+    yield